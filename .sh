@@ -9,6 +9,8 @@
 #   1. Place this script at the root of your cloned repo (next to README.md).
 #   2. Make it executable: chmod +x start_agents.sh
 #   3. Run: ./start_agents.sh
+#      or COHOST=1 ./start_agents.sh to host all eight agents in one process
+#      (cohost.py; same ports, events and MCP calls between them skip HTTP).
 #
 
 set -euo pipefail
@@ -31,6 +33,21 @@ export OPENAI_API_KEY="your_openai_api_key_here"
 export NEWS_API_KEY="your_news_api_key_here"
 echo "Environment variables set (OPENAI_API_KEY, NEWS_API_KEY)."
 
+# 3.1 Co-hosted mode: install every agent's requirements, then run them all
+#     in a single process and skip the per-agent launches below.
+if [ "${COHOST:-0}" = "1" ]; then
+  echo "---- Starting all agents in one process (ports 5001-5008) ----"
+  for agent in market_data_agent technical_analysis_agent news_agent fundamentals_agent \
+               strategy_agent risk_agent execution_agent compliance_agent; do
+    pip install -r "$SCRIPT_DIR/$agent/requirements.txt"
+  done
+  nohup python cohost.py > cohost.log 2>&1 &
+  COHOST_PID=$!
+  echo "All agents launched in one process (PID=$COHOST_PID). Log: cohost.log"
+  echo "Use 'kill $COHOST_PID' to stop them."
+  exit 0
+fi
+
 # 4. Start each agent in turn. We install requirements then run app.py in the background.
 #    Logs for each agent will be redirected to a file in the agent’s folder for easy debugging.
 
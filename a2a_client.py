@@ -1,21 +1,56 @@
 # a2a_client.py
 
-import requests
 import json
 
-def send_event(target_url: str, event_type: str, content: dict):
+from config import A2A_TRANSPORT
+from http_pool import post_json, post_json_async
+import a2a_transport
+import local_bus
+import tracing
+
+def send_event(target_url: str, event_type: str, content: dict, idempotent: bool = False):
     """
     Sends an HTTP POST to target_url with JSON body:
     {
       "type": event_type,
       "content": { ... }
     }
+    Uses a pooled keep-alive connection with connect/read timeouts. Events
+    are only retried when they cannot have been delivered, unless the
+    caller marks them idempotent.
+
+    With A2A_TRANSPORT="ws" the event is instead queued for batched binary
+    delivery over a persistent WebSocket (see a2a_transport), and
+    {"status": "queued"} is returned right away.
+
+    When the target agent is hosted in this process (cohost.py), the event
+    is queued straight to its handler (see local_bus), whatever the
+    transport, and {"status": "queued"} is returned.
+
+    The current trace (see tracing) travels next to type/content, with a
+    hop for this send; an event sent outside any trace starts a new one.
     """
-    payload = {
+    payload = tracing.inject({
         "type": event_type,
         "content": content
-    }
-    resp = requests.post(target_url, json=payload)
-    resp.raise_for_status()
+    }, f"send:{event_type}")
+    if local_bus.send(target_url, payload):
+        return {"status": "queued"}
+    if A2A_TRANSPORT == "ws":
+        a2a_transport.send(target_url, payload, idempotent=idempotent)
+        return {"status": "queued"}
+    resp = post_json(target_url, payload, idempotent=idempotent)
     return resp.json() if resp.text else {}
 
+async def send_event_async(target_url: str, event_type: str, content: dict, idempotent: bool = False):
+    """
+    asyncio variant of send_event(), so callers can fan out many events
+    concurrently, e.g. with asyncio.gather(). Requires aiohttp.
+    """
+    payload = tracing.inject({
+        "type": event_type,
+        "content": content
+    }, f"send:{event_type}")
+    if local_bus.send(target_url, payload):
+        return {"status": "queued"}
+    return await post_json_async(target_url, payload, idempotent=idempotent)
@@ -0,0 +1,194 @@
+# a2a_transport.py
+
+import json
+import asyncio
+import threading
+from urllib.parse import urlsplit
+
+from config import A2A_TRANSPORT, A2A_WS_PORT_OFFSET, A2A_BATCH_MAX, A2A_BATCH_WINDOW, A2A_ACK_TIMEOUT
+from http_pool import post_json
+import tracing
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# First byte of every frame names its encoding. Which one a connection uses
+# is agreed in the WebSocket handshake: each side offers the subprotocols it
+# can decode, best first, and msgpack is only picked when both have it, so
+# peers with and without msgpack installed can still talk to each other.
+_MSGPACK = b"M"
+_JSON = b"J"
+_ACK = b"ok"
+SUBPROTOCOLS = ["a2a.msgpack", "a2a.json"] if msgpack is not None else ["a2a.json"]
+
+# After a WebSocket failure, use HTTP for this long before reconnecting
+_WS_RETRY_AFTER = 5.0
+
+def encode_frame(events: list, subprotocol: str = "a2a.json") -> bytes:
+    """
+    Packs a batch of {"type", "content"} events into one binary frame, in
+    msgpack when the connection's subprotocol is "a2a.msgpack".
+    """
+    if subprotocol == "a2a.msgpack":
+        return _MSGPACK + msgpack.packb(events, use_bin_type=True)
+    return _JSON + json.dumps(events, separators=(",", ":")).encode()
+
+def decode_frame(frame: bytes) -> list:
+    marker, body = frame[:1], frame[1:]
+    if marker == _MSGPACK:
+        if msgpack is None:
+            raise ValueError("msgpack frame received but msgpack is not installed")
+        return msgpack.unpackb(body, raw=False)
+    return json.loads(body)
+
+def ws_url(event_url: str) -> str:
+    """
+    WebSocket endpoint paired with an agent's HTTP /events URL: same host,
+    port shifted by A2A_WS_PORT_OFFSET (e.g. :5005/events -> ws://...:6005).
+    """
+    parts = urlsplit(event_url)
+    return f"ws://{parts.hostname}:{parts.port + A2A_WS_PORT_OFFSET}"
+
+
+class _WSSender:
+    """
+    Delivers events over one long-lived WebSocket per target, on a private
+    asyncio loop running in a daemon thread.
+
+    Events queued for the same target within A2A_BATCH_WINDOW seconds (up
+    to A2A_BATCH_MAX) travel in a single frame. The receiver acks a frame
+    once every event in it has been handled, within A2A_ACK_TIMEOUT
+    seconds. Delivery follows the same rule as post_json(): a frame that
+    never left (no connection) is re-delivered as plain JSON-over-HTTP
+    POSTs, but once a frame may have reached the receiver (failed send,
+    lost or late ack) only its idempotent events are re-posted, and the
+    others are reported as possibly lost rather than handled twice. After
+    a failure the target is served over HTTP for a few seconds before the
+    sender tries to reconnect.
+    """
+
+    def __init__(self):
+        self._loop = None
+        self._queues = {}
+        self._lock = threading.Lock()
+
+    def send(self, target_url: str, payload: dict, idempotent: bool = False):
+        loop = self._ensure_loop()
+        loop.call_soon_threadsafe(self._enqueue, target_url, (payload, idempotent))
+
+    def _ensure_loop(self):
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name="a2a-ws-sender", daemon=True).start()
+            return self._loop
+
+    def _enqueue(self, target_url, item):
+        queue = self._queues.get(target_url)
+        if queue is None:
+            queue = self._queues[target_url] = asyncio.Queue()
+            self._loop.create_task(self._pump(target_url, queue))
+        queue.put_nowait(item)
+
+    async def _pump(self, target_url, queue):
+        import websockets
+
+        conn = None
+        down_until = 0.0
+        while True:
+            batch = await self._next_batch(queue)
+            if self._loop.time() < down_until:
+                await self._loop.run_in_executor(None, _post_batch, target_url, batch)
+                continue
+            try:
+                if conn is None:
+                    conn = await websockets.connect(ws_url(target_url), max_size=None,
+                                                    subprotocols=SUBPROTOCOLS)
+            except Exception as e:
+                down_until = self._loop.time() + _WS_RETRY_AFTER
+                print(f"[A2A] WebSocket connect to {target_url} failed ({e}); falling back to HTTP.")
+                await self._loop.run_in_executor(None, _post_batch, target_url, batch)
+                continue
+            try:
+                await conn.send(encode_frame([payload for payload, _ in batch], conn.subprotocol))
+                await asyncio.wait_for(conn.recv(), A2A_ACK_TIMEOUT)
+            except Exception as e:
+                self._loop.create_task(conn.close())
+                conn = None
+                down_until = self._loop.time() + _WS_RETRY_AFTER
+                retry = [item for item in batch if item[1]]
+                lost = [payload.get("type") for payload, idempotent in batch if not idempotent]
+                print(f"[A2A] WebSocket delivery to {target_url} failed ({str(e) or type(e).__name__}); "
+                      f"re-posting {len(retry)} idempotent events over HTTP"
+                      + (f", {len(lost)} others may be lost: {lost}." if lost else "."))
+                if retry:
+                    await self._loop.run_in_executor(None, _post_batch, target_url, retry)
+
+    async def _next_batch(self, queue) -> list:
+        batch = [await queue.get()]
+        deadline = self._loop.time() + A2A_BATCH_WINDOW
+        while len(batch) < A2A_BATCH_MAX:
+            if not queue.empty():
+                batch.append(queue.get_nowait())
+                continue
+            remaining = deadline - self._loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+
+_SENDER = _WSSender()
+
+def send(target_url: str, payload: dict, idempotent: bool = False):
+    """
+    Queues an event for batched WebSocket delivery; returns immediately.
+    Only `idempotent` events are re-sent when a frame may have arrived.
+    """
+    _SENDER.send(target_url, payload, idempotent)
+
+def serve(handle_event, http_port: int, host: str = "0.0.0.0"):
+    """
+    When A2A_TRANSPORT is "ws", starts a WebSocket listener on
+    http_port + A2A_WS_PORT_OFFSET in a daemon thread. Every event in an
+    incoming frame is passed to handle_event(evt_type, content), the same
+    function behind the agent's HTTP /events route, which keeps working
+    as the fallback.
+    """
+    if A2A_TRANSPORT != "ws":
+        return
+    import websockets
+
+    async def on_connection(websocket, *args):
+        loop = asyncio.get_running_loop()
+        async for frame in websocket:
+            for event in decode_frame(frame):
+                await loop.run_in_executor(None, tracing.bind(_dispatch), handle_event, event)
+            await websocket.send(_ACK)
+
+    async def run():
+        async with websockets.serve(on_connection, host, http_port + A2A_WS_PORT_OFFSET, max_size=None,
+                                    subprotocols=SUBPROTOCOLS):
+            await asyncio.Future()
+
+    threading.Thread(target=tracing.bind(lambda: asyncio.run(run())), name="a2a-ws-server", daemon=True).start()
+    print(f"[A2A] WebSocket events on port {http_port + A2A_WS_PORT_OFFSET}.")
+
+def _dispatch(handle_event, event: dict):
+    try:
+        with tracing.received(event):
+            handle_event(event.get("type"), event.get("content", {}))
+    except Exception as e:
+        print(f"[A2A] Error handling {event.get('type')}: {e}")
+
+def _post_batch(target_url: str, batch: list):
+    for payload, idempotent in batch:
+        try:
+            post_json(target_url, payload, idempotent=idempotent)
+        except Exception as e:
+            print(f"[A2A] HTTP fallback to {target_url} failed: {e}")
@@ -0,0 +1,318 @@
+# backtest/backtester.py
+
+import os
+import sys
+import json
+import time
+from urllib.parse import unquote
+import numpy as np
+
+# The agents' modules are imported straight from their directories
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for _agent in ("market_data_agent", "technical_analysis_agent", "strategy_agent", "risk_agent"):
+    sys.path.insert(0, os.path.join(ROOT, _agent))
+sys.path.insert(0, ROOT)
+
+from config import RISK_WINDOW, RISK_CONFIDENCE, RISK_LIMITS_PATH, EXECUTION_MIN_DELTA
+from bar_store import BarStore
+from market_sources import SyntheticSource
+from indicator_history import signal_history
+from llm_backend import LocalBackend
+from risk_engine import RiskEngine
+from limits import LimitSet
+
+# Parameters a run (or a sweep) can override
+DEFAULT_PARAMS = {
+    "rsi_window": 14,
+    "rsi_upper": 70.0,
+    "rsi_lower": 30.0,
+    "risk_window": RISK_WINDOW,
+    "confidence": RISK_CONFIDENCE,
+    "limits_path": RISK_LIMITS_PATH,
+    "min_delta": EXECUTION_MIN_DELTA,
+    "cost_bps": 1.0,
+    "periods_per_year": 252,
+}
+
+_NS_PER_YEAR = 365 * 86400 * 10**9
+
+
+def store_symbols(store_dir: str, interval: str = "1d") -> list:
+    """
+    Every symbol with a series for `interval` in a BarStore directory.
+    """
+    series_dir = os.path.join(store_dir, interval)
+    return sorted(unquote(name) for name in os.listdir(series_dir)) if os.path.isdir(series_dir) else []
+
+def load_bars(symbols: list, store_dir: str = None, interval: str = "1d", years: float = 10.0):
+    """
+    (ts grid, {"close", "high", "low": (n_symbols, T) matrices}) for the
+    last `years` of `symbols`, read from a BarStore directory (e.g. the
+    Market Data Agent's MARKET_DATA_STORE_DIR or a replay recording) or,
+    without one, generated by SyntheticSource. Symbols are aligned on the
+    union of their timestamps; each row is NaN before the symbol's first
+    bar and forward-filled after it.
+    """
+    end_ns = time.time_ns()
+    start_ns = end_ns - int(years * _NS_PER_YEAR)
+    if store_dir is None:
+        source = SyntheticSource()
+        series = {sym: source.bars(sym, interval, start_ns, end_ns) for sym in symbols}
+    else:
+        store = BarStore(store_dir)
+        series = {sym: store.read(sym, interval, start_ns) for sym in symbols}
+
+    stamps = [bars["ts"] for bars in series.values() if len(bars["ts"])]
+    grid = np.unique(np.concatenate(stamps)) if stamps else np.empty(0, dtype=np.int64)
+    matrices = {}
+    for field in ("close", "high", "low"):
+        values = np.full((len(symbols), len(grid)), np.nan)
+        for i, sym in enumerate(symbols):
+            bars = series[sym]
+            values[i, np.searchsorted(grid, bars["ts"])] = bars[field]
+        matrices[field] = _ffill_rows(values)
+    return grid, matrices
+
+
+class SimClock:
+    """
+    Simulated time: iterating yields the bar index while `now` holds that
+    bar's timestamp (ns), so everything stamped during a step carries bar
+    time, and no step ever waits on the wall clock.
+    """
+
+    def __init__(self, grid: np.ndarray):
+        self.grid = grid
+        self.step = None
+        self.now = None
+
+    def __iter__(self):
+        for step, ts in enumerate(self.grid.tolist()):
+            self.step, self.now = step, ts
+            yield step
+
+
+class Backtest:
+    """
+    Replays a (n_symbols, T) bar history through the agents' decision
+    logic in one process, bar by bar on a SimClock:
+
+      1. Technical: every alert the agent would send is computed up front
+         for the whole history (indicator_history.signal_history, the same
+         RSI crossovers and DEFAULT_RULES as the live agent). Alerts of one
+         bar form one batch, merged per ticker like the Strategy Agent's
+         coalescer.
+      2. Strategy: the batch plus closing prices of the held and alerted
+         names go to the deterministic LocalBackend rules, which is what
+         generate_strategy() answers with STRATEGY_LLM_BACKEND=local (minus
+         the prompt text round trip).
+      3. Risk: the post-trade book is checked by the Risk Agent's
+         RiskEngine (fed each bar's closes) and the compiled limit rules.
+      4. Execution: approved targets are netted against the positions and
+         differences below min_delta are skipped, as in the OrderManager.
+         Orders fill at the bar's close, less cost_bps.
+
+    Positions are fractions of equity and drift with prices between
+    trades. run() returns performance and pipeline counters.
+    """
+
+    def __init__(self, grid: np.ndarray, bars: dict, symbols: list, params: dict = None, history: dict = None):
+        self.grid = grid
+        self.bars = bars
+        self.symbols = list(symbols)
+        self.index = {sym: i for i, sym in enumerate(self.symbols)}
+        self.params = dict(DEFAULT_PARAMS, **(params or {}))
+        self.history = history
+        self.clock = SimClock(grid)
+        self.llm = LocalBackend()
+        with open(self.params["limits_path"]) as f:
+            self.limits = LimitSet(json.load(f))
+        self.risk = RiskEngine(self.symbols, window=int(self.params["risk_window"]),
+                               confidence=float(self.params["confidence"]))
+
+    def signals(self) -> dict:
+        if self.history is None:
+            self.history = signal_history(
+                self.bars["close"], self.bars["high"], self.bars["low"],
+                rsi_window=int(self.params["rsi_window"]),
+                upper=float(self.params["rsi_upper"]),
+                lower=float(self.params["rsi_lower"])
+            )
+        return self.history
+
+    def run(self) -> dict:
+        p = self.params
+        started = time.perf_counter()
+        history = self.signals()
+        batches = _alert_batches(history)
+        indicators_done = time.perf_counter()
+
+        close = self.bars["close"]
+        n, T = close.shape
+        with np.errstate(divide="ignore", invalid="ignore"):
+            returns = np.nan_to_num(close[:, 1:] / close[:, :-1] - 1.0, nan=0.0, posinf=0.0, neginf=0.0)
+        returns = np.concatenate([np.zeros((n, 1)), returns], axis=1)
+        names = [name for name, _ in history["signals"]]
+        rsi = history["rsi"]
+        cost = p["cost_bps"] / 1e4
+
+        weights = np.zeros(n)
+        equity = np.ones(T)
+        value = 1.0
+        counts = {"alerts": 0, "strategies": 0, "approved": 0, "vetoed": 0,
+                  "trades": 0, "skipped_legs": 0, "turnover": 0.0}
+        vetoes = {}
+
+        for t in self.clock:
+            # Mark to market, letting the weights drift with prices
+            if t:
+                day = float(weights @ returns[:, t])
+                value *= 1.0 + day
+                if weights.any() and day > -1.0:
+                    weights = weights * (1.0 + returns[:, t]) / (1.0 + day)
+            self.risk.update_from_closes(self.grid[t:t + 1], close[:, t:t + 1].T)
+
+            batch = batches.get(t)
+            if batch is not None:
+                alerts = [
+                    ("technical_alert", {"ticker": self.symbols[i], "rsi": _float_or_none(rsi[i, t]),
+                                         "signal": names[k]})
+                    for i, k in batch
+                ]
+                counts["alerts"] += len(alerts)
+                strategy = self._strategy(alerts, weights, close[:, t])
+                counts["strategies"] += 1
+                breaches = self._check(strategy, weights)
+                if breaches:
+                    counts["vetoed"] += 1
+                    for breach in breaches:
+                        vetoes[breach["rule"]] = vetoes.get(breach["rule"], 0) + 1
+                else:
+                    counts["approved"] += 1
+                    value *= 1.0 - cost * self._execute(strategy, weights, counts)
+            equity[t] = value
+
+        finished = time.perf_counter()
+        return {
+            "symbols": n,
+            "bars": T,
+            "start": int(self.grid[0]) if T else None,
+            "end": int(self.grid[-1]) if T else None,
+            "params": p,
+            **_performance(equity, p["periods_per_year"]),
+            **counts,
+            "vetoes": vetoes,
+            "seconds": {
+                "indicators": round(indicators_done - started, 4),
+                "replay": round(finished - indicators_done, 4),
+            },
+        }
+
+    def _strategy(self, alerts: list, weights: np.ndarray, prices: np.ndarray) -> list:
+        # Held names stand in for the Strategy Agent's base ticker list
+        tickers = [self.symbols[i] for i in np.flatnonzero(weights)]
+        tickers += [data["ticker"] for _, data in alerts if data["ticker"] not in tickers]
+        signals = {
+            "alerts": [{"alert_type": alert_type, "alert_data": data} for alert_type, data in alerts],
+            "prices": {sym: float(prices[self.index[sym]]) for sym in tickers}
+        }
+        return self.llm.strategy(signals)
+
+    def _check(self, strategy: list, weights: np.ndarray) -> list:
+        portfolio = {self.symbols[i]: float(weights[i]) for i in np.flatnonzero(weights)}
+        for leg in strategy:
+            portfolio[leg["ticker"]] = leg.get("target_weight", 0.0)
+        risk = self.risk.assess(portfolio) if self.risk.ready() else None
+        [breaches] = self.limits.evaluate([portfolio], [risk])
+        breaches += [{"rule": "no_history", "ticker": sym} for sym in (risk or {}).get("unknown", [])]
+        return breaches
+
+    def _execute(self, strategy: list, weights: np.ndarray, counts: dict) -> float:
+        """
+        Moves `weights` to the strategy's targets in place; returns the turnover.
+        """
+        traded = 0.0
+        for leg in strategy:
+            i = self.index[leg["ticker"]]
+            delta = leg.get("target_weight", 0.0) - weights[i]
+            if abs(delta) < self.params["min_delta"]:
+                counts["skipped_legs"] += 1
+                continue
+            weights[i] += delta
+            traded += abs(delta)
+            counts["trades"] += 1
+        counts["turnover"] += traded
+        return traded
+
+
+# Per-process memo of loaded bars and signal histories, so a sweep over
+# strategy/risk/execution parameters loads and computes them once
+_BARS = {}
+_HISTORIES = {}
+
+def run_job(job: dict) -> dict:
+    """
+    Process-pool entry point. job = {"symbols": [...], "params": {...},
+    "store_dir": path or None, "interval": str, "years": float, "label": any}.
+    """
+    data_key = (tuple(job["symbols"]), job.get("store_dir"), job.get("interval", "1d"), job.get("years", 10.0))
+    if data_key not in _BARS:
+        _BARS[data_key] = load_bars(job["symbols"], job.get("store_dir"), job.get("interval", "1d"),
+                                    job.get("years", 10.0))
+    grid, bars = _BARS[data_key]
+    params = dict(DEFAULT_PARAMS, **job.get("params", {}))
+    history_key = data_key + (params["rsi_window"], params["rsi_upper"], params["rsi_lower"])
+    backtest = Backtest(grid, bars, job["symbols"], params, history=_HISTORIES.get(history_key))
+    result = backtest.run()
+    _HISTORIES[history_key] = backtest.history
+    result["label"] = job.get("label")
+    return result
+
+
+def _alert_batches(history: dict) -> dict:
+    """
+    {bar index: [(symbol index, signal index), ...]} with one alert per
+    signal that fired for a symbol on that bar, as the Strategy Agent's
+    merge of a coalesced batch keeps one per (ticker, signal).
+    """
+    signals = history["signals"]
+    if not signals:
+        return {}
+    fired = np.stack([f for _, f in signals])
+    k_idx, i_idx, t_idx = np.nonzero(fired)
+    if not len(t_idx):
+        return {}
+    order = np.lexsort((k_idx, i_idx, t_idx))
+    t_idx, i_idx, k_idx = t_idx[order], i_idx[order], k_idx[order]
+    bounds = np.flatnonzero(np.diff(t_idx)) + 1
+    return {
+        int(ts[0]): list(zip(syms.tolist(), ks.tolist()))
+        for ts, syms, ks in zip(np.split(t_idx, bounds), np.split(i_idx, bounds), np.split(k_idx, bounds))
+    }
+
+def _performance(equity: np.ndarray, periods_per_year: float) -> dict:
+    if len(equity) < 2:
+        return {"total_return": 0.0, "cagr": 0.0, "volatility": 0.0, "sharpe": None, "max_drawdown": 0.0}
+    rets = equity[1:] / equity[:-1] - 1.0
+    years = len(rets) / periods_per_year
+    vol = float(rets.std() * np.sqrt(periods_per_year))
+    drawdown = 1.0 - equity / np.maximum.accumulate(equity)
+    return {
+        "total_return": float(equity[-1] - 1.0),
+        "cagr": float(equity[-1] ** (1.0 / years) - 1.0) if equity[-1] > 0 else -1.0,
+        "volatility": vol,
+        "sharpe": float(rets.mean() * periods_per_year / vol) if vol > 0 else None,
+        "max_drawdown": float(drawdown.max()),
+    }
+
+def _ffill_rows(values: np.ndarray) -> np.ndarray:
+    """
+    Forward-fills NaNs along each row (leading NaNs stay).
+    """
+    cols = np.where(np.isnan(values), 0, np.arange(values.shape[1]))
+    np.maximum.accumulate(cols, axis=1, out=cols)
+    filled = values[np.arange(len(values))[:, None], cols]
+    return filled
+
+def _float_or_none(x) -> float:
+    return None if np.isnan(x) else float(x)
@@ -0,0 +1,126 @@
+# backtest/run_backtest.py
+#
+# Runs backtests over a process pool: one job per (book, parameter set).
+# Bars come from a BarStore directory (e.g. the Market Data Agent's store or
+# a replay recording) or, without --store, from the synthetic source.
+#
+#   python backtest/run_backtest.py --symbols 300 --years 10
+#   python backtest/run_backtest.py --store data/bars --books 4
+#   python backtest/run_backtest.py --sweep rsi_upper=65,70,75 --sweep min_delta=0.01,0.05
+#   python backtest/run_backtest.py --set cost_bps=5 --json results.json
+
+import os
+import sys
+import json
+import time
+import argparse
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+
+from backtester import DEFAULT_PARAMS, store_symbols, run_job
+from market_sources import universe
+
+
+def parse_value(name: str, text: str):
+    """
+    Casts `text` to the type of DEFAULT_PARAMS[name].
+    """
+    if name not in DEFAULT_PARAMS:
+        raise argparse.ArgumentTypeError(f"Unknown parameter {name!r}; one of {sorted(DEFAULT_PARAMS)}")
+    kind = type(DEFAULT_PARAMS[name])
+    return text if kind is str else kind(float(text)) if kind is int else kind(text)
+
+
+def param_grid(sweeps: list, fixed: list) -> list:
+    """
+    Cartesian product of every --sweep name=v1,v2,... over the --set
+    name=value overrides.
+    """
+    base = {}
+    for item in fixed:
+        name, _, value = item.partition("=")
+        base[name] = parse_value(name, value)
+    axes = []
+    for item in sweeps:
+        name, _, values = item.partition("=")
+        axes.append([(name, parse_value(name, v)) for v in values.split(",") if v])
+    return [dict(base, **dict(combo)) for combo in itertools.product(*axes)]
+
+
+def make_jobs(args) -> list:
+    if args.tickers:
+        symbols = args.tickers.split(",")
+    elif args.store:
+        symbols = store_symbols(args.store, args.interval)[:args.symbols]
+    else:
+        symbols = universe(args.symbols)
+    if not symbols:
+        raise SystemExit(f"No {args.interval} series in {args.store}")
+    books = max(1, min(args.books, len(symbols)))
+    size = -(-len(symbols) // books)
+    jobs = []
+    for b in range(books):
+        for params in param_grid(args.sweep, args.set):
+            jobs.append({
+                "symbols": symbols[b * size:(b + 1) * size],
+                "params": params,
+                "store_dir": args.store,
+                "interval": args.interval,
+                "years": args.years,
+                "label": {"book": b, **params},
+            })
+    return jobs
+
+
+def print_results(results: list, wall: float):
+    print(f"{'book':>4}  {'params':<40}{'symbols':>8}{'bars':>6}{'return':>9}{'cagr':>8}{'sharpe':>8}"
+          f"{'maxdd':>8}{'strats':>8}{'vetoed':>8}{'trades':>8}{'secs':>7}")
+    for r in results:
+        label = dict(r["label"])
+        book = label.pop("book")
+        params = ",".join(f"{k}={v}" for k, v in label.items()) or "defaults"
+        sharpe = f"{r['sharpe']:.2f}" if r["sharpe"] is not None else "-"
+        secs = r["seconds"]["indicators"] + r["seconds"]["replay"]
+        print(f"{book:>4}  {params[:39]:<40}{r['symbols']:>8}{r['bars']:>6}{100 * r['total_return']:>8.1f}%"
+              f"{100 * r['cagr']:>7.1f}%{sharpe:>8}{100 * r['max_drawdown']:>7.1f}%{r['strategies']:>8}"
+              f"{r['vetoed']:>8}{r['trades']:>8}{secs:>7.2f}")
+    bars = sum(r["symbols"] * r["bars"] for r in results)
+    print(f"\n{len(results)} runs, {bars} symbol-bars in {wall:.2f}s wall")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay bar history through the agents' decision logic.")
+    parser.add_argument("--store", help="BarStore directory (default: synthetic bars)")
+    parser.add_argument("--symbols", type=int, default=100, help="universe size")
+    parser.add_argument("--tickers", help="comma-separated symbols (overrides --symbols)")
+    parser.add_argument("--years", type=float, default=10.0)
+    parser.add_argument("--interval", default="1d")
+    parser.add_argument("--books", type=int, default=1, help="split the universe into this many independent books")
+    parser.add_argument("--sweep", action="append", default=[], metavar="NAME=V1,V2",
+                        help="parameter values to sweep (repeatable; cartesian product)")
+    parser.add_argument("--set", action="append", default=[], metavar="NAME=VALUE",
+                        help="fixed parameter override (repeatable)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="process pool size")
+    parser.add_argument("--json", help="also write the full results to this file")
+    args = parser.parse_args()
+
+    jobs = make_jobs(args)
+    started = time.perf_counter()
+    if args.workers > 1 and len(jobs) > 1:
+        # Jobs are ordered by book, so contiguous chunks keep a book's
+        # sweep on one worker, which then loads its bars and indicators once
+        workers = min(args.workers, len(jobs))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(run_job, jobs, chunksize=max(1, len(jobs) // workers)))
+    else:
+        results = [run_job(job) for job in jobs]
+    wall = time.perf_counter() - started
+
+    print_results(results, wall)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+# bar_codec.py
+
+import base64
+import numpy as np
+
+# OHLCV columns carried by every bar set, besides the "ts" timestamps
+# (int64 nanoseconds since the epoch, UTC).
+BAR_FIELDS = ("open", "high", "low", "close", "volume")
+
+# Encodings the market data agent can produce, in order of preference.
+#   base64: raw little-endian NumPy buffers, base64-encoded
+#   json:   plain JSON number arrays
+ENCODINGS = ("base64", "json")
+
+def empty_bars() -> dict:
+    bars = {"ts": np.empty(0, dtype="<i8")}
+    for field in BAR_FIELDS:
+        bars[field] = np.empty(0, dtype="<f8")
+    return bars
+
+def bars_from_frame(df) -> dict:
+    """
+    Converts a yfinance OHLCV DataFrame into a dict of NumPy columns
+    without touching individual rows.
+    """
+    index = df.index
+    if getattr(index, "tz", None) is not None:
+        index = index.tz_convert("UTC").tz_localize(None)
+    bars = {"ts": np.asarray(index.values).astype("datetime64[ns]").view("<i8")}
+    for field in BAR_FIELDS:
+        column = field.capitalize()
+        if column in df.columns:
+            bars[field] = df[column].to_numpy(dtype="<f8", na_value=np.nan)
+        else:
+            bars[field] = np.full(len(df), np.nan)
+    return bars
+
+def negotiate(accepted) -> str:
+    """
+    Picks the first encoding from the client's preference list that we can
+    produce. Falls back to JSON when nothing matches.
+    """
+    if isinstance(accepted, str):
+        accepted = [accepted]
+    for encoding in accepted or ():
+        if encoding in ENCODINGS:
+            return encoding
+    return "json"
+
+def format_dates(ts: np.ndarray) -> list:
+    """
+    ISO8601 strings for an int64 nanosecond timestamp array. Daily bars
+    (all at midnight) are rendered as plain dates.
+    """
+    unit = "D" if not np.any(ts % 86_400_000_000_000) else "s"
+    return np.datetime_as_string(ts.view("datetime64[ns]"), unit=unit).tolist()
+
+def encode_bars(bars: dict, encoding: str) -> dict:
+    """
+    Columnar payload for a bar set:
+      json:   { "encoding": "json", "dates": [...], "open": [...], ... }
+      base64: { "encoding": "base64", "length": n,
+                "ts": {"dtype": "<i8", "data": b64}, "open": {...}, ... }
+    """
+    if encoding == "base64":
+        payload = {"encoding": "base64", "length": int(len(bars["ts"]))}
+        for field in ("ts",) + BAR_FIELDS:
+            column = np.ascontiguousarray(bars[field])
+            payload[field] = {
+                "dtype": column.dtype.str,
+                "data": base64.b64encode(column.tobytes()).decode("ascii")
+            }
+        return payload
+
+    payload = {"encoding": "json", "dates": format_dates(bars["ts"])}
+    for field in BAR_FIELDS:
+        column = bars[field]
+        if np.isnan(column).any():
+            # JSON has no NaN; missing values become null
+            payload[field] = np.where(np.isnan(column), None, column).tolist()
+        else:
+            payload[field] = column.tolist()
+    return payload
+
+def decode_bars(payload: dict) -> dict:
+    """
+    Inverse of encode_bars(): returns { "ts": int64 ns array, "open": ..., ... }.
+    """
+    if payload.get("encoding") == "base64":
+        bars = {}
+        for field in ("ts",) + BAR_FIELDS:
+            column = payload[field]
+            bars[field] = np.frombuffer(base64.b64decode(column["data"]), dtype=column["dtype"])
+        return bars
+
+    bars = {"ts": np.array(payload.get("dates", []), dtype="datetime64[ns]").view("<i8")}
+    for field in BAR_FIELDS:
+        bars[field] = np.array(payload.get(field, []), dtype="<f8")
+    return bars
+
+def bars_to_frame(bars: dict):
+    """
+    pandas DataFrame indexed by UTC timestamp, one column per OHLCV field.
+    """
+    import pandas as pd
+    index = pd.DatetimeIndex(bars["ts"].view("datetime64[ns]"), tz="UTC")
+    return pd.DataFrame({field: bars[field] for field in BAR_FIELDS}, index=index)
@@ -0,0 +1,68 @@
+# bench/harness.py
+
+import os
+import sys
+import importlib.util
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for _path in (ROOT, os.path.join(ROOT, "market_data_agent")):
+    if _path not in sys.path:
+        sys.path.insert(0, _path)
+
+# Symbol universe shared with the backtester
+from market_sources import universe
+
+# Agent directory -> port, in boot order for the load test: the Technical
+# Agent goes last because its subscription starts the bar replay
+AGENTS = [
+    ("market_data_agent", 5001),
+    ("compliance_agent", 5008),
+    ("execution_agent", 5007),
+    ("risk_agent", 5006),
+    ("strategy_agent", 5005),
+    ("news_agent", 5003),
+    ("fundamentals_agent", 5004),
+    ("technical_analysis_agent", 5002),
+]
+
+def offline_env(workdir: str, symbols: list) -> dict:
+    """
+    Environment that points every agent at its local stand-in (synthetic
+    market data, local LLM, mock broker, stub fundamentals, empty news
+    replay) and keeps all state files inside `workdir`.
+    """
+    news_file = os.path.join(workdir, "news.jsonl")
+    open(news_file, "a").close()
+    env = dict(os.environ)
+    env.update({
+        "PYTHONPATH": os.pathsep.join(filter(None, [ROOT, os.environ.get("PYTHONPATH")])),
+        "MARKET_DATA_SOURCE": "synthetic",
+        "MARKET_DATA_STORE_DIR": os.path.join(workdir, "bar_store"),
+        "TECHNICAL_UNIVERSE": ",".join(symbols),
+        "RISK_UNIVERSE": ",".join(symbols),
+        "STRATEGY_LLM_BACKEND": "local",
+        "STRATEGY_CACHE_PATH": os.path.join(workdir, "strategy_cache.sqlite3"),
+        "EXECUTION_BROKER": "mock",
+        "AUDIT_DIR": os.path.join(workdir, "audit"),
+        "FUNDAMENTALS_PROVIDER": "stub",
+        "FUNDAMENTALS_UNIVERSE": ",".join(symbols),
+        "FUNDAMENTALS_STORE_PATH": os.path.join(workdir, "fundamentals_snapshot.npz"),
+        "NEWS_SOURCES": "replay:" + news_file,
+    })
+    return env
+
+def load_agent(agent: str):
+    """
+    Imports `<agent>/app.py` in this process under the name `<agent>_app`
+    (every agent's module is called app). The agent's directory stays on
+    sys.path for its sibling modules.
+    """
+    directory = os.path.join(ROOT, agent)
+    for path in (ROOT, directory):
+        if path not in sys.path:
+            sys.path.insert(0, path)
+    spec = importlib.util.spec_from_file_location(f"{agent}_app", os.path.join(directory, "app.py"))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
@@ -0,0 +1,297 @@
+# bench/load_test.py
+#
+# End-to-end load test. Boots all eight agents as local processes against
+# offline stand-ins (synthetic market data, local LLM, mock broker), replays
+# synthetic bars ahead of "now" through the Market Data Agent's /subscribe
+# stream and lets the Technical Agent turn them into alerts, which flow
+# through Strategy -> Risk -> Execution -> Compliance. Reports throughput
+# and p50/p99 latency per hop from every agent's /metrics, and exits
+# non-zero when any MCP call or event/RPC handler failed during the run.
+#
+#   python bench/load_test.py --symbols 20 --alert-rate 20 --duration 30
+#   python bench/load_test.py --transport ws --llm-latency 0.5 --json run.json
+#   python bench/load_test.py --cohost   (all agents in one process, see cohost.py)
+#
+# Any other config.py variable (e.g. STRATEGY_COALESCE_WINDOW) can be set
+# in the environment and is passed on to the agents.
+
+import os
+import sys
+import json
+import math
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+import requests
+
+from harness import ROOT, AGENTS, universe, offline_env
+
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "market_data_agent"))
+from bar_store import BarStore, span_ns
+from market_sources import SyntheticSource
+
+# Technical alerts per symbol per synthetic price cycle (RSI crossings plus
+# Bollinger/MACD transitions), measured with the default SyntheticSource;
+# used to turn --alert-rate into a bar replay rate
+ALERTS_PER_CYCLE = 7.0
+
+INTERVAL = "1d"
+
+
+def write_replay(directory: str, symbols: list, steps: int):
+    """
+    Writes `steps` synthetic bars per symbol, starting with the first bar
+    after the current (forming) one, as a BarStore for the replay feed.
+    They continue the history the synthetic source serves for warm-up.
+    """
+    source = SyntheticSource()
+    step = span_ns(INTERVAL)
+    start = (time.time_ns() // step + 1) * step
+    store = BarStore(directory)
+    for sym in symbols:
+        store.replace(sym, INTERVAL, source.bars(sym, INTERVAL, start, start + (steps - 1) * step),
+                      covered_from=start)
+
+
+def start_agents(env: dict, workdir: str, timeout: float, cohost: bool = False) -> list:
+    if cohost:
+        proc = _spawn(os.path.join(ROOT, "cohost.py"), "cohost", env, workdir)
+        for agent, port in AGENTS:
+            _wait_ready(agent, port, proc, "cohost", timeout)
+        return [proc]
+    procs = []
+    for agent, port in AGENTS:
+        procs.append(_spawn(os.path.join(ROOT, agent, "app.py"), agent, env, workdir))
+        _wait_ready(agent, port, procs[-1], agent, timeout)
+    return procs
+
+
+def _spawn(script: str, name: str, env: dict, workdir: str):
+    log = open(os.path.join(workdir, f"{name}.log"), "w")
+    return subprocess.Popen([sys.executable, script], env=env, cwd=workdir, stdout=log, stderr=subprocess.STDOUT)
+
+
+def _wait_ready(agent: str, port: int, proc, log: str, timeout: float):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"{agent} exited with code {proc.returncode}; see {log}.log")
+        try:
+            if requests.get(f"http://127.0.0.1:{port}/metrics", timeout=1).ok:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"{agent} not ready on port {port} after {timeout}s")
+
+
+def stop_agents(procs: list):
+    for proc in procs:
+        proc.terminate()
+    for proc in procs:
+        try:
+            proc.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+def rss_mb(procs: list) -> float:
+    """
+    Total resident memory of the agent processes in MB (Linux only, else None).
+    """
+    total = 0
+    for proc in procs:
+        try:
+            with open(f"/proc/{proc.pid}/status") as f:
+                total += next(int(line.split()[1]) for line in f if line.startswith("VmRSS:"))
+        except (OSError, StopIteration):
+            return None
+    return round(total / 1024.0, 1)
+
+
+def metrics_of(agent: str) -> dict:
+    port = dict(AGENTS)[agent]
+    try:
+        return requests.get(f"http://127.0.0.1:{port}/metrics", timeout=5).json()
+    except requests.RequestException as e:
+        return {"error": str(e)}
+
+
+def run(args) -> dict:
+    symbols = universe(args.symbols)
+    bar_rate = args.bar_rate or args.alert_rate * SyntheticSource().cycle / (ALERTS_PER_CYCLE * len(symbols))
+    steps = max(1, math.ceil(args.duration * bar_rate))
+    workdir = args.workdir or tempfile.mkdtemp(prefix="im-bench-")
+    os.makedirs(workdir, exist_ok=True)
+
+    replay_dir = os.path.join(workdir, "replay")
+    write_replay(replay_dir, symbols, steps)
+    env = offline_env(workdir, symbols)
+    env.update({
+        "MARKET_DATA_FEED": "replay",
+        "MARKET_DATA_FEED_INTERVAL": INTERVAL,
+        "MARKET_DATA_REPLAY_DIR": replay_dir,
+        "MARKET_DATA_REPLAY_RATE": str(bar_rate),
+        "MARKET_DATA_SYNTHETIC_LATENCY": str(args.market_latency),
+        "TECHNICAL_MODE": "stream",
+        "STRATEGY_LLM_LOCAL_LATENCY": str(args.llm_latency),
+        "MOCK_BROKER_LATENCY": str(args.broker_latency),
+        "A2A_TRANSPORT": args.transport,
+    })
+    print(f"[Bench] {len(symbols)} symbols, {steps} bars each at {bar_rate:.2f} bars/s, "
+          f"transport={'in-process' if args.cohost else args.transport}, workdir={workdir}")
+
+    procs = []
+    try:
+        procs = start_agents(env, workdir, args.startup_timeout, cohost=args.cohost)
+        started = time.monotonic()
+        print("[Bench] All agents up; replaying bars.")
+        while metrics_of("market_data_agent").get("feed", {}).get("steps", 0) < steps:
+            if time.monotonic() - started > args.duration * 3 + 60:
+                print("[Bench] Replay did not finish in time; reporting what arrived.")
+                break
+            time.sleep(0.5)
+        replayed = time.monotonic()
+        _drain(args.drain)
+        finished = time.monotonic()
+        snapshot = {agent: metrics_of(agent) for agent, _ in AGENTS}
+        memory = rss_mb(procs)
+    finally:
+        stop_agents(procs)
+        if not args.keep and not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report = _report(snapshot, symbols, steps, replayed - started, finished - started)
+    report["processes"], report["rss_mb"] = len(procs), memory
+    return report
+
+
+def _drain(quiet: float):
+    """
+    Waits until no audit record has arrived for `quiet` seconds and no
+    order is in flight.
+    """
+    last, since = None, time.monotonic()
+    while time.monotonic() - since < quiet:
+        records = metrics_of("compliance_agent").get("audit", {}).get("records")
+        in_flight = metrics_of("execution_agent").get("engine", {}).get("in_flight", 0)
+        if records != last or in_flight:
+            last, since = records, time.monotonic()
+        time.sleep(0.2)
+
+
+def _report(snapshot: dict, symbols: list, steps: int, replay_seconds: float, total_seconds: float) -> dict:
+    def count(agent, key):
+        return snapshot.get(agent, {}).get("latency", {}).get(key, {}).get("count", 0)
+
+    engine = snapshot.get("execution_agent", {}).get("engine", {})
+    audit = snapshot.get("compliance_agent", {}).get("audit", {})
+    throughput = {
+        "bars": steps * len(symbols),
+        "technical_alerts": count("strategy_agent", "a2a{type=technical_alert}"),
+        "strategies": count("risk_agent", "a2a{type=new_strategy}"),
+        "approved": count("execution_agent", "a2a{type=approve_trade}"),
+        "vetoed": count("execution_agent", "a2a{type=veto_trade}"),
+        "orders": engine.get("orders", 0),
+        "fills": engine.get("filled", 0),
+        "fill_reports": count("compliance_agent", "a2a{type=order_executed}"),
+        "audit_records": audit.get("records", 0),
+    }
+    hops = {
+        agent: {
+            key: hist for key, hist in data.get("latency", {}).items() if hist.get("count")
+        }
+        for agent, data in snapshot.items()
+    }
+    return {
+        "errors": _errors(snapshot),
+        "replay_seconds": round(replay_seconds, 3),
+        "total_seconds": round(total_seconds, 3),
+        "throughput": throughput,
+        "per_second": {key: round(value / replay_seconds, 2) if replay_seconds else None
+                       for key, value in throughput.items()},
+        "hops": hops,
+        "metrics": snapshot,
+    }
+
+
+def _errors(snapshot: dict) -> dict:
+    """
+    Failed MCP calls (caller side, "mcp" histograms) and handler errors
+    (events whose handler raised, "a2a", and JSON-RPC methods that raised,
+    "rpc"), summed over the agents, plus the agents whose /metrics could
+    not be read.
+    """
+    errors = {"mcp": 0, "handler": 0}
+    for data in snapshot.values():
+        for key, hist in data.get("latency", {}).items():
+            name = key.split("{", 1)[0]
+            if name == "mcp":
+                errors["mcp"] += hist.get("errors", 0)
+            elif name in ("a2a", "rpc"):
+                errors["handler"] += hist.get("errors", 0)
+    errors["unreachable"] = sorted(agent for agent, data in snapshot.items() if "error" in data)
+    return errors
+
+
+def failed(report: dict) -> bool:
+    errors = report["errors"]
+    return bool(errors["mcp"] or errors["handler"] or errors["unreachable"])
+
+
+def print_report(report: dict):
+    print(f"\nReplay {report['replay_seconds']:.1f}s, drained after {report['total_seconds']:.1f}s, "
+          f"{report['processes']} processes using {report['rss_mb']} MB RSS\n")
+    print(f"{'throughput':<20}{'count':>10}{'per sec':>10}")
+    for key, value in report["throughput"].items():
+        print(f"{key:<20}{value:>10}{report['per_second'][key] or 0:>10.2f}")
+    print(f"\n{'agent':<26}{'histogram':<56}{'count':>8}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for agent, hists in report["hops"].items():
+        for key, hist in hists.items():
+            print(f"{agent:<26}{key:<56}{hist['count']:>8}{hist['p50_ms']:>10.2f}"
+                  f"{hist['p99_ms']:>10.2f}{hist['max_ms']:>10.2f}")
+    errors = report["errors"]
+    print(f"\nErrors: {errors['mcp']} MCP calls, {errors['handler']} handlers"
+          + (f", /metrics unreachable for {errors['unreachable']}" if errors["unreachable"] else ""))
+    failing = [(agent, key, hist["errors"]) for agent, data in report["metrics"].items()
+               for key, hist in data.get("latency", {}).items() if hist.get("errors")]
+    if failing:
+        print(f"{'agent':<26}{'histogram':<56}{'errors':>8}")
+        for agent, key, count in failing:
+            print(f"{agent:<26}{key:<56}{count:>8}")
+    if failed(report):
+        print("[Bench] FAILED: errors during the run; the numbers above do not measure a healthy pipeline.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end load test against offline stand-ins.")
+    parser.add_argument("--symbols", type=int, default=20, help="universe size")
+    parser.add_argument("--alert-rate", type=float, default=10.0,
+                        help="target technical alerts per second (approximate; sets the bar rate)")
+    parser.add_argument("--bar-rate", type=float, help="replay timestamps per second (overrides --alert-rate)")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds of bars to replay")
+    parser.add_argument("--transport", choices=("http", "ws"), default="http", help="A2A transport")
+    parser.add_argument("--cohost", action="store_true", help="host all agents in one process (cohost.py)")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="seconds per local LLM call")
+    parser.add_argument("--broker-latency", type=float, default=0.05, help="mock broker ack/fill latency")
+    parser.add_argument("--market-latency", type=float, default=0.0, help="seconds per synthetic upstream request")
+    parser.add_argument("--drain", type=float, default=3.0, help="quiet seconds that end the run")
+    parser.add_argument("--startup-timeout", type=float, default=60.0)
+    parser.add_argument("--workdir", help="keep state and agent logs here")
+    parser.add_argument("--keep", action="store_true", help="keep the temporary workdir")
+    parser.add_argument("--json", help="also write the report (with raw /metrics) to this file")
+    args = parser.parse_args()
+
+    report = run(args)
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    return 1 if failed(report) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
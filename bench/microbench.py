@@ -0,0 +1,141 @@
+# bench/microbench.py
+#
+# Microbenchmarks for hot paths, run in-process against the offline
+# stand-ins:
+#   - compute_rsi (Technical Agent) on 30/250/1000 closes
+#   - get_historical (Market Data Agent), cache hit plus JSON serialization,
+#     for each response format
+#   - check_risk_and_respond (Risk Agent) on a warmed-up risk model, with
+#     the outgoing event captured instead of sent
+#
+#   python bench/microbench.py
+#   python bench/microbench.py --save before.json
+#   python bench/microbench.py --compare before.json
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import statistics
+import numpy as np
+import pandas as pd
+
+from harness import ROOT, universe, offline_env, load_agent
+
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "market_data_agent"))
+from market_sources import SyntheticSource
+
+
+def measure(fn, min_time: float = 0.5, repeat: int = 5) -> dict:
+    """
+    Calls fn() in `repeat` rounds of a calibrated number of calls each
+    (about min_time/repeat seconds per round). Returns per-call
+    microseconds: median and best round.
+    """
+    number, elapsed = 1, 0.0
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time / repeat / 4:
+            break
+        number *= 4
+    number = max(1, int(number * (min_time / repeat) / elapsed))
+    rounds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        rounds.append(1e6 * (time.perf_counter() - start) / number)
+    return {"median_us": statistics.median(rounds), "best_us": min(rounds), "calls": number * repeat}
+
+
+def rsi_cases(technical) -> dict:
+    rng = np.random.default_rng(0)
+    cases = {}
+    for n in (30, 250, 1000):
+        prices = pd.Series(100.0 * np.exp(np.cumsum(rng.normal(0.0, 0.01, n))))
+        cases[f"compute_rsi[{n}]"] = lambda prices=prices: technical.compute_rsi(prices)
+    return cases
+
+
+def history_cases(market) -> dict:
+    cases = {}
+    for period in ("1y", "5y"):
+        for fmt, encodings in (("rows", None), ("columns", ["json"]), ("columns", ["base64"])):
+            def call(period=period, fmt=fmt, encodings=encodings):
+                return json.dumps(market.get_historical("AAPL", period, "1d", fmt, encodings))
+            call()  # fill the store and cache outside the timed rounds
+            label = fmt if encodings is None else f"{fmt}/{encodings[0]}"
+            cases[f"get_historical[{period},{label}]"] = call
+    return cases
+
+
+def risk_cases(risk, symbols: list) -> dict:
+    source = SyntheticSource()
+    now = time.time_ns()
+    bars = {sym: source.bars(sym, "1d", now - 2 * 365 * 86400 * 10**9, now) for sym in risk.RISK_ENGINE.symbols}
+    risk.RISK_ENGINE.update_from_bars(bars)
+    risk.RISK_ENGINE.factor()
+
+    sent = []
+    risk.send_event = lambda url, event_type, content, **kwargs: sent.append(event_type)
+    cases = {}
+    for legs in (3, 10):
+        plan = [{"ticker": sym, "target_weight": round(0.9 / legs, 4), "confidence": 0.6}
+                for sym in symbols[:legs]]
+        cases[f"check_risk_and_respond[{legs} legs]"] = lambda plan=plan: risk.check_risk_and_respond(plan, "bench")
+    return cases
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hot-path microbenchmarks.")
+    parser.add_argument("--symbols", type=int, default=20, help="risk universe size")
+    parser.add_argument("--min-time", type=float, default=0.5, help="seconds per benchmark")
+    parser.add_argument("--filter", help="only benchmarks whose name contains this")
+    parser.add_argument("--save", help="write results to this JSON file")
+    parser.add_argument("--compare", help="show the change against results saved earlier")
+    args = parser.parse_args()
+
+    symbols = universe(args.symbols)
+    workdir = tempfile.mkdtemp(prefix="im-microbench-")
+    os.environ.update(offline_env(workdir, symbols))
+
+    # Agent prints (e.g. every risk decision) would swamp the table
+    stdout, sys.stdout = sys.stdout, open(os.devnull, "w")
+    try:
+        cases = {}
+        cases.update(rsi_cases(load_agent("technical_analysis_agent")))
+        cases.update(history_cases(load_agent("market_data_agent")))
+        cases.update(risk_cases(load_agent("risk_agent"), symbols))
+        results = {}
+        for name, fn in cases.items():
+            if args.filter and args.filter not in name:
+                continue
+            results[name] = measure(fn, min_time=args.min_time)
+    finally:
+        sys.stdout = stdout
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print(f"{'benchmark':<48}{'median us':>12}{'best us':>12}{'calls':>10}" + ("{:>10}".format("change") if baseline else ""))
+    for name, result in results.items():
+        line = f"{name:<48}{result['median_us']:>12.1f}{result['best_us']:>12.1f}{result['calls']:>10}"
+        if name in baseline:
+            line += f"{100.0 * (result['median_us'] / baseline[name]['median_us'] - 1.0):>+9.1f}%"
+        print(line)
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+# bench/transport_check.py
+#
+# Checks that the WebSocket A2A transport delivers between peers that do
+# and do not have msgpack installed. For each (sender, receiver) pair a
+# receiver process is started with A2A_TRANSPORT=ws, optionally with
+# msgpack hidden, and this process sends it a batch of events; every one
+# must arrive over the WebSocket. Exits non-zero on any missing event.
+#
+#   python bench/transport_check.py
+
+import os
+import sys
+import time
+import argparse
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Port of the receiver's (unused) HTTP /events URL; WebSocket events go to
+# this + A2A_WS_PORT_OFFSET
+_PORT = 5099
+_EVENTS = ["technical_alert", "approve_trade", "order_executed", "veto_trade"] * 5
+
+
+def _hide_msgpack():
+    # A None entry makes "import msgpack" raise ImportError
+    sys.modules["msgpack"] = None
+
+def receive(port: int):
+    """
+    Receiver process: prints one line per event handled.
+    """
+    sys.path.insert(0, ROOT)
+    import a2a_transport
+
+    def handle_event(evt_type, content):
+        print(f"event {evt_type} {content['n']}", flush=True)
+        return {"status": "ok"}, 200
+
+    a2a_transport.serve(handle_event, port, host="127.0.0.1")
+    print(f"ready {','.join(a2a_transport.SUBPROTOCOLS)}", flush=True)
+    while True:
+        time.sleep(1.0)
+
+def check(sender_msgpack: bool, receiver_msgpack: bool) -> bool:
+    env = dict(os.environ, A2A_TRANSPORT="ws", PYTHONPATH=os.pathsep.join(
+        filter(None, [ROOT, os.environ.get("PYTHONPATH")])))
+    args = [sys.executable, __file__, "--receive", str(_PORT)]
+    if not receiver_msgpack:
+        args.append("--no-msgpack")
+    proc = subprocess.Popen(args, env=env, stdout=subprocess.PIPE, text=True)
+    try:
+        for line in proc.stdout:
+            if line.startswith("ready"):
+                break
+        else:
+            print("  receiver did not start")
+            return False
+        time.sleep(0.5)
+
+        import a2a_transport
+        a2a_transport.SUBPROTOCOLS = ["a2a.msgpack", "a2a.json"] if sender_msgpack else ["a2a.json"]
+        # A fresh sender per check, so each one opens its own connection
+        a2a_transport._SENDER = a2a_transport._WSSender()
+        url = f"http://127.0.0.1:{_PORT}/events"
+        for n, evt_type in enumerate(_EVENTS):
+            a2a_transport.send(url, {"type": evt_type, "content": {"n": n}})
+
+        received = set()
+        deadline = time.monotonic() + 10.0
+        while len(received) < len(_EVENTS) and time.monotonic() < deadline:
+            line = proc.stdout.readline()
+            if line.startswith("event "):
+                received.add(int(line.split()[2]))
+        missing = sorted(set(range(len(_EVENTS))) - received)
+        # Let the last ack arrive before the receiver goes away
+        time.sleep(0.5)
+        if missing:
+            print(f"  missing events {missing}")
+        return not missing
+    finally:
+        proc.kill()
+        proc.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check WebSocket A2A delivery with and without msgpack.")
+    parser.add_argument("--receive", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--no-msgpack", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.no_msgpack:
+        _hide_msgpack()
+    if args.receive:
+        return receive(args.receive)
+
+    sys.path.insert(0, ROOT)
+    os.environ["A2A_TRANSPORT"] = "ws"
+    try:
+        import msgpack  # noqa: F401
+    except ImportError:
+        print("msgpack is not installed here; only the JSON-to-JSON case can be checked.")
+        pairs = [(False, False)]
+    else:
+        pairs = [(True, True), (True, False), (False, True), (False, False)]
+
+    failed = 0
+    for sender, receiver in pairs:
+        ok = check(sender, receiver)
+        failed += not ok
+        print(f"sender msgpack={sender!s:<5} receiver msgpack={receiver!s:<5} "
+              f"{'ok' if ok else 'FAILED'}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,128 @@
+# cohost.py
+#
+# Single-process mode: hosts all agents (or a subset) in one interpreter,
+# so heavy libraries are imported once. Events and JSON-RPC calls between
+# co-hosted agents go through local_bus instead of localhost HTTP; each
+# agent keeps its HTTP port (for /metrics, /subscribe, /audit, ... and for
+# peers running elsewhere) and runs its handlers on its own thread pool.
+#
+#   python cohost.py
+#   python cohost.py --agents market_data_agent,strategy_agent,risk_agent
+
+import os
+import sys
+import time
+import argparse
+import threading
+import contextvars
+import importlib.util
+from urllib.parse import urlsplit
+
+from werkzeug.serving import make_server
+
+from config import (
+    MARKET_DATA_AGENT_URL,
+    TECHNICAL_AGENT_EVENT_URL,
+    NEWS_AGENT_EVENT_URL,
+    FUNDAMENTALS_AGENT_EVENT_URL,
+    STRATEGY_AGENT_EVENT_URL,
+    RISK_AGENT_EVENT_URL,
+    EXECUTION_AGENT_EVENT_URL,
+    COMPLIANCE_AGENT_EVENT_URL,
+    COHOST_WORKERS
+)
+from a2a_transport import serve as serve_events
+import local_bus
+import startup
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Agent directory -> the URL peers reach it on, in start order: the Market
+# Data Agent first (the others warm up from it), the Technical Agent last
+# (its stream subscription starts the bar feed)
+AGENTS = [
+    ("market_data_agent", MARKET_DATA_AGENT_URL),
+    ("compliance_agent", COMPLIANCE_AGENT_EVENT_URL),
+    ("execution_agent", EXECUTION_AGENT_EVENT_URL),
+    ("risk_agent", RISK_AGENT_EVENT_URL),
+    ("strategy_agent", STRATEGY_AGENT_EVENT_URL),
+    ("news_agent", NEWS_AGENT_EVENT_URL),
+    ("fundamentals_agent", FUNDAMENTALS_AGENT_EVENT_URL),
+    ("technical_analysis_agent", TECHNICAL_AGENT_EVENT_URL),
+]
+
+
+def load(agent: str):
+    """
+    Imports `<agent>/app.py` as module `<agent>_app` in a context of its
+    own, so the tracing.configure() call in the module names that context
+    only. Returns (module, context).
+    """
+    directory = os.path.join(ROOT, agent)
+    if directory not in sys.path:
+        sys.path.insert(0, directory)
+    spec = importlib.util.spec_from_file_location(f"{agent}_app", os.path.join(directory, "app.py"))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    context = contextvars.copy_context()
+    context.run(spec.loader.exec_module, module)
+    return module, context
+
+
+def host(agent: str, url: str, workers: int):
+    """
+    Loads an agent, routes its URL through local_bus and serves its Flask
+    app on the agent's usual port. Returns (LocalAgent, module).
+    """
+    module, context = load(agent)
+    port = urlsplit(url).port
+    local = local_bus.register(
+        local_bus.LocalAgent(agent, context, handle_event=getattr(module, "handle_event", None),
+                             rpc_methods=getattr(module, "RPC_METHODS", None), workers=workers),
+        event_url=url, rpc_url=url
+    )
+    server = make_server("0.0.0.0", port, _in_context(context, module.app), threaded=True)
+    threading.Thread(target=server.serve_forever, name=f"{agent}-http", daemon=True).start()
+    if hasattr(module, "handle_event"):
+        context.copy().run(serve_events, module.handle_event, port)
+    return local, module
+
+
+def _in_context(context, wsgi_app):
+    """
+    WSGI app that handles every request in a copy of `context`.
+    """
+    def app(environ, start_response):
+        return context.copy().run(wsgi_app, environ, start_response)
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Host the agents in a single process.")
+    parser.add_argument("--agents", default=",".join(agent for agent, _ in AGENTS),
+                        help="comma-separated agent directories to host (others stay remote)")
+    parser.add_argument("--workers", type=int, default=COHOST_WORKERS, help="handler threads per agent")
+    args = parser.parse_args()
+
+    wanted = set(args.agents.split(","))
+    unknown = wanted - {agent for agent, _ in AGENTS}
+    if unknown:
+        parser.error(f"unknown agents: {sorted(unknown)}")
+
+    started = time.perf_counter()
+    hosted = [host(agent, url, args.workers) for agent, url in AGENTS if agent in wanted]
+    for local, module in hosted:
+        if hasattr(module, "start"):
+            local.context.copy().run(module.start)
+        local.context.copy().run(startup.ready)
+    print(f"[Cohost] {len(hosted)} agents up in {time.perf_counter() - started:.1f}s: "
+          f"{', '.join(local.name for local, _ in hosted)}")
+
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,36 +1,115 @@
 # compliance_agent/app.py
 
-import os
-import json
+from datetime import datetime, timezone
 from flask import Flask, request, jsonify
 
+from config import (
+    AUDIT_DIR,
+    AUDIT_DURABILITY,
+    AUDIT_FSYNC_INTERVAL,
+    AUDIT_FSYNC_BATCH,
+    AUDIT_SEGMENT_BYTES,
+    AUDIT_SEGMENT_SECONDS
+)
+from a2a_transport import serve as serve_events
+import tracing
+import startup
+from audit_writer import AuditWriter
+from audit_index import AuditIndex
+
 app = Flask(__name__)
-AUDIT_LOG = "audit.log"
+tracing.configure("ComplianceAgent")
+
+# Sparse (ticker, origin, time) -> byte-range index, extended on every commit
+INDEX = AuditIndex(AUDIT_DIR)
+
+# Segmented, group-committed audit log written by a background thread
+AUDIT = AuditWriter(
+    AUDIT_DIR,
+    durability=AUDIT_DURABILITY,
+    fsync_interval=AUDIT_FSYNC_INTERVAL,
+    fsync_batch=AUDIT_FSYNC_BATCH,
+    segment_bytes=AUDIT_SEGMENT_BYTES,
+    segment_seconds=AUDIT_SEGMENT_SECONDS,
+    on_commit=INDEX.on_commit
+)
 
 @app.route("/events", methods=["POST"])
 def receive_event():
     """
-    Expects: { "type": "order_executed", "content": { "trades": [ {ticker, filled_weight, timestamp}, ... ] } }
+    JSON-over-HTTP transport for handle_event().
     """
     payload = request.get_json()
-    evt_type = payload.get("type")
-    content = payload.get("content", {})
+    with tracing.received(payload):
+        body, status = handle_event(payload.get("type"), payload.get("content", {}))
+    return jsonify(body), status
 
+def handle_event(evt_type: str, content: dict):
+    """
+    Expects: { "type": "order_executed", "content": { "trades": [ {ticker, filled_weight, timestamp, origin}, ... ] } }
+    """
     if evt_type == "order_executed":
         trades = content.get("trades", [])
-        # Append to audit.log
-        with open(AUDIT_LOG, "a") as f:
-            for trade in trades:
-                f.write(json.dumps(trade) + "\n")
+        # Group-committed with concurrent requests; with AUDIT_DURABILITY="fsync"
+        # this returns only once the trades are on disk
+        try:
+            with tracing.timed("audit_write"):
+                AUDIT.append(trades)
+        except OSError as e:
+            print(f"[ComplianceAgent] Failed to log {len(trades)} trades: {e}")
+            return {"error": str(e)}, 503
         print(f"[ComplianceAgent] Logged {len(trades)} trades.")
-        return jsonify({"status": "logged"}), 200
+        return {"status": "logged"}, 200
     else:
-        return jsonify({"error": "unsupported event type"}), 400
+        return {"error": "unsupported event type"}, 400
 
-if __name__ == "__main__":
-    # Ensure audit log exists
-    if not os.path.exists(AUDIT_LOG):
-        open(AUDIT_LOG, "w").close()
+@app.route("/audit", methods=["GET"])
+def audit():
+    """
+    Query the audit log, e.g.
+        GET /audit?ticker=AAPL&start=2024-05-07&end=2024-05-08&origin=technical_alert&limit=1000
+    start/end are epoch seconds or ISO 8601 (UTC unless an offset is given).
+    Every filter is optional.
+    """
+    try:
+        start = _parse_time(request.args.get("start"))
+        end = _parse_time(request.args.get("end"))
+        limit = int(request.args.get("limit", 1000))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    trades = INDEX.query(
+        ticker=request.args.get("ticker"),
+        start=start,
+        end=end,
+        origin=request.args.get("origin"),
+        limit=limit
+    )
+    return jsonify({"trades": trades, "count": len(trades)})
+
+def _parse_time(value: str) -> float:
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        parsed = datetime.fromisoformat(value)
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=timezone.utc)
+        return parsed.timestamp()
 
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    """
+    Audit writer counters (records, fsyncs, segments), index size and
+    latency histograms (audit_write, per-hop delivery).
+    """
+    return jsonify({"audit": AUDIT.stats(), "index": INDEX.stats(), "latency": tracing.snapshot(),
+                    "startup": startup.report()})
+
+startup.mark("imported")
+
+if __name__ == "__main__":
     print("[ComplianceAgent] Listening on port 5008 for order_executed events.")
+    serve_events(handle_event, 5008)
+    startup.ready()
     app.run(host="0.0.0.0", port=5008)
@@ -0,0 +1,313 @@
+# compliance_agent/audit_index.py
+
+import os
+import json
+import zlib
+import mmap
+import time
+import threading
+from array import array
+import numpy as np
+
+from audit_writer import SEGMENT_RE, segment_name
+
+# One entry per (ticker, origin) per committed batch: where that group's
+# lines sit in the segment and the time span they cover
+ENTRY = np.dtype([
+    ("ticker", "<u4"),
+    ("origin", "<u4"),
+    ("ts_min", "<f8"),
+    ("ts_max", "<f8"),
+    ("segment", "<u4"),
+    ("length", "<u4"),
+    ("offset", "<u8"),
+])
+
+# A group-commit batch is indexed in blocks of at most this many lines, which
+# bounds how much a query reads per matching entry
+BLOCK_LINES = 256
+
+# Entries per chunk summarised by (min ts_min, max ts_max) in memory
+CHUNK = 4096
+
+def key_hash(value) -> int:
+    return zlib.crc32(str(value).encode()) if value is not None else 0
+
+
+class AuditIndex:
+    """
+    Sparse, append-only index over the audit log segments (audit.idx).
+
+    Every commit of the AuditWriter adds one fixed-size entry per
+    (ticker, origin) group in each block of up to BLOCK_LINES lines:
+    crc32(ticker), crc32(origin), ts_min, ts_max and the (segment, offset,
+    length) byte range spanning that group's lines in the block. The index
+    is a small fraction of the log because lines are not indexed one by one.
+
+    Entries are appended in commit order, which is close to time order.
+    Every CHUNK entries are summarised in memory by their min/max
+    timestamps. A query compares against the chunk summaries first, then
+    masks only the entries of overlapping chunks (read through a memory map
+    of audit.idx). It coalesces the matching byte ranges and reads just
+    those through mmap of the segment, or of the few gzip members covering
+    them in a sealed segment. The lines are then filtered exactly, since
+    crc32 can collide and a range can include other tickers' lines.
+
+    On startup the last indexed segment is re-indexed from scratch, together
+    with any later segment, so a crash between a log write and its index
+    append leaves neither gaps nor duplicates.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.path = os.path.join(directory, "audit.idx")
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._blocks = {}
+        self._map = None
+        self._mapped = 0
+
+        self._recover()
+        self._file = open(self.path, "ab")
+        self.count = os.path.getsize(self.path) // ENTRY.itemsize
+        self._chunk_min, self._chunk_max = _summaries(self._entries(self.count))
+        self._catch_up()
+
+    def on_commit(self, seq: int, base: int, records: list, line_lengths: list):
+        """
+        AuditWriter hook: indexes one committed batch.
+        """
+        ends = base + np.cumsum(line_lengths, dtype=np.int64)
+        starts = ends - np.asarray(line_lengths, dtype=np.int64)
+        now = time.time()
+        entries = []
+        for block in range(0, len(records), BLOCK_LINES):
+            groups = {}
+            for i in range(block, min(block + BLOCK_LINES, len(records))):
+                key = (records[i].get("ticker"), records[i].get("origin"))
+                groups.setdefault(key, []).append(i)
+            for (ticker, origin), rows in groups.items():
+                # Untimestamped records are indexed at their commit time
+                # ("logged_at", see AuditWriter), as query() filters them
+                ts = [_timestamp(records[i], now) for i in rows]
+                entries.append((key_hash(ticker), key_hash(origin), min(ts), max(ts),
+                                seq, ends[rows[-1]] - starts[rows[0]], starts[rows[0]]))
+        self._append(np.array(entries, dtype=ENTRY))
+
+    def query(self, ticker: str = None, start: float = None, end: float = None,
+              origin: str = None, limit: int = 1000) -> list:
+        """
+        Trades matching every given filter, ordered by timestamp, at most `limit`.
+        """
+        lo = -np.inf if start is None else start
+        hi = np.inf if end is None else end
+        with self._lock:
+            count = self.count
+            chunk_min = self._chunk_min.copy()
+            chunk_max = self._chunk_max.copy()
+        entries = self._entries(count)
+
+        candidates = np.flatnonzero((chunk_max >= lo) & (chunk_min <= hi))
+        hits = []
+        for c in candidates:
+            part = entries[c * CHUNK:(c + 1) * CHUNK]
+            mask = (part["ts_max"] >= lo) & (part["ts_min"] <= hi)
+            if ticker is not None:
+                mask &= part["ticker"] == key_hash(ticker)
+            if origin is not None:
+                mask &= part["origin"] == key_hash(origin)
+            if mask.any():
+                hits.append(part[mask][["segment", "offset", "length"]])
+        if not hits:
+            return []
+
+        # Lines are written with compact separators, so most non-matching
+        # lines can be skipped before parsing
+        needle = json.dumps({"ticker": ticker}, separators=(",", ":"))[1:-1].encode() if ticker else None
+        trades = []
+        for seq, ranges in _coalesce(np.concatenate(hits)):
+            for line in self._read(seq, ranges):
+                if needle is not None and needle not in line:
+                    continue
+                trade = json.loads(line)
+                ts = _timestamp(trade)
+                if ticker is not None and trade.get("ticker") != ticker:
+                    continue
+                if origin is not None and trade.get("origin") != origin:
+                    continue
+                if (start is None or ts >= start) and (end is None or ts <= end):
+                    trades.append(trade)
+        trades.sort(key=lambda trade: _timestamp(trade, 0.0))
+        return trades[:limit]
+
+    def stats(self) -> dict:
+        return {"entries": self.count, "chunks": len(self._chunk_min)}
+
+    def _append(self, entries: np.ndarray):
+        with self._lock:
+            self._file.write(entries.tobytes())
+            self._file.flush()
+            first = self.count
+            self.count += len(entries)
+            # Extend the chunk summaries touched by the new entries
+            for c in range(first // CHUNK, (self.count - 1) // CHUNK + 1):
+                part = entries[max(0, c * CHUNK - first):(c + 1) * CHUNK - first]
+                if c < len(self._chunk_min):
+                    self._chunk_min[c] = min(self._chunk_min[c], part["ts_min"].min())
+                    self._chunk_max[c] = max(self._chunk_max[c], part["ts_max"].max())
+                else:
+                    self._chunk_min = np.append(self._chunk_min, part["ts_min"].min())
+                    self._chunk_max = np.append(self._chunk_max, part["ts_max"].max())
+
+    def _entries(self, count: int) -> np.ndarray:
+        """
+        The first `count` entries. They are complete on disk (count only
+        grows after an append is flushed), so the map covers exactly those
+        and never a partially written entry.
+        """
+        if count == 0:
+            return np.zeros(0, dtype=ENTRY)
+        with self._lock:
+            if self._map is None or self._mapped < count:
+                # Remap once the file has grown past the current mapping
+                self._map = np.memmap(self.path, dtype=ENTRY, mode="r", shape=(count,))
+                self._mapped = count
+            return self._map[:count]
+
+    def _recover(self):
+        """
+        Drops a torn last entry and every entry of the last indexed segment,
+        which _catch_up() then rebuilds from the log.
+        """
+        if not os.path.exists(self.path):
+            return
+        size = os.path.getsize(self.path)
+        count = size // ENTRY.itemsize
+        entries = np.memmap(self.path, dtype=ENTRY, mode="r", shape=(count,)) if count else None
+        keep = 0
+        if count:
+            keep = int(np.searchsorted(entries["segment"], entries["segment"][-1], side="left"))
+        del entries
+        if keep * ENTRY.itemsize != size:
+            with open(self.path, "r+b") as f:
+                f.truncate(keep * ENTRY.itemsize)
+
+    def _catch_up(self):
+        last = int(self._entries(self.count)["segment"][-1]) if self.count else 0
+        for name in sorted(os.listdir(self.directory)):
+            match = SEGMENT_RE.match(name)
+            if not match or int(match.group(1)) <= last:
+                continue
+            if match.group(2) and os.path.exists(os.path.join(self.directory, name[:-3])):
+                continue
+            seq = int(match.group(1))
+            records, lengths = [], []
+            for line in _segment_lines(os.path.join(self.directory, name)):
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    break
+                lengths.append(len(line))
+            if records:
+                self.on_commit(seq, 0, records, lengths)
+            last = seq
+        if last:
+            print(f"[ComplianceAgent] Audit index holds {self.count} entries.")
+
+    def _read(self, seq: int, ranges: list):
+        """
+        Yields the lines in [(offset, end), ...] of segment `seq`.
+        """
+        raw = os.path.join(self.directory, segment_name(seq))
+        if os.path.exists(raw):
+            try:
+                with open(raw, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+                    for offset, end in ranges:
+                        yield from m[offset:end].splitlines()
+                return
+            except FileNotFoundError:
+                pass
+        table = self._block_table(seq)
+        with open(os.path.join(self.directory, segment_name(seq, sealed=True)), "rb") as f, \
+                mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            inflated = {}
+            for offset, end in ranges:
+                first = int(np.searchsorted(table[:, 0], offset, side="right")) - 1
+                last = int(np.searchsorted(table[:, 0], end, side="left"))
+                data = b""
+                for member in range(first, last):
+                    # Neighbouring ranges often fall in the same member
+                    if member not in inflated:
+                        gz_end = int(table[member + 1, 1]) if member + 1 < len(table) else len(m)
+                        inflated = {k: v for k, v in inflated.items() if k >= first}
+                        inflated[member] = _gunzip_members(m[int(table[member, 1]):gz_end])
+                    data += inflated[member]
+                base = int(table[first, 0])
+                yield from data[offset - base:end - base].splitlines()
+
+    def _block_table(self, seq: int) -> np.ndarray:
+        table = self._blocks.get(seq)
+        if table is None:
+            raw = array("Q")
+            with open(os.path.join(self.directory, f"audit-{seq:08d}.blocks"), "rb") as f:
+                raw.frombytes(f.read())
+            table = self._blocks[seq] = np.frombuffer(raw, dtype=np.uint64).reshape(-1, 2).astype(np.int64)
+        return table
+
+
+def _timestamp(record: dict, default: float = float("nan")) -> float:
+    """
+    The record's "timestamp", else its commit time ("logged_at").
+    """
+    for field in ("timestamp", "logged_at"):
+        ts = record.get(field)
+        if isinstance(ts, (int, float)):
+            return float(ts)
+    return default
+
+def _summaries(entries: np.ndarray):
+    n = len(entries)
+    chunks = (n + CHUNK - 1) // CHUNK
+    chunk_min = np.array([entries["ts_min"][c * CHUNK:(c + 1) * CHUNK].min() for c in range(chunks)])
+    chunk_max = np.array([entries["ts_max"][c * CHUNK:(c + 1) * CHUNK].max() for c in range(chunks)])
+    return chunk_min.astype(float), chunk_max.astype(float)
+
+def _coalesce(hits: np.ndarray):
+    """
+    Groups hit ranges by segment and merges overlapping or adjacent ones.
+    Yields (segment, [(offset, end), ...]).
+    """
+    order = np.lexsort((hits["offset"], hits["segment"]))
+    hits = hits[order]
+    for seq in np.unique(hits["segment"]):
+        rows = hits[hits["segment"] == seq]
+        ranges = []
+        for offset, length in zip(rows["offset"].tolist(), rows["length"].tolist()):
+            end = offset + length
+            if ranges and offset <= ranges[-1][1]:
+                ranges[-1][1] = max(ranges[-1][1], end)
+            else:
+                ranges.append([offset, end])
+        yield int(seq), ranges
+
+def _segment_lines(path: str):
+    """
+    Complete lines of a segment (.log or .log.gz), newline included.
+    """
+    if path.endswith(".gz"):
+        with open(path, "rb") as f:
+            data = _gunzip_members(f.read())
+    else:
+        with open(path, "rb") as f:
+            data = f.read()
+    for line in data.splitlines(keepends=True):
+        if line.endswith(b"\n"):
+            yield line
+
+def _gunzip_members(data: bytes) -> bytes:
+    out = []
+    while data:
+        d = zlib.decompressobj(31)
+        out.append(d.decompress(data))
+        data = d.unused_data
+    return b"".join(out)
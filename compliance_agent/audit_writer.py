@@ -0,0 +1,389 @@
+# compliance_agent/audit_writer.py
+
+import os
+import re
+import json
+import time
+import zlib
+import atexit
+import threading
+from array import array
+
+SEGMENT_RE = re.compile(r"^audit-(\d{8})\.log(\.gz)?$")
+
+# Sealed segments are compressed in independent gzip members of about this
+# many uncompressed bytes, so a byte range can be read without inflating
+# the whole segment
+BLOCK_BYTES = 64 * 1024
+
+
+def segment_name(seq: int, sealed: bool = False) -> str:
+    return f"audit-{seq:08d}.log" + (".gz" if sealed else "")
+
+
+class AuditWriter:
+    """
+    Append-only, segmented JSON-lines audit log with group commit.
+
+    append() hands records to one background writer thread. Each pass,
+    the writer takes everything queued (from any number of requests),
+    writes it with a single write() and fsyncs according to `durability`:
+
+      - "fsync": append() returns only after the records are written and
+        fsynced. One fsync covers every request that arrived while the
+        previous one was running. An acknowledged record survives a crash
+        or power loss.
+      - "interval": append() returns once the records are queued. The
+        writer fsyncs every `fsync_interval` seconds or `fsync_batch`
+        records, whichever comes first. A process crash can lose records
+        still queued, and a power loss can lose up to that window of
+        unsynced records. Normal shutdown (atexit) flushes and fsyncs.
+
+    A failed write or fsync (e.g. ENOSPC, EIO) fails the appends of that
+    pass (fsync mode; in interval mode the records are logged as lost), and
+    the writer reopens the active segment and keeps going.
+
+    The active segment is audit-<seq>.log. It is sealed once it reaches
+    `segment_bytes` or is `segment_seconds` old, and a new one is started.
+    Sealed segments are compressed by a second thread into audit-<seq>.log.gz,
+    a sequence of gzip members of about BLOCK_BYTES each (still plain gzip
+    for zcat). A .blocks table maps uncompressed offsets to member offsets.
+    The .log is only removed after the .gz has been fsynced and renamed
+    into place.
+
+    A record without a numeric "timestamp" is logged with the commit time
+    under "logged_at". on_commit(segment_seq, base_offset, records,
+    line_lengths), if given, runs on the writer thread after each write
+    with the records as logged, e.g. to index them.
+    """
+
+    def __init__(self, directory: str, durability: str = "fsync", fsync_interval: float = 0.05,
+                 fsync_batch: int = 1000, segment_bytes: int = 64 * 1024 * 1024,
+                 segment_seconds: float = 3600.0, max_pending: int = 100000, on_commit=None):
+        if durability not in ("fsync", "interval"):
+            raise ValueError(f"Unknown durability mode: {durability}")
+        self.directory = directory
+        self.durability = durability
+        self.fsync_interval = fsync_interval
+        self.fsync_batch = fsync_batch
+        self.segment_bytes = segment_bytes
+        self.segment_seconds = segment_seconds
+        self.max_pending = max_pending
+        self.on_commit = on_commit
+        os.makedirs(directory, exist_ok=True)
+
+        self._cond = threading.Condition()
+        self._queue = []
+        self._queued = 0
+        self._enqueued_seq = 0
+        # Every ticket up to _done_seq is written and synced, or failed
+        # with the exception in _errors
+        self._done_seq = 0
+        self._errors = {}
+        self._closed = False
+
+        self._seal_cond = threading.Condition()
+        self._to_seal = []
+
+        self.records = 0
+        self.bytes = 0
+        self.writes = 0
+        self.fsyncs = 0
+        self.segments_sealed = 0
+        self.errors = 0
+
+        self._open_active()
+        threading.Thread(target=self._write_loop, name="audit-writer", daemon=True).start()
+        threading.Thread(target=self._seal_loop, name="audit-compressor", daemon=True).start()
+        atexit.register(self.close)
+
+    def append(self, records: list):
+        """
+        Queues records for the log. With durability="fsync", blocks until
+        they are on disk, and raises OSError if writing or syncing them
+        failed.
+        """
+        if not records:
+            return
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("audit writer is closed")
+            while self._queued >= self.max_pending:
+                self._cond.wait()
+            self._queue.append(records)
+            self._queued += len(records)
+            self._enqueued_seq += 1
+            ticket = self._enqueued_seq
+            error = None
+            self._cond.notify_all()
+            if self.durability == "fsync":
+                while self._done_seq < ticket:
+                    self._cond.wait()
+                error = self._errors.pop(ticket, None)
+        if error is not None:
+            raise OSError(f"audit write failed: {error}") from error
+
+    def close(self):
+        """
+        Writes and fsyncs everything queued, then stops the writer.
+        """
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+            while self._done_seq < self._enqueued_seq:
+                self._cond.wait()
+
+    def segments(self) -> list:
+        """
+        [(seq, path)] of every segment on disk, oldest first. A sealed
+        segment is listed under its .gz path once compression is done.
+        """
+        found = {}
+        for name in os.listdir(self.directory):
+            match = SEGMENT_RE.match(name)
+            if match:
+                seq = int(match.group(1))
+                if match.group(2) or seq not in found:
+                    found[seq] = os.path.join(self.directory, name)
+        return sorted(found.items())
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "durability": self.durability,
+                "active_segment": self._seq,
+                "queued": self._queued,
+                "records": self.records,
+                "bytes": self.bytes,
+                "writes": self.writes,
+                "fsyncs": self.fsyncs,
+                "errors": self.errors,
+                "segments_sealed": self.segments_sealed,
+            }
+
+    def _open_active(self):
+        existing = self.segments()
+        seqs = [seq for seq, _ in existing]
+        for seq, path in existing:
+            stale = os.path.join(self.directory, segment_name(seq))
+            if path.endswith(".gz") and os.path.exists(stale):
+                # Crashed between renaming the .gz into place and removing the .log
+                os.remove(stale)
+        # Segments left uncompressed by an earlier run are finished now
+        for seq, path in existing[:-1]:
+            if not path.endswith(".gz"):
+                self._to_seal.append(seq)
+        if existing and not existing[-1][1].endswith(".gz"):
+            self._seq = seqs[-1]
+        else:
+            self._seq = (seqs[-1] if seqs else 0) + 1
+        path = os.path.join(self.directory, segment_name(self._seq))
+        _drop_torn_tail(path)
+        self._file = open(path, "ab")
+        self._offset = self._file.tell()
+        self._opened = time.time()
+
+    def _write_loop(self):
+        last_sync = time.monotonic()
+        unsynced = 0
+        taken = 0
+        while True:
+            with self._cond:
+                while not self._queue and not self._closed:
+                    timeout = None
+                    if unsynced:
+                        timeout = max(0.0, last_sync + self.fsync_interval - time.monotonic())
+                        if timeout == 0.0:
+                            break
+                    self._cond.wait(timeout)
+                batch, self._queue = self._queue, []
+                first, ticket = taken + 1, self._enqueued_seq
+                taken = ticket
+                closing = self._closed
+
+            records = [record for group in batch for record in group]
+            at_risk = unsynced + len(records)
+            try:
+                if records:
+                    self._write(records)
+                    unsynced += len(records)
+                due = (self.durability == "fsync" or closing or unsynced >= self.fsync_batch
+                       or time.monotonic() - last_sync >= self.fsync_interval)
+                if unsynced and due:
+                    self._fsync()
+                    last_sync = time.monotonic()
+                    unsynced = 0
+            except Exception as e:
+                # Fail this pass's appends (fsync mode) and carry on with a
+                # freshly opened segment, so the next pass can succeed
+                print(f"[ComplianceAgent] Audit write of {at_risk} records failed: {e}")
+                unsynced = 0
+                with self._cond:
+                    self.errors += 1
+                    if self.durability == "fsync":
+                        self._errors.update((seq, e) for seq in range(first, ticket + 1))
+                self._reopen_active()
+            with self._cond:
+                self._queued -= len(records)
+                if not unsynced:
+                    self._done_seq = ticket
+                self._cond.notify_all()
+                if closing and not self._queue:
+                    try:
+                        self._file.close()
+                    except OSError as e:
+                        print(f"[ComplianceAgent] Failed to close audit segment {self._seq}: {e}")
+                    return
+
+            if self._offset >= self.segment_bytes or (
+                    self._offset and time.time() - self._opened >= self.segment_seconds):
+                try:
+                    if unsynced:
+                        self._fsync()
+                        last_sync = time.monotonic()
+                        unsynced = 0
+                        with self._cond:
+                            self._done_seq = ticket
+                            self._cond.notify_all()
+                    self._rotate()
+                except OSError as e:
+                    # Rotation is retried after the next write
+                    print(f"[ComplianceAgent] Failed to rotate audit segment {self._seq}: {e}")
+
+    def _fsync(self):
+        os.fsync(self._file.fileno())
+        self.fsyncs += 1
+
+    def _reopen_active(self):
+        """
+        Reopens the active segment after a failed write or fsync: drops
+        whatever the failed write left half-written and continues from the
+        last complete line. Retried on the next pass if the disk is still
+        failing.
+        """
+        try:
+            self._file.close()
+        except (OSError, ValueError):
+            pass
+        path = os.path.join(self.directory, segment_name(self._seq))
+        try:
+            _drop_torn_tail(path)
+            self._file = open(path, "ab")
+            self._offset = self._file.tell()
+        except OSError as e:
+            print(f"[ComplianceAgent] Failed to reopen audit segment {self._seq}: {e}")
+
+    def _write(self, records: list):
+        now = time.time()
+        records = [_stamped(record, now) for record in records]
+        lines = [(json.dumps(record, separators=(",", ":")) + "\n").encode() for record in records]
+        base = self._offset
+        self._file.write(b"".join(lines))
+        self._file.flush()
+        size = sum(len(line) for line in lines)
+        self._offset += size
+        self.records += len(records)
+        self.bytes += size
+        self.writes += 1
+        if self.on_commit is not None:
+            try:
+                self.on_commit(self._seq, base, records, [len(line) for line in lines])
+            except Exception as e:
+                print(f"[ComplianceAgent] Audit commit hook failed: {e}")
+
+    def _rotate(self):
+        sealed = self._seq
+        new_file = open(os.path.join(self.directory, segment_name(sealed + 1)), "ab")
+        self._file.close()
+        self._seq, self._file = sealed + 1, new_file
+        self._offset = 0
+        self._opened = time.time()
+        with self._seal_cond:
+            self._to_seal.append(sealed)
+            self._seal_cond.notify()
+
+    def _seal_loop(self):
+        while True:
+            with self._seal_cond:
+                while not self._to_seal:
+                    self._seal_cond.wait()
+                seq = self._to_seal.pop(0)
+            try:
+                compress_segment(self.directory, seq)
+                self.segments_sealed += 1
+            except Exception as e:
+                print(f"[ComplianceAgent] Failed to compress audit segment {seq}: {e}")
+
+
+def _stamped(record, now: float):
+    """
+    The record as logged: one without a numeric "timestamp" gets the commit
+    time as "logged_at", so readers can place it in time.
+    """
+    if not isinstance(record, dict) or isinstance(record.get("timestamp"), (int, float)):
+        return record
+    return {**record, "logged_at": now}
+
+def _drop_torn_tail(path: str):
+    """
+    Truncates a partial last line left by a crash mid-write.
+    """
+    if not os.path.exists(path):
+        return
+    with open(path, "r+b") as f:
+        size = f.seek(0, os.SEEK_END)
+        end = size
+        while end > 0:
+            f.seek(max(0, end - 4096))
+            chunk = f.read(end - max(0, end - 4096))
+            newline = chunk.rfind(b"\n")
+            if newline >= 0:
+                end = max(0, end - 4096) + newline + 1
+                break
+            end = max(0, end - 4096)
+        if end != size:
+            f.truncate(end)
+
+def compress_segment(directory: str, seq: int):
+    """
+    Rewrites audit-<seq>.log as audit-<seq>.log.gz plus audit-<seq>.blocks.
+    Each gzip member holds whole lines. The .blocks file is a flat array
+    of (uncompressed offset, compressed offset) uint64 pairs, one per
+    member.
+    """
+    src = os.path.join(directory, segment_name(seq))
+    dst = os.path.join(directory, segment_name(seq, sealed=True))
+    blocks_path = os.path.join(directory, f"audit-{seq:08d}.blocks")
+    table = array("Q")
+    raw_offset = gz_offset = 0
+    with open(src, "rb") as f, open(dst + ".tmp", "wb") as out:
+        pending = b""
+        while True:
+            chunk = f.read(BLOCK_BYTES)
+            data = pending + chunk
+            if not data:
+                break
+            cut = data.rfind(b"\n") + 1 if chunk else len(data)
+            block, pending = (data[:cut], data[cut:]) if cut else (b"", data)
+            if not block:
+                continue
+            member = gzip_member(block)
+            table.extend((raw_offset, gz_offset))
+            out.write(member)
+            raw_offset += len(block)
+            gz_offset += len(member)
+        out.flush()
+        os.fsync(out.fileno())
+    with open(blocks_path + ".tmp", "wb") as f:
+        table.tofile(f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(blocks_path + ".tmp", blocks_path)
+    os.replace(dst + ".tmp", dst)
+    os.remove(src)
+
+def gzip_member(data: bytes) -> bytes:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    return compressor.compress(data) + compressor.flush()
@@ -18,3 +18,160 @@ STRATEGY_AGENT_EVENT_URL = "http://127.0.0.1:5005/events"
 RISK_AGENT_EVENT_URL = "http://127.0.0.1:5006/events"
 EXECUTION_AGENT_EVENT_URL = "http://127.0.0.1:5007/events"
 COMPLIANCE_AGENT_EVENT_URL = "http://127.0.0.1:5008/events"
+
+# Market Data Agent cache (TTLs in seconds)
+MARKET_DATA_PRICE_TTL = float(os.getenv("MARKET_DATA_PRICE_TTL", "15"))
+MARKET_DATA_HISTORY_TTL = float(os.getenv("MARKET_DATA_HISTORY_TTL", "60"))
+MARKET_DATA_CACHE_MAX_BYTES = int(os.getenv("MARKET_DATA_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+# Market Data Agent on-disk OHLCV bar store
+MARKET_DATA_STORE_DIR = os.getenv("MARKET_DATA_STORE_DIR", "bar_store")
+
+# Market Data Agent upstream: "yfinance", or "synthetic" for deterministic
+# offline bars (with optional per-request latency in seconds)
+MARKET_DATA_SOURCE = os.getenv("MARKET_DATA_SOURCE", "yfinance")
+MARKET_DATA_SYNTHETIC_LATENCY = float(os.getenv("MARKET_DATA_SYNTHETIC_LATENCY", "0"))
+
+# Market Data Agent push feed behind GET /subscribe: "poll" (one upstream
+# poll every MARKET_DATA_POLL_SECONDS for all subscribed symbols) or
+# "replay" (plays back the bar store in MARKET_DATA_REPLAY_DIR at
+# MARKET_DATA_REPLAY_RATE timestamps per second)
+MARKET_DATA_FEED = os.getenv("MARKET_DATA_FEED", "poll")
+MARKET_DATA_FEED_INTERVAL = os.getenv("MARKET_DATA_FEED_INTERVAL", "1d")
+MARKET_DATA_POLL_SECONDS = float(os.getenv("MARKET_DATA_POLL_SECONDS", "15"))
+MARKET_DATA_POLL_PERIOD = os.getenv("MARKET_DATA_POLL_PERIOD", "5d")
+MARKET_DATA_REPLAY_DIR = os.getenv("MARKET_DATA_REPLAY_DIR", "bar_replay")
+MARKET_DATA_REPLAY_RATE = float(os.getenv("MARKET_DATA_REPLAY_RATE", "10"))
+MARKET_DATA_SUBSCRIBER_QUEUE = int(os.getenv("MARKET_DATA_SUBSCRIBER_QUEUE", "1000"))
+MARKET_DATA_STREAM_URL = "http://127.0.0.1:5001/subscribe"
+
+# Technical Analysis Agent universe and indicator set (comma-separated)
+TECHNICAL_UNIVERSE = os.getenv("TECHNICAL_UNIVERSE", "AAPL,MSFT,GOOG").split(",")
+TECHNICAL_INDICATORS = os.getenv("TECHNICAL_INDICATORS", "sma,ema,macd,bollinger,atr").split(",")
+
+# "poll" runs check_technical every 5 minutes; "stream" updates on every
+# bar pushed by the Market Data Agent's /subscribe stream
+TECHNICAL_MODE = os.getenv("TECHNICAL_MODE", "poll")
+
+# Single-process mode (cohost.py): handler threads per co-hosted agent
+COHOST_WORKERS = int(os.getenv("COHOST_WORKERS", "8"))
+
+# Production serving (serve.py): gunicorn worker processes and threads per
+# worker, and the directory of the lock files that elect the one worker
+# running an agent's scheduled jobs
+SERVE_WORKERS = int(os.getenv("SERVE_WORKERS", "1"))
+SERVE_THREADS = int(os.getenv("SERVE_THREADS", "8"))
+SERVE_LOCK_DIR = os.getenv("SERVE_LOCK_DIR", "locks")
+
+# Inter-agent HTTP (A2A events and MCP calls); timeouts in seconds
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "3"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "60"))
+HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "3"))
+HTTP_BACKOFF = float(os.getenv("HTTP_BACKOFF", "0.2"))
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "32"))
+
+# A2A transport: "http" (one JSON POST per event) or "ws" (events batched
+# into msgpack frames over persistent WebSocket connections, with HTTP as
+# the fallback). WebSocket listeners use each /events port + the offset.
+A2A_TRANSPORT = os.getenv("A2A_TRANSPORT", "http")
+A2A_WS_PORT_OFFSET = int(os.getenv("A2A_WS_PORT_OFFSET", "1000"))
+A2A_BATCH_MAX = int(os.getenv("A2A_BATCH_MAX", "64"))
+A2A_BATCH_WINDOW = float(os.getenv("A2A_BATCH_WINDOW", "0.005"))
+# Seconds to wait for the ack of a frame (the receiver acks once it has
+# handled every event in it)
+A2A_ACK_TIMEOUT = float(os.getenv("A2A_ACK_TIMEOUT", "30"))
+
+# Strategy Agent alert workers (coalescing window in seconds)
+STRATEGY_WORKERS = int(os.getenv("STRATEGY_WORKERS", "2"))
+STRATEGY_QUEUE_SIZE = int(os.getenv("STRATEGY_QUEUE_SIZE", "1000"))
+STRATEGY_COALESCE_WINDOW = float(os.getenv("STRATEGY_COALESCE_WINDOW", "2.0"))
+
+# Strategy Agent LLM backend ("openai" or "local") and strategy memo cache
+STRATEGY_LLM_BACKEND = os.getenv("STRATEGY_LLM_BACKEND", "openai")
+STRATEGY_LLM_LOCAL_LATENCY = float(os.getenv("STRATEGY_LLM_LOCAL_LATENCY", "0"))
+STRATEGY_CACHE_PATH = os.getenv("STRATEGY_CACHE_PATH", "strategy_cache.sqlite3")
+STRATEGY_CACHE_TTL = float(os.getenv("STRATEGY_CACHE_TTL", "3600"))
+STRATEGY_CACHE_MAX_ENTRIES = int(os.getenv("STRATEGY_CACHE_MAX_ENTRIES", "10000"))
+STRATEGY_CACHE_DIGITS = int(os.getenv("STRATEGY_CACHE_DIGITS", "3"))
+
+# Risk Agent covariance model: universe (comma-separated), return window in
+# days and VaR confidence. Limits live in a JSON rule file that is reloaded
+# when it changes.
+RISK_UNIVERSE = os.getenv("RISK_UNIVERSE", "AAPL,MSFT,GOOG").split(",")
+RISK_WINDOW = int(os.getenv("RISK_WINDOW", "252"))
+RISK_CONFIDENCE = float(os.getenv("RISK_CONFIDENCE", "0.99"))
+RISK_LIMITS_PATH = os.getenv(
+    "RISK_LIMITS_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "risk_agent", "limits.json")
+)
+
+# Execution Agent: broker ("mock"), venues as name:orders_per_second pairs
+# (one batch submission per token), concurrent batch cap, fill-report flush
+# interval in seconds, orders per batch and smallest weight change to trade
+EXECUTION_BROKER = os.getenv("EXECUTION_BROKER", "mock")
+EXECUTION_VENUES = {
+    name: float(rate)
+    for name, rate in (v.split(":") for v in os.getenv("EXECUTION_VENUES", "MOCK:50").split(","))
+}
+EXECUTION_MAX_IN_FLIGHT = int(os.getenv("EXECUTION_MAX_IN_FLIGHT", "64"))
+EXECUTION_FILL_FLUSH = float(os.getenv("EXECUTION_FILL_FLUSH", "0.05"))
+EXECUTION_BATCH_SIZE = int(os.getenv("EXECUTION_BATCH_SIZE", "20"))
+EXECUTION_MIN_DELTA = float(os.getenv("EXECUTION_MIN_DELTA", "0.005"))
+
+# Mock broker: seconds of latency (+/- jitter) per ack and per fill, max
+# partial fills per order and fraction of orders rejected
+MOCK_BROKER_LATENCY = float(os.getenv("MOCK_BROKER_LATENCY", "0.05"))
+MOCK_BROKER_JITTER = float(os.getenv("MOCK_BROKER_JITTER", "0.02"))
+MOCK_BROKER_PARTIALS = int(os.getenv("MOCK_BROKER_PARTIALS", "3"))
+MOCK_BROKER_REJECT_RATE = float(os.getenv("MOCK_BROKER_REJECT_RATE", "0.0"))
+
+# Compliance Agent audit log. Durability "fsync" acknowledges a trade only
+# once it is fsynced (group-committed across requests). "interval" fsyncs
+# every AUDIT_FSYNC_INTERVAL seconds or AUDIT_FSYNC_BATCH records and can
+# lose that window on power loss. Segments rotate by size or age (seconds)
+# and are gzip-compressed once sealed.
+AUDIT_DIR = os.getenv("AUDIT_DIR", "audit")
+AUDIT_DURABILITY = os.getenv("AUDIT_DURABILITY", "fsync")
+AUDIT_FSYNC_INTERVAL = float(os.getenv("AUDIT_FSYNC_INTERVAL", "0.05"))
+AUDIT_FSYNC_BATCH = int(os.getenv("AUDIT_FSYNC_BATCH", "1000"))
+AUDIT_SEGMENT_BYTES = int(os.getenv("AUDIT_SEGMENT_BYTES", str(64 * 1024 * 1024)))
+AUDIT_SEGMENT_SECONDS = float(os.getenv("AUDIT_SEGMENT_SECONDS", "86400"))
+
+# Fundamentals Agent: universe (comma-separated, or one symbol per line in
+# FUNDAMENTALS_UNIVERSE_FILE), provider ("stub" or "fmp"), fetch threads,
+# snapshot file and the relative cash-ratio drop that raises an alert
+FUNDAMENTALS_UNIVERSE_FILE = os.getenv("FUNDAMENTALS_UNIVERSE_FILE")
+if FUNDAMENTALS_UNIVERSE_FILE:
+    with open(FUNDAMENTALS_UNIVERSE_FILE) as f:
+        FUNDAMENTALS_UNIVERSE = [line.strip() for line in f if line.strip()]
+else:
+    FUNDAMENTALS_UNIVERSE = os.getenv("FUNDAMENTALS_UNIVERSE", "AAPL,MSFT,GOOG").split(",")
+FUNDAMENTALS_PROVIDER = os.getenv("FUNDAMENTALS_PROVIDER", "stub")
+FUNDAMENTALS_API_KEY = os.getenv("FUNDAMENTALS_API_KEY", "YOUR_FMP_API_KEY")
+FUNDAMENTALS_STUB_LATENCY = float(os.getenv("FUNDAMENTALS_STUB_LATENCY", "0"))
+FUNDAMENTALS_WORKERS = int(os.getenv("FUNDAMENTALS_WORKERS", "16"))
+FUNDAMENTALS_STORE_PATH = os.getenv("FUNDAMENTALS_STORE_PATH", "fundamentals_snapshot.npz")
+FUNDAMENTALS_DROP_THRESHOLD = float(os.getenv("FUNDAMENTALS_DROP_THRESHOLD", "0.2"))
+
+# News Agent: sources ("newsapi" and/or "replay:<path>" to play back a
+# recorded feed), ticker alias file, dedupe window and poll interval
+NEWS_SOURCES = os.getenv("NEWS_SOURCES", "newsapi").split(",")
+NEWS_ALIASES_PATH = os.getenv(
+    "NEWS_ALIASES_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "news_agent", "news_aliases.json")
+)
+NEWS_SEEN_CAPACITY = int(os.getenv("NEWS_SEEN_CAPACITY", "100000"))
+NEWS_REPLAY_BATCH = int(os.getenv("NEWS_REPLAY_BATCH", "0")) or None
+NEWS_POLL_SECONDS = float(os.getenv("NEWS_POLL_SECONDS", "3600"))
+
+# News Agent sentiment: lexicon file, articles scored per batch, half-life
+# (seconds) of each ticker's sentiment, alert threshold and the decayed
+# article count needed before a ticker can alert
+NEWS_LEXICON_PATH = os.getenv(
+    "NEWS_LEXICON_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "news_agent", "sentiment_lexicon.json")
+)
+NEWS_SCORE_BATCH = int(os.getenv("NEWS_SCORE_BATCH", "512"))
+NEWS_HALF_LIFE = float(os.getenv("NEWS_HALF_LIFE", str(6 * 3600)))
+NEWS_ALERT_THRESHOLD = float(os.getenv("NEWS_ALERT_THRESHOLD", "0.7"))
+NEWS_MIN_WEIGHT = float(os.getenv("NEWS_MIN_WEIGHT", "2.0"))
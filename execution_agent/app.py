@@ -1,66 +1,146 @@
 # execution_agent/app.py
 
 import os
-import time
-import threading
 from flask import Flask, request, jsonify
 
-from config import COMPLIANCE_AGENT_EVENT_URL
+from config import (
+    COMPLIANCE_AGENT_EVENT_URL,
+    EXECUTION_BROKER,
+    EXECUTION_VENUES,
+    EXECUTION_MAX_IN_FLIGHT,
+    EXECUTION_FILL_FLUSH,
+    EXECUTION_BATCH_SIZE,
+    EXECUTION_MIN_DELTA,
+    MOCK_BROKER_LATENCY,
+    MOCK_BROKER_JITTER,
+    MOCK_BROKER_PARTIALS,
+    MOCK_BROKER_REJECT_RATE
+)
 from a2a_client import send_event
+from a2a_transport import serve as serve_events
+import tracing
+import startup
+from broker import make_broker
+from execution_engine import ExecutionEngine
+from order_manager import OrderManager
 
 app = Flask(__name__)
+tracing.configure("ExecutionAgent")
 
-def execute_orders(strategy_plan: list):
+# Stub: current portfolio positions (e.g., from 0.0 to 1.0), kept up to
+# date from fills by the order manager
+CURRENT_POSITIONS = {
+    "AAPL": 0.10,
+    "MSFT": 0.15,
+    "GOOG": 0.05
+}
+
+def report_fills(plan_id: str, trades: list, final: bool, origin: str = None):
     """
-    Simulates sending orders to a broker. 
-    For each leg, we “sleep” 1 second and then mark as “filled.”
-    Finally, send order_executed event to Compliance Agent.
+    Streams fills to the Compliance Agent as they arrive: one
+    order_executed event per flush, the last one flagged final. The final
+    event carries the plan's alert-to-fill latency, which is also recorded
+    in the "alert_to_fill" histogram by strategy origin.
     """
-    executed_trades = []
-    for leg in strategy_plan:
-        ticker = leg["ticker"]
-        weight = leg["target_weight"]
-        # Simulate time to send order / wait for fill
-        print(f"[ExecutionAgent] Placing order for {ticker} at weight {weight:.2f} ...")
-        time.sleep(1)  # simulate latency
-        executed_trades.append({
-            "ticker": ticker,
-            "filled_weight": weight,
-            "timestamp": time.time()
-        })
-
-    # Once all “filled,” send order_executed to ComplianceAgent
+    content = {"plan_id": plan_id, "trades": trades, "final": final}
+    elapsed = tracing.elapsed()
+    if final and elapsed is not None:
+        tracing.histogram("alert_to_fill", origin=origin or "unknown").record(elapsed)
+        content["alert_to_fill_ms"] = round(1000.0 * elapsed, 3)
     send_event(
         COMPLIANCE_AGENT_EVENT_URL,
         "order_executed",
-        {"trades": executed_trades}
+        content
     )
-    print("[ExecutionAgent] Sent order_executed event to ComplianceAgent.")
+    if final:
+        print(f"[ExecutionAgent] Sent final order_executed event for {plan_id} to ComplianceAgent.")
+
+# Nets targets against positions and supersedes older plans
+ORDERS = OrderManager(CURRENT_POSITIONS, min_delta=EXECUTION_MIN_DELTA, report=report_fills)
+
+# Concurrent, rate-limited, batched order submission on its own event loop
+ENGINE = ExecutionEngine(
+    make_broker(
+        EXECUTION_BROKER,
+        latency=MOCK_BROKER_LATENCY,
+        jitter=MOCK_BROKER_JITTER,
+        max_partials=MOCK_BROKER_PARTIALS,
+        reject_rate=MOCK_BROKER_REJECT_RATE
+    ),
+    EXECUTION_VENUES,
+    on_fills=ORDERS.on_fills,
+    max_in_flight=EXECUTION_MAX_IN_FLIGHT,
+    flush_interval=EXECUTION_FILL_FLUSH,
+    batch_size=EXECUTION_BATCH_SIZE,
+    gate=ORDERS.gate
+)
+ORDERS.engine = ENGINE
+
+def execute_orders(strategy_plan: list, origin: str = None):
+    """
+    Trades the book toward the strategy's target weights. Only the
+    difference from current (and already working) positions is ordered,
+    and any legs of older plans that have not reached the broker yet are
+    dropped. Orders are submitted concurrently in per-venue batches and
+    fills are streamed to the Compliance Agent as order_executed events
+    while the plan runs, tagged with the strategy's origin. Returns without
+    waiting for the fills.
+    """
+    future = ORDERS.approve(strategy_plan, origin)
+    if future is not None:
+        future.add_done_callback(_log_plan)
+
+def _log_plan(future):
+    try:
+        summary = future.result()
+    except Exception as e:
+        print(f"[ExecutionAgent] Plan failed: {e}")
+        return
+    print(f"[ExecutionAgent] {summary['plan_id']}: {summary['filled']}/{summary['orders']} filled, "
+          f"{summary['rejected']} rejected, {summary['cancelled']} superseded in {summary['seconds']:.2f}s.")
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    """
+    Order counts, submit-to-final-fill latency percentiles, netting stats
+    and latency histograms (order_placement, alert_to_fill by origin).
+    """
+    return jsonify({"engine": ENGINE.stats(), "orders": ORDERS.stats(), "latency": tracing.snapshot(),
+                    "startup": startup.report()})
 
 @app.route("/events", methods=["POST"])
 def receive_event():
+    """
+    JSON-over-HTTP transport for handle_event().
+    """
+    payload = request.get_json()
+    with tracing.received(payload):
+        body, status = handle_event(payload.get("type"), payload.get("content", {}))
+    return jsonify(body), status
+
+def handle_event(evt_type: str, content: dict):
     """
     Expects:
       - { "type": "approve_trade", "content": { "strategy": [ ... ] } }
       - { "type": "veto_trade", "content": { "reason": "...", "strategy": [ ... ] } }
     """
-    payload = request.get_json()
-    evt_type = payload.get("type")
-    content = payload.get("content", {})
-
     if evt_type == "approve_trade":
         strategy = content.get("strategy", [])
-        threading.Thread(target=execute_orders, args=(strategy,)).start()
-        return jsonify({"status": "executing"}), 200
+        execute_orders(strategy, content.get("origin"))
+        return {"status": "executing"}, 200
 
     elif evt_type == "veto_trade":
         reason = content.get("reason", "no reason provided")
         print(f"[ExecutionAgent] Trade vetoed: {reason}")
-        return jsonify({"status": "vetoed"}), 200
+        return {"status": "vetoed"}, 200
 
     else:
-        return jsonify({"error": "unsupported event type"}), 400
+        return {"error": "unsupported event type"}, 400
+
+startup.mark("imported")
 
 if __name__ == "__main__":
     print("[ExecutionAgent] Listening on port 5007 for trade events.")
+    serve_events(handle_event, 5007)
+    startup.ready()
     app.run(host="0.0.0.0", port=5007)
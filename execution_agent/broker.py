@@ -0,0 +1,131 @@
+# execution_agent/broker.py
+
+import time
+import random
+import asyncio
+
+
+class Broker:
+    """
+    Order gateway used by the execution engine.
+
+    execute(order) is an async generator: it submits one order
+    ({"order_id", "ticker", "weight", "venue"}, where a negative weight
+    sells) and yields fill reports as they arrive, each
+        {"order_id", "ticker", "venue", "filled_weight", "status", "timestamp"}
+    where status is "partial", "filled" or "rejected". The last report
+    for an order is always "filled" or "rejected".
+
+    execute_batch(orders) submits several orders for one venue as a single
+    request and yields the reports of all of them, interleaved. Brokers
+    without a native batch API fall back to concurrent execute() calls.
+    """
+
+    name = "base"
+
+    async def execute(self, order: dict):
+        raise NotImplementedError
+        yield
+
+    async def execute_batch(self, orders: list):
+        async for report in _merge([self.execute(order) for order in orders]):
+            yield report
+
+
+class MockBroker(Broker):
+    """
+    Local broker simulator for offline throughput and tail-latency tests.
+
+      - `latency` +/- `jitter` seconds before the order is acknowledged,
+        and again between successive fills
+      - each order fills in 1..`max_partials` random slices
+      - a fraction `reject_rate` of orders are rejected outright
+      - with a fixed `seed`, the sequence of fill sizes and rejects is
+        reproducible
+    """
+
+    name = "mock"
+
+    def __init__(self, latency: float = 0.05, jitter: float = 0.02, max_partials: int = 1,
+                 reject_rate: float = 0.0, seed: int = None):
+        self.latency = latency
+        self.jitter = jitter
+        self.max_partials = max(1, max_partials)
+        self.reject_rate = reject_rate
+        self._rng = random.Random(seed)
+
+    async def execute(self, order: dict):
+        await asyncio.sleep(self._delay())
+        async for report in self._fills(order):
+            yield report
+
+    async def execute_batch(self, orders: list):
+        # One acknowledgement for the whole batch, then independent fills
+        await asyncio.sleep(self._delay())
+        async for report in _merge([self._fills(order) for order in orders]):
+            yield report
+
+    async def _fills(self, order: dict):
+        if self._rng.random() < self.reject_rate:
+            yield self._report(order, 0.0, "rejected")
+            return
+
+        slices = self._rng.randint(1, self.max_partials)
+        cuts = sorted(self._rng.random() for _ in range(slices - 1))
+        remaining = order["weight"]
+        for i, (lo, hi) in enumerate(zip([0.0] + cuts, cuts + [1.0])):
+            if i:
+                await asyncio.sleep(self._delay())
+            last = i == slices - 1
+            qty = remaining if last else order["weight"] * (hi - lo)
+            remaining -= qty
+            yield self._report(order, qty, "filled" if last else "partial")
+
+    def _delay(self) -> float:
+        return max(0.0, self.latency + self._rng.uniform(-self.jitter, self.jitter))
+
+    @staticmethod
+    def _report(order: dict, qty: float, status: str) -> dict:
+        return {
+            "order_id": order["order_id"],
+            "ticker": order["ticker"],
+            "venue": order["venue"],
+            "filled_weight": qty,
+            "status": status,
+            "timestamp": time.time()
+        }
+
+
+async def _merge(streams: list):
+    """
+    Yields items from several async generators as soon as any produces one.
+    """
+    queue = asyncio.Queue()
+    done = object()
+
+    async def drain(stream):
+        try:
+            async for item in stream:
+                await queue.put(item)
+        finally:
+            await queue.put(done)
+
+    tasks = [asyncio.ensure_future(drain(stream)) for stream in streams]
+    try:
+        remaining = len(tasks)
+        while remaining:
+            item = await queue.get()
+            if item is done:
+                remaining -= 1
+            else:
+                yield item
+        for task in tasks:
+            task.result()
+    finally:
+        for task in tasks:
+            task.cancel()
+
+def make_broker(name: str, **options) -> Broker:
+    if name == "mock":
+        return MockBroker(**options)
+    raise ValueError(f"Unknown broker: {name}")
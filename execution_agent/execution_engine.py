@@ -0,0 +1,264 @@
+# execution_agent/execution_engine.py
+
+import time
+import zlib
+import asyncio
+import itertools
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import tracing
+
+# Order latencies kept for the percentile stats
+_LATENCY_SAMPLES = 10000
+
+
+class VenueLimiter:
+    """
+    Token bucket: at most `rate` order submissions per second, with bursts
+    of up to `burst`. Only used from the engine's event loop.
+    """
+
+    def __init__(self, rate: float, burst: int = None):
+        self.rate = rate
+        self.burst = burst or max(1, int(rate))
+        self._tokens = float(self.burst)
+        self._stamp = time.monotonic()
+
+    async def acquire(self):
+        while True:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._stamp) * self.rate)
+            self._stamp = now
+            if self._tokens >= 1.0:
+                self._tokens -= 1.0
+                return
+            await asyncio.sleep((1.0 - self._tokens) / self.rate)
+
+
+class ExecutionEngine:
+    """
+    Submits the legs of a plan concurrently on a private asyncio loop
+    running in a daemon thread.
+
+    Every leg becomes an order routed to a venue (stable hash of the ticker
+    over `venues`, a {name: orders_per_second} dict). Orders for the same
+    venue are grouped into batches of up to `batch_size`, and each batch is
+    one broker submission that takes one token from the venue's rate
+    limiter. At most `max_in_flight` batches are outstanding across all
+    plans. Just before a batch goes out, the optional gate(orders) callback
+    returns the orders still worth sending; the rest are reported as
+    "cancelled" (see OrderManager, which uses it to drop superseded legs).
+    gate(orders, commit=False) asks the same question without committing
+    the orders, so that a dead batch does not wait for a token.
+
+    Fill reports are collected as the broker streams them and handed to
+    on_fills(plan_id, fills, final) every `flush_interval` seconds, so
+    downstream agents hear about partial fills while the rest of the plan
+    is still working. Orders of a failed batch get a terminal "error"
+    report there too. The last call for a plan has final=True. on_fills
+    runs on one dedicated thread, so its calls never overlap and arrive in
+    order.
+    """
+
+    def __init__(self, broker, venues: dict, on_fills, max_in_flight: int = 64,
+                 flush_interval: float = 0.05, batch_size: int = 1, gate=None):
+        self.broker = broker
+        self.venues = sorted(venues)
+        self.on_fills = on_fills
+        self.max_in_flight = max_in_flight
+        self.flush_interval = flush_interval
+        self.batch_size = max(1, batch_size)
+        self.gate = gate
+        self._limiters = {venue: VenueLimiter(rate) for venue, rate in venues.items()}
+        self._emitter = ThreadPoolExecutor(max_workers=1, thread_name_prefix="fill-reporter")
+        self._plan_ids = itertools.count(1)
+        self._order_ids = itertools.count(1)
+        self._run_id = f"{int(time.time()):x}"
+
+        self._loop = None
+        self._slots = None
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._flush_scheduled = set()
+
+        self.plans = 0
+        self.batches = 0
+        self.orders = 0
+        self.in_flight = 0
+        self.partials = 0
+        self.filled = 0
+        self.rejected = 0
+        self.cancelled = 0
+        self.errors = 0
+        self._latencies = deque(maxlen=_LATENCY_SAMPLES)
+        self._placement = tracing.histogram("order_placement")
+
+    def new_plan_id(self) -> str:
+        return f"plan-{self._run_id}-{next(self._plan_ids)}"
+
+    def submit(self, legs: list, plan_id: str = None):
+        """
+        Starts executing [{"ticker", "weight"}, ...] and returns at once.
+        Returns a concurrent.futures.Future for the plan's summary.
+        """
+        plan_id = plan_id or self.new_plan_id()
+        loop = self._ensure_loop()
+        return asyncio.run_coroutine_threadsafe(self._run_plan(plan_id, legs), loop)
+
+    def route(self, ticker: str) -> str:
+        return self.venues[zlib.crc32(ticker.encode()) % len(self.venues)]
+
+    def stats(self) -> dict:
+        with self._lock:
+            latencies = sorted(self._latencies)
+            return {
+                "broker": self.broker.name,
+                "plans": self.plans,
+                "batches": self.batches,
+                "orders": self.orders,
+                "in_flight": self.in_flight,
+                "partials": self.partials,
+                "filled": self.filled,
+                "rejected": self.rejected,
+                "cancelled": self.cancelled,
+                "errors": self.errors,
+                "latency_p50_ms": _percentile(latencies, 0.50),
+                "latency_p99_ms": _percentile(latencies, 0.99),
+            }
+
+    def _ensure_loop(self):
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._slots = asyncio.Semaphore(self.max_in_flight)
+                threading.Thread(target=tracing.bind(self._loop.run_forever), name="execution-engine", daemon=True).start()
+            return self._loop
+
+    async def _run_plan(self, plan_id: str, legs: list) -> dict:
+        start = time.monotonic()
+        with self._lock:
+            self.plans += 1
+        orders = [
+            {
+                "order_id": f"ord-{self._run_id}-{next(self._order_ids)}",
+                "plan_id": plan_id,
+                "ticker": leg["ticker"],
+                "weight": leg["weight"],
+                "venue": self.route(leg["ticker"])
+            }
+            for leg in legs
+        ]
+        batches = []
+        for venue in self.venues:
+            routed = [order for order in orders if order["venue"] == venue]
+            batches.extend(routed[i:i + self.batch_size] for i in range(0, len(routed), self.batch_size))
+        results = await asyncio.gather(*(self._run_batch(batch) for batch in batches))
+        statuses = [status for result in results for status in result.values()]
+        self._flush(plan_id, final=True)
+        return {
+            "plan_id": plan_id,
+            "orders": len(orders),
+            "filled": statuses.count("filled"),
+            "rejected": statuses.count("rejected"),
+            "cancelled": statuses.count("cancelled"),
+            "failed": statuses.count("error"),
+            "seconds": time.monotonic() - start
+        }
+
+    async def _run_batch(self, batch: list) -> dict:
+        """
+        Sends one batch and returns {order_id: final status}.
+        """
+        async with self._slots:
+            # Don't spend a rate-limit token on a batch that was superseded while queued
+            if self.gate is None or self.gate(batch, commit=False):
+                await self._limiters[batch[0]["venue"]].acquire()
+            live = self.gate(batch) if self.gate else batch
+            statuses = {order["order_id"]: "cancelled" for order in batch}
+            sent = {order["order_id"] for order in live}
+            for order in batch:
+                if order["order_id"] not in sent:
+                    self._record(_closed(order, "cancelled"))
+            if not live:
+                return statuses
+
+            start = time.monotonic()
+            with self._lock:
+                self.batches += 1
+                self.orders += len(live)
+                self.in_flight += len(live)
+            for order in live:
+                statuses[order["order_id"]] = "error"
+            try:
+                async for report in self.broker.execute_batch(live):
+                    report["plan_id"] = batch[0]["plan_id"]
+                    statuses[report["order_id"]] = report["status"]
+                    self._record(report)
+                    if report["status"] != "partial":
+                        with self._lock:
+                            self.in_flight -= 1
+                            self._latencies.append(1000.0 * (time.monotonic() - start))
+                        self._placement.record(time.monotonic() - start)
+            except Exception as e:
+                print(f"[ExecutionAgent] Batch of {len(live)} orders to {live[0]['venue']} failed: {e}")
+            failed = [order for order in live if statuses[order["order_id"]] in ("error", "partial")]
+            with self._lock:
+                self.in_flight -= len(failed)
+                self.errors += len(failed)
+            for order in failed:
+                statuses[order["order_id"]] = "error"
+                # Close the order out so the order manager stops counting its
+                # unfilled remainder as working
+                self._record(_closed(order, "error"))
+            return statuses
+
+    def _record(self, report: dict):
+        plan_id = report["plan_id"]
+        with self._lock:
+            if report["status"] == "partial":
+                self.partials += 1
+            elif report["status"] == "filled":
+                self.filled += 1
+            elif report["status"] == "rejected":
+                self.rejected += 1
+            elif report["status"] == "cancelled":
+                self.cancelled += 1
+        self._pending.setdefault(plan_id, []).append(report)
+        if plan_id not in self._flush_scheduled:
+            self._flush_scheduled.add(plan_id)
+            self._loop.call_later(self.flush_interval, self._flush, plan_id)
+
+    def _flush(self, plan_id: str, final: bool = False):
+        self._flush_scheduled.discard(plan_id)
+        fills = self._pending.pop(plan_id, [])
+        if fills or final:
+            self._emitter.submit(tracing.bind(self._emit), plan_id, fills, final)
+
+    def _emit(self, plan_id: str, fills: list, final: bool):
+        try:
+            self.on_fills(plan_id, fills, final)
+        except Exception as e:
+            print(f"[ExecutionAgent] Error reporting fills for {plan_id}: {e}")
+
+
+def _closed(order: dict, status: str) -> dict:
+    """
+    Terminal report for an order that got no (further) fills: "cancelled"
+    before it was sent, "error" when its batch failed.
+    """
+    return {
+        "order_id": order["order_id"],
+        "plan_id": order["plan_id"],
+        "ticker": order["ticker"],
+        "venue": order["venue"],
+        "filled_weight": 0.0,
+        "status": status,
+        "timestamp": time.time()
+    }
+
+def _percentile(sorted_values: list, q: float):
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
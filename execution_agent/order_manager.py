@@ -0,0 +1,143 @@
+# execution_agent/order_manager.py
+
+import threading
+
+import tracing
+
+
+class OrderManager:
+    """
+    Turns approved strategies into the smallest set of orders and keeps a
+    newer plan from trading against an older one.
+
+      - Netting: each leg's target_weight is compared with the expected
+        position (filled position plus the unfilled remainder of orders
+        already at the broker), and only the difference is ordered.
+      - Threshold: differences smaller than `min_delta` are skipped.
+      - Supersession: approving a plan supersedes every older plan. Their
+        legs that have not reached the broker yet are dropped (the engine
+        asks gate() right before sending each batch and reports the
+        dropped legs as "cancelled"). Orders already at the broker run to
+        completion and count toward the expected position.
+
+    Fills arrive through on_fills() (the engine's callback), which moves
+    quantity from working to filled and retires the working entry of an
+    order on its terminal report (filled, rejected, cancelled or error), tags each report with the origin of
+    its plan (the alerts behind the strategy) and passes the reports on to
+    `report(plan_id, fills, final, origin)`, under the trace the plan was
+    approved in.
+    """
+
+    def __init__(self, positions: dict, min_delta: float, report):
+        self.positions = dict(positions)
+        self.min_delta = min_delta
+        self.report = report
+        self.engine = None
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._plan_generation = {}
+        self._plan_origin = {}
+        self._plan_trace = {}
+        # (plan_id, ticker) -> {"remaining": weight not yet filled, "sent": at the broker}
+        self._working = {}
+
+        self.plans = 0
+        self.superseded_plans = 0
+        self.dropped_legs = 0
+        self.skipped_legs = 0
+        self.ordered_legs = 0
+
+    def approve(self, strategy_plan: list, origin: str = None):
+        """
+        Supersedes older plans, nets the new targets and submits the
+        remaining deltas to the engine. Returns the engine's future for the
+        plan summary, or None when nothing needs to trade.
+        """
+        targets = {leg["ticker"]: leg.get("target_weight", 0.0) for leg in strategy_plan}
+        with self._lock:
+            self._generation += 1
+            plan_id = self.engine.new_plan_id()
+            self._supersede()
+
+            legs = []
+            for ticker, target in targets.items():
+                delta = target - self._expected(ticker)
+                if abs(delta) < self.min_delta:
+                    self.skipped_legs += 1
+                    continue
+                legs.append({"ticker": ticker, "weight": delta})
+                self._working[(plan_id, ticker)] = {"remaining": delta, "sent": False}
+
+            self.plans += 1
+            self.ordered_legs += len(legs)
+            if legs:
+                self._plan_generation[plan_id] = self._generation
+                self._plan_origin[plan_id] = origin
+                self._plan_trace[plan_id] = tracing.current()
+
+        if not legs:
+            print("[ExecutionAgent] Strategy already matches positions; no orders sent.")
+            return None
+        return self.engine.submit(legs, plan_id=plan_id)
+
+    def gate(self, orders: list, commit: bool = True) -> list:
+        """
+        Engine hook: returns the orders of a batch minus any leg dropped by
+        a newer plan, and with `commit` marks them as sent.
+        """
+        live = []
+        with self._lock:
+            for order in orders:
+                entry = self._working.get((order["plan_id"], order["ticker"]))
+                if entry is not None:
+                    entry["sent"] = entry["sent"] or commit
+                    live.append(order)
+        return live
+
+    def on_fills(self, plan_id: str, fills: list, final: bool):
+        with self._lock:
+            origin = self._plan_origin.get(plan_id)
+            trace = self._plan_trace.get(plan_id)
+            for fill in fills:
+                fill["origin"] = origin
+                key = (fill["plan_id"], fill["ticker"])
+                entry = self._working.get(key)
+                if entry is None:
+                    continue
+                qty = fill["filled_weight"]
+                self.positions[fill["ticker"]] = self.positions.get(fill["ticker"], 0.0) + qty
+                entry["remaining"] -= qty
+                if fill["status"] != "partial":
+                    del self._working[key]
+            if final:
+                self._plan_generation.pop(plan_id, None)
+                self._plan_origin.pop(plan_id, None)
+                self._plan_trace.pop(plan_id, None)
+        with tracing.attached(trace):
+            self.report(plan_id, fills, final, origin)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "plans": self.plans,
+                "superseded_plans": self.superseded_plans,
+                "dropped_legs": self.dropped_legs,
+                "skipped_legs": self.skipped_legs,
+                "ordered_legs": self.ordered_legs,
+                "working_legs": len(self._working),
+                "positions": dict(self.positions),
+            }
+
+    def _supersede(self):
+        older = [p for p, gen in self._plan_generation.items() if gen < self._generation]
+        for plan_id in older:
+            del self._plan_generation[plan_id]
+            self.superseded_plans += 1
+        stale = set(older)
+        for key in [k for k, entry in self._working.items() if k[0] in stale and not entry["sent"]]:
+            del self._working[key]
+            self.dropped_legs += 1
+
+    def _expected(self, ticker: str) -> float:
+        working = sum(e["remaining"] for (p, t), e in self._working.items() if t == ticker)
+        return self.positions.get(ticker, 0.0) + working
@@ -2,59 +2,142 @@
 
 import os
 import time
-import random
+from datetime import datetime, timedelta
 import requests
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from flask import Flask, request, jsonify
-from apscheduler.schedulers.background import BackgroundScheduler
 
-from config import STRATEGY_AGENT_EVENT_URL
+from config import (
+    STRATEGY_AGENT_EVENT_URL,
+    FUNDAMENTALS_UNIVERSE,
+    FUNDAMENTALS_PROVIDER,
+    FUNDAMENTALS_API_KEY,
+    FUNDAMENTALS_STUB_LATENCY,
+    FUNDAMENTALS_WORKERS,
+    FUNDAMENTALS_STORE_PATH,
+    FUNDAMENTALS_DROP_THRESHOLD
+)
 from a2a_client import send_event
+from a2a_transport import serve as serve_events
+import tracing
+import startup
+from fundamentals_providers import FIELDS, make_provider
+from fundamentals_store import SnapshotStore
 
 app = Flask(__name__)
+tracing.configure("FundamentalsAgent")
+
+# Where fundamentals come from ("stub" for offline runs)
+PROVIDER = make_provider(
+    FUNDAMENTALS_PROVIDER,
+    api_key=FUNDAMENTALS_API_KEY,
+    stub_latency=FUNDAMENTALS_STUB_LATENCY
+)
+
+# Last cash_ratio (and other fields) per symbol, persisted across restarts
+STORE = SnapshotStore(FUNDAMENTALS_STORE_PATH, FIELDS)
 
 def fetch_fundamentals(symbol: str):
     """
-    Stub: In reality, call a financial API to fetch balance sheet/income statement.
-    E.g., AlphaVantage, FinancialModelingPrep.
-    Here, we return random “cash ratio” data.
+    Fetches one symbol's fundamentals from PROVIDER.
+    Returns e.g. {"cash_ratio": float}, or None if the fetch failed.
     """
-    # Fake: cash ratio between 0.1 and 2.0
-    return {"cash_ratio": random.uniform(0.1, 2.0)}
+    try:
+        return PROVIDER.fetch(symbol)
+    except Exception as e:
+        print(f"[FundamentalsAgent] Error fetching {symbol}: {e}")
+        return None
 
-# Store last cash_ratio to detect anomaly
-LAST_CASH_RATIO = {}
+@tracing.timed("fundamentals_fetch")
+def fetch_universe(symbols: np.ndarray) -> dict:
+    """
+    Fetches every symbol through a bounded thread pool.
+    Returns {field: array aligned with symbols}, NaN where a fetch failed.
+    """
+    with ThreadPoolExecutor(max_workers=FUNDAMENTALS_WORKERS) as pool:
+        results = list(pool.map(tracing.bind(fetch_fundamentals), symbols))
+    return {
+        field: np.array([r[field] if r else np.nan for r in results], dtype=float)
+        for field in FIELDS
+    }
 
 def check_fundamentals():
     """
     Scheduled job (once every 24h):
-      - For each ticker, fetch fundamentals.
-      - If cash ratio dropped more than 20% since last check, send alert.
-    """
-    tickers = ["AAPL", "MSFT", "GOOG"]
-    for symbol in tickers:
-        data = fetch_fundamentals(symbol)
-        cash_ratio = data["cash_ratio"]
-        prev = LAST_CASH_RATIO.get(symbol)
-        LAST_CASH_RATIO[symbol] = cash_ratio
-
-        if prev is not None and cash_ratio < 0.8 * prev:
-            print(f"[FundamentalsAgent] {symbol} cash ratio dropped: {prev:.2f} → {cash_ratio:.2f}")
-            send_event(
-                STRATEGY_AGENT_EVENT_URL,
-                "fundamentals_alert",
-                {"symbol": symbol, "prev_cash_ratio": prev, "new_cash_ratio": cash_ratio}
-            )
+      - Fetch fundamentals for the whole universe concurrently.
+      - Compare every cash ratio with the persisted snapshot in one vectorized
+        step; if it dropped more than FUNDAMENTALS_DROP_THRESHOLD, send alert.
+      - Persist the new values (symbols that failed keep their previous row).
+    """
+    symbols = np.array(sorted(set(FUNDAMENTALS_UNIVERSE)))
+    start = time.time()
+    values = fetch_universe(symbols)
+    snapshot = STORE.load()
+    prev = STORE.aligned(snapshot, symbols, "cash_ratio")
+    cash_ratio = values["cash_ratio"]
+
+    # NaN on either side compares False, so new and failed symbols never fire
+    dropped = cash_ratio < (1.0 - FUNDAMENTALS_DROP_THRESHOLD) * prev
+    for i in np.flatnonzero(dropped):
+        symbol = str(symbols[i])
+        print(f"[FundamentalsAgent] {symbol} cash ratio dropped: {prev[i]:.2f} → {cash_ratio[i]:.2f}")
+        send_event(
+            STRATEGY_AGENT_EVENT_URL,
+            "fundamentals_alert",
+            {"symbol": symbol, "prev_cash_ratio": float(prev[i]), "new_cash_ratio": float(cash_ratio[i])}
+        )
+
+    fetched = ~np.isnan(cash_ratio)
+    STORE.save(
+        symbols[fetched],
+        {field: column[fetched] for field, column in values.items()},
+        np.full(int(fetched.sum()), time.time())
+    )
+    print(f"[FundamentalsAgent] Checked {int(fetched.sum())}/{len(symbols)} symbols "
+          f"in {time.time() - start:.1f}s, {int(dropped.sum())} alerts.")
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    """
+    Latency histograms (universe fetch, outgoing events).
+    """
+    return jsonify({"latency": tracing.snapshot(),
+                    "startup": startup.report()})
 
 @app.route("/events", methods=["POST"])
 def receive_event():
+    """
+    JSON-over-HTTP transport for handle_event().
+    """
+    payload = request.get_json()
+    with tracing.received(payload):
+        body, status = handle_event(payload.get("type"), payload.get("content", {}))
+    return jsonify(body), status
+
+def handle_event(evt_type: str, content: dict):
     """
     Fundamentals Agent does not expect incoming events in this MVP.
     """
-    return jsonify({"status": "ok"}), 200
+    return {"status": "ok"}, 200
+
+def start():
+    """
+    Starts the daily fundamentals scheduler (background work of the agent;
+    see cohost.py).
+    """
+    from apscheduler.schedulers.background import BackgroundScheduler
 
-if __name__ == "__main__":
     scheduler = BackgroundScheduler()
-    scheduler.add_job(check_fundamentals, "interval", hours=24, next_run_time=time.time() + 1)
+    scheduler.add_job(tracing.bind(check_fundamentals), "interval", hours=24,
+                      next_run_time=datetime.now() + timedelta(seconds=1))
     scheduler.start()
     print("[FundamentalsAgent] Scheduler started. Listening on port 5004.")
+
+startup.mark("imported")
+
+if __name__ == "__main__":
+    start()
+    serve_events(handle_event, 5004)
+    startup.ready()
     app.run(host="0.0.0.0", port=5004)
@@ -0,0 +1,80 @@
+# fundamentals_agent/fundamentals_providers.py
+
+import time
+import random
+import zlib
+
+from http_pool import get_session
+from config import HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT
+
+# Fields every provider returns, in snapshot column order
+FIELDS = ("cash_ratio",)
+
+
+class FundamentalsProvider:
+    """
+    Source of per-symbol fundamentals. fetch(symbol) returns a dict with
+    every name in FIELDS, or raises if the symbol cannot be fetched.
+    fetch() is called from several threads at once.
+    """
+
+    name = "base"
+
+    def fetch(self, symbol: str) -> dict:
+        raise NotImplementedError
+
+
+class StubProvider(FundamentalsProvider):
+    """
+    Offline stand-in: a cash ratio between 0.1 and 2.0 that is
+    reproducible per (seed, symbol, call number). An optional `latency`
+    sleep mimics a remote API so the thread pool can be exercised.
+    """
+
+    name = "stub"
+
+    def __init__(self, seed: int = 0, latency: float = 0.0):
+        self.seed = seed
+        self.latency = latency
+        self._calls = {}
+
+    def fetch(self, symbol: str) -> dict:
+        if self.latency:
+            time.sleep(self.latency)
+        call = self._calls[symbol] = self._calls.get(symbol, 0) + 1
+        rng = random.Random(zlib.crc32(f"{self.seed}:{symbol}:{call}".encode()))
+        return {"cash_ratio": rng.uniform(0.1, 2.0)}
+
+
+class FMPProvider(FundamentalsProvider):
+    """
+    FinancialModelingPrep trailing-twelve-month ratios, over the pooled
+    keep-alive session.
+    """
+
+    name = "fmp"
+    URL = "https://financialmodelingprep.com/api/v3/ratios-ttm/{symbol}"
+
+    def __init__(self, api_key: str):
+        self.api_key = api_key
+
+    def fetch(self, symbol: str) -> dict:
+        url = self.URL.format(symbol=symbol)
+        response = get_session(url).get(
+            url,
+            params={"apikey": self.api_key},
+            timeout=(HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT)
+        )
+        response.raise_for_status()
+        rows = response.json()
+        if not rows or rows[0].get("cashRatioTTM") is None:
+            raise ValueError(f"No ratios for {symbol}")
+        return {"cash_ratio": float(rows[0]["cashRatioTTM"])}
+
+
+def make_provider(name: str, api_key: str = None, stub_latency: float = 0.0) -> FundamentalsProvider:
+    if name == "stub":
+        return StubProvider(latency=stub_latency)
+    if name == "fmp":
+        return FMPProvider(api_key)
+    raise ValueError(f"Unknown fundamentals provider: {name}")
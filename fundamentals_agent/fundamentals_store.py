@@ -0,0 +1,71 @@
+# fundamentals_agent/fundamentals_store.py
+
+import os
+import time
+import numpy as np
+
+
+class SnapshotStore:
+    """
+    Last known fundamentals for every symbol, kept in one compressed .npz
+    file: a sorted `symbols` array, one float64 column per field (NaN when
+    never fetched) and the fetch time of each row. Saving writes a
+    temporary file and renames it over the old one, so a crash leaves
+    either the old or the new snapshot, never a mix.
+    """
+
+    def __init__(self, path: str, fields: tuple):
+        self.path = path
+        self.fields = tuple(fields)
+
+    def load(self) -> dict:
+        """
+        Returns {"symbols": array, "fetched_at": array, field: array, ...};
+        empty arrays when there is no snapshot yet.
+        """
+        empty = {"symbols": np.array([], dtype=str), "fetched_at": np.array([])}
+        empty.update({field: np.array([]) for field in self.fields})
+        if not os.path.exists(self.path):
+            return empty
+        with np.load(self.path, allow_pickle=False) as data:
+            snapshot = {name: data[name] for name in data.files}
+        for field in self.fields:
+            if field not in snapshot:
+                snapshot[field] = np.full(len(snapshot["symbols"]), np.nan)
+        return snapshot
+
+    def aligned(self, snapshot: dict, symbols: np.ndarray, field: str) -> np.ndarray:
+        """
+        Column `field` of the snapshot reordered to `symbols` (NaN for
+        symbols the snapshot does not hold).
+        """
+        known = snapshot["symbols"]
+        out = np.full(len(symbols), np.nan)
+        if len(known):
+            pos = np.clip(np.searchsorted(known, symbols), 0, len(known) - 1)
+            hit = known[pos] == symbols
+            out[hit] = snapshot[field][pos[hit]]
+        return out
+
+    def save(self, symbols: np.ndarray, values: dict, fetched_at: np.ndarray):
+        """
+        Writes rows for `symbols` (values given as {field: array}), keeping
+        rows of symbols that are not in this update.
+        """
+        old = self.load()
+        keep = ~np.isin(old["symbols"], symbols)
+        merged_symbols = np.concatenate([old["symbols"][keep], symbols]).astype(str)
+        order = np.argsort(merged_symbols, kind="stable")
+        columns = {
+            "symbols": merged_symbols[order],
+            "fetched_at": np.concatenate([old["fetched_at"][keep], fetched_at])[order],
+        }
+        for field in self.fields:
+            columns[field] = np.concatenate([old[field][keep], values[field]])[order]
+
+        tmp = f"{self.path}.{os.getpid()}.{int(time.time() * 1000)}.tmp"
+        with open(tmp, "wb") as f:
+            np.savez_compressed(f, **columns)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
@@ -0,0 +1,127 @@
+# http_pool.py
+
+import json
+import time
+import random
+import asyncio
+import threading
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+
+from config import (
+    HTTP_CONNECT_TIMEOUT,
+    HTTP_READ_TIMEOUT,
+    HTTP_MAX_RETRIES,
+    HTTP_BACKOFF,
+    HTTP_POOL_SIZE
+)
+
+# One keep-alive session per target (scheme://host:port), shared by all threads
+_SESSIONS = {}
+_SESSIONS_LOCK = threading.Lock()
+
+# aiohttp sessions are bound to an event loop: one per (loop, target)
+_ASYNC_SESSIONS = {}
+
+def get_session(url: str) -> requests.Session:
+    """
+    Returns the pooled keep-alive session for url's host.
+    """
+    target = _target(url)
+    session = _SESSIONS.get(target)
+    if session is None:
+        with _SESSIONS_LOCK:
+            session = _SESSIONS.get(target)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=HTTP_POOL_SIZE)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                _SESSIONS[target] = session
+    return session
+
+def post_json(url: str, payload, idempotent: bool, timeout: tuple = None,
+              retries: int = None, headers: dict = None) -> requests.Response:
+    """
+    POSTs payload as JSON over the pooled session for url.
+
+    Requests that never reached the server (connection refused or connect
+    timeout) are always retried. Read timeouts, dropped connections and 5xx
+    responses are retried only when `idempotent`, since the receiver may
+    already have acted on them. Retries back off exponentially with full
+    jitter. Raises the last error once retries are exhausted.
+    """
+    timeout = timeout or (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT)
+    retries = HTTP_MAX_RETRIES if retries is None else retries
+    session = get_session(url)
+    for attempt in range(retries + 1):
+        try:
+            response = session.post(url, json=payload, timeout=timeout, headers=headers)
+            if response.status_code >= 500 and idempotent and attempt < retries:
+                _sleep_backoff(attempt)
+                continue
+            response.raise_for_status()
+            return response
+        except (requests.ConnectionError, requests.Timeout) as e:
+            if attempt >= retries or not (idempotent or _never_sent(e)):
+                raise
+            _sleep_backoff(attempt)
+
+async def post_json_async(url: str, payload, idempotent: bool, timeout: tuple = None,
+                          retries: int = None, headers: dict = None):
+    """
+    asyncio counterpart of post_json() built on aiohttp, with the same
+    timeout and retry policy. Returns the decoded JSON body ({} if empty).
+    """
+    import aiohttp
+
+    connect, read = timeout or (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT)
+    retries = HTTP_MAX_RETRIES if retries is None else retries
+    session = _get_async_session(url)
+    client_timeout = aiohttp.ClientTimeout(sock_connect=connect, sock_read=read)
+    for attempt in range(retries + 1):
+        try:
+            async with session.post(url, json=payload, timeout=client_timeout, headers=headers) as response:
+                if response.status >= 500 and idempotent and attempt < retries:
+                    await asyncio.sleep(_backoff(attempt))
+                    continue
+                response.raise_for_status()
+                text = await response.text()
+                return json.loads(text) if text else {}
+        except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+            never_sent = isinstance(e, aiohttp.ClientConnectorError)
+            if attempt >= retries or not (idempotent or never_sent):
+                raise
+            await asyncio.sleep(_backoff(attempt))
+
+def _get_async_session(url: str):
+    import aiohttp
+
+    loop = asyncio.get_running_loop()
+    key = (loop, _target(url))
+    session = _ASYNC_SESSIONS.get(key)
+    if session is None or session.closed:
+        # Drop sessions of loops that have since been closed
+        for stale in [k for k in _ASYNC_SESSIONS if k[0].is_closed()]:
+            del _ASYNC_SESSIONS[stale]
+        connector = aiohttp.TCPConnector(limit_per_host=HTTP_POOL_SIZE)
+        session = _ASYNC_SESSIONS[key] = aiohttp.ClientSession(connector=connector)
+    return session
+
+def _target(url: str) -> str:
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+def _never_sent(error: Exception) -> bool:
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    reason = getattr(error.args[0], "reason", None) if error.args else None
+    return isinstance(reason, NewConnectionError)
+
+def _backoff(attempt: int) -> float:
+    return random.uniform(0, HTTP_BACKOFF * (2 ** attempt))
+
+def _sleep_backoff(attempt: int):
+    time.sleep(_backoff(attempt))
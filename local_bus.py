@@ -0,0 +1,99 @@
+# local_bus.py
+
+import pickle
+from concurrent.futures import ThreadPoolExecutor
+
+import tracing
+
+# Agents hosted in this process (see cohost.py), by the URLs in config.py
+# their peers already use: /events URL -> LocalAgent, /rpc URL -> LocalAgent.
+# Both stay empty when every agent runs as its own process.
+_EVENT_ROUTES = {}
+_RPC_ROUTES = {}
+
+
+class LocalAgent:
+    """
+    An agent hosted in this process. Events and JSON-RPC calls addressed
+    to its URLs are handed straight to handle_event(evt_type, content) or
+    rpc_methods[method](**params) instead of going over localhost HTTP.
+
+    Every call runs on the agent's own thread pool and under the agent's
+    context (its tracing name), so a slow or busy agent only queues its
+    own work. Messages are copied on the way in and results on the way
+    out, so agents never share mutable objects, as over the wire.
+    """
+
+    def __init__(self, name: str, context, handle_event=None, rpc_methods: dict = None, workers: int = 8):
+        self.name = name
+        self.context = context
+        self.handle_event = handle_event
+        self.rpc_methods = rpc_methods or {}
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=name)
+
+    def run(self, fn, *args):
+        """
+        Runs fn(*args) on this agent's pool, in its context; returns a Future.
+        """
+        return self.executor.submit(self.context.copy().run, fn, *args)
+
+    def _deliver(self, payload: dict):
+        try:
+            with tracing.received(payload):
+                self.handle_event(payload.get("type"), payload.get("content", {}))
+        except Exception as e:
+            print(f"[{self.name}] Error handling {payload.get('type')}: {e}")
+
+    def _call(self, calls: list, trace_headers: dict) -> list:
+        results = []
+        with tracing.from_headers(trace_headers), tracing.timed("rpc"):
+            for method, params in calls:
+                fn = self.rpc_methods.get(method)
+                if fn is None:
+                    raise RuntimeError(f"JSON-RPC error: method {method!r} not found")
+                try:
+                    results.append(fn(**(params or {})))
+                except Exception as e:
+                    raise RuntimeError(f"JSON-RPC error: {e}") from e
+        return copy(results)
+
+
+def register(agent: LocalAgent, event_url: str = None, rpc_url: str = None) -> LocalAgent:
+    """
+    Routes `event_url` and/or `rpc_url` to `agent` for the rest of the process.
+    """
+    if event_url and agent.handle_event is not None:
+        _EVENT_ROUTES[event_url] = agent
+    if rpc_url and agent.rpc_methods:
+        _RPC_ROUTES[rpc_url] = agent
+    return agent
+
+def send(target_url: str, payload: dict) -> bool:
+    """
+    Queues an event envelope for the agent behind target_url when it is
+    hosted here and returns True; returns False otherwise.
+    """
+    agent = _EVENT_ROUTES.get(target_url)
+    if agent is None:
+        return False
+    agent.run(agent._deliver, copy(payload))
+    return True
+
+def call(url: str, calls: list):
+    """
+    Runs [(method, params), ...] on the agent behind the JSON-RPC url when
+    it is hosted here, under the caller's trace. Returns a Future for the
+    list of results (raising RuntimeError like a JSON-RPC error reply), or
+    None when url is not hosted in this process.
+    """
+    agent = _RPC_ROUTES.get(url)
+    if agent is None:
+        return None
+    return agent.run(agent._call, copy(calls), tracing.headers())
+
+def copy(obj):
+    """
+    Deep copy through pickle, which is fast for the plain dicts, lists and
+    arrays agents exchange.
+    """
+    return pickle.loads(pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL))
@@ -1,24 +1,72 @@
 # market_data_agent/app.py
 
-from flask import Flask, request, jsonify
+import time
+import json
+from flask import Flask, Response, request, jsonify
 from jsonrpcserver import methods
-import yfinance as yf
-import pandas as pd
+import numpy as np
+
+from bar_codec import bars_from_frame, empty_bars, encode_bars, negotiate
+from config import (
+    MARKET_DATA_PRICE_TTL,
+    MARKET_DATA_HISTORY_TTL,
+    MARKET_DATA_CACHE_MAX_BYTES,
+    MARKET_DATA_STORE_DIR,
+    MARKET_DATA_FEED,
+    MARKET_DATA_FEED_INTERVAL,
+    MARKET_DATA_POLL_SECONDS,
+    MARKET_DATA_POLL_PERIOD,
+    MARKET_DATA_REPLAY_DIR,
+    MARKET_DATA_REPLAY_RATE,
+    MARKET_DATA_SUBSCRIBER_QUEUE,
+    MARKET_DATA_SOURCE,
+    MARKET_DATA_SYNTHETIC_LATENCY
+)
+from market_cache import TTLCache
+import tracing
+import startup
+from bar_store import BarStore, period_start_ns
+from bar_feed import BarHub, PollingFeed, ReplayFeed
+from market_sources import make_source
 
 app = Flask(__name__)
+tracing.configure("MarketDataAgent")
+
+# Upstream quotes and bars ("yfinance", or "synthetic" for offline runs)
+SOURCE = make_source(MARKET_DATA_SOURCE, synthetic_latency=MARKET_DATA_SYNTHETIC_LATENCY)
+
+# In-memory cache to avoid repeated downloads. Concurrent requests for the
+# same key share a single upstream fetch.
+CACHE = TTLCache(max_bytes=MARKET_DATA_CACHE_MAX_BYTES)
+
+# Persistent, memory-mapped OHLCV history; keeps restarts warm
+STORE = BarStore(MARKET_DATA_STORE_DIR)
+
+# Subscribers to pushed bars, fed by one upstream poller or a local replay
+HUB = BarHub(max_queue=MARKET_DATA_SUBSCRIBER_QUEUE)
+
+# Seconds between SSE keep-alive comments on an idle stream
+_KEEPALIVE = 15.0
 
-# In-memory cache to avoid repeated downloads
-CACHE = {}
+# covered_from marker for series filled with period="max"
+_MAX_COVERAGE = int(np.iinfo(np.int64).min)
 
 @methods.add
 def get_price(symbol: str) -> dict:
     """
-    JSON-RPC method: get the latest price for a ticker via yfinance.
+    JSON-RPC method: get the latest price for a ticker from SOURCE.
     Returns: { "symbol": str, "price": float, "timestamp": ISO8601 }
     """
-    # Use yfinance to fetch real-time price (or close of last day if off-hours)
-    ticker = yf.Ticker(symbol)
-    data = ticker.history(period="1d", interval="1m")
+    return CACHE.get_or_fetch(
+        ("get_price", symbol),
+        MARKET_DATA_PRICE_TTL,
+        lambda: _fetch_price(symbol)
+    )
+
+def _fetch_price(symbol: str) -> dict:
+    # Fetch real-time price (or close of last day if off-hours)
+    with tracing.timed("upstream_fetch", source=SOURCE.name):
+        data = SOURCE.history(symbol, period="1d", interval="1m")
     if data.empty:
         return { "symbol": symbol, "error": "No data" }
     last_row = data.iloc[-1]
@@ -27,28 +75,229 @@ def get_price(symbol: str) -> dict:
     return { "symbol": symbol, "price": price, "timestamp": timestamp }
 
 @methods.add
-def get_historical(symbol: str, period: str = "1mo", interval: str = "1d") -> dict:
+def get_historical(symbol: str, period: str = "1mo", interval: str = "1d",
+                   format: str = "rows", encodings: list = None) -> dict:
     """
     JSON-RPC method: get historical OHLC data.
-    Returns a dict with dates and closing prices for simplicity.
-    """
-    df = yf.download(tickers=symbol, period=period, interval=interval, progress=False)
-    if df.empty:
-        return { "symbol": symbol, "history": [] }
-    history = []
-    for dt, row in df.iterrows():
-        history.append({
-            "date": dt.to_pydatetime().strftime("%Y-%m-%d"),
-            "close": float(row["Close"])
-        })
+    format="rows" returns a dict with dates and closing prices for simplicity.
+    format="columns" returns parallel dates/open/high/low/close/volume arrays,
+    encoded with the first entry of `encodings` we support (see bar_codec).
+    """
+    bars = CACHE.get_or_fetch(
+        ("get_historical", symbol, period, interval),
+        MARKET_DATA_HISTORY_TTL,
+        lambda: _fetch_bars([symbol], period, interval)[symbol]
+    )
+    return _format_history(symbol, bars, format, encodings)
+
+@methods.add
+def get_prices(symbols: list) -> dict:
+    """
+    JSON-RPC method: latest prices for many tickers in one call.
+    Symbols missing from the cache are fetched with a single multi-ticker
+    upstream download.
+    Returns: { "prices": { symbol: { "symbol", "price", "timestamp" } } }
+    """
+    results = CACHE.get_or_fetch_many(
+        [("get_price", sym) for sym in symbols],
+        MARKET_DATA_PRICE_TTL,
+        lambda keys: {
+            ("get_price", sym): quote
+            for sym, quote in _fetch_prices([key[1] for key in keys]).items()
+        }
+    )
+    return { "prices": { key[1]: quote for key, quote in results.items() } }
+
+@methods.add
+def get_historicals(symbols: list, period: str = "1mo", interval: str = "1d",
+                    format: str = "rows", encodings: list = None) -> dict:
+    """
+    JSON-RPC method: historical OHLC data for many tickers in one call.
+    Accepts the same format/encodings options as get_historical.
+    Returns: { "histories": { symbol: <get_historical result> } }
+    """
+    results = CACHE.get_or_fetch_many(
+        [("get_historical", sym, period, interval) for sym in symbols],
+        MARKET_DATA_HISTORY_TTL,
+        lambda keys: {
+            ("get_historical", sym, period, interval): bars
+            for sym, bars in _fetch_bars([key[1] for key in keys], period, interval).items()
+        }
+    )
+    return {
+        "histories": {
+            key[1]: _format_history(key[1], bars, format, encodings)
+            for key, bars in results.items()
+        }
+    }
+
+def _fetch_prices(symbols: list) -> dict:
+    frames = _download(symbols, period="1d", interval="1m")
+    prices = {}
+    for sym in symbols:
+        closes = frames[sym]["Close"].dropna() if sym in frames else None
+        if closes is None or closes.empty:
+            prices[sym] = { "symbol": sym, "error": "No data" }
+            continue
+        prices[sym] = {
+            "symbol": sym,
+            "price": float(closes.iloc[-1]),
+            "timestamp": closes.index[-1].to_pydatetime().isoformat()
+        }
+    return prices
+
+def _fetch_bars(symbols: list, period: str, interval: str) -> dict:
+    """
+    Returns { symbol: bars } for the requested period, where bars is a dict
+    of NumPy columns (see bar_codec) sliced straight out of the local bar
+    store. Only what the store lacks is downloaded: the whole period for
+    series that do not reach back far enough yet or have no bars, and
+    otherwise just the bars from the last stored timestamp onwards.
+    """
+    start_ns = period_start_ns(period, time.time_ns())
+    wanted = start_ns if start_ns is not None else _MAX_COVERAGE
+    full, incremental = [], []
+    for sym in symbols:
+        covered = STORE.covered_from(sym, interval)
+        if covered is None or covered > wanted or STORE.last_ts(sym, interval) is None:
+            full.append(sym)
+        else:
+            incremental.append(sym)
+
+    if full:
+        frames = _download(full, period=period, interval=interval)
+        for sym in full:
+            bars = bars_from_frame(frames[sym]) if sym in frames else empty_bars()
+            # An empty download (yfinance's answer to transient errors too)
+            # records no coverage and keeps what is stored, so the next call
+            # fetches again
+            if len(bars["ts"]):
+                STORE.replace(sym, interval, bars, covered_from=wanted)
+
+    if incremental:
+        import pandas as pd
+
+        since = min(STORE.last_ts(sym, interval) for sym in incremental)
+        frames = _download(incremental, interval=interval,
+                           start=pd.Timestamp(since, unit="ns", tz="UTC").to_pydatetime())
+        for sym in incremental:
+            if sym in frames:
+                STORE.append(sym, interval, bars_from_frame(frames[sym]))
+
+    return { sym: STORE.read(sym, interval, start_ns) for sym in symbols }
+
+def _download(symbols: list, **kwargs) -> dict:
+    """
+    One multi-ticker upstream download, split into { symbol: DataFrame }.
+    """
+    with tracing.timed("upstream_fetch", source=SOURCE.name):
+        return SOURCE.download(symbols, **kwargs)
+
+def _format_history(symbol: str, bars: dict, format: str, encodings: list) -> dict:
+    if format == "columns":
+        payload = { "symbol": symbol, "format": "columns" }
+        payload.update(encode_bars(bars, negotiate(encodings)))
+        return payload
+    dates = np.datetime_as_string(bars["ts"].view("datetime64[ns]"), unit="D").tolist()
+    history = [
+        { "date": date, "close": close }
+        for date, close in zip(dates, bars["close"].tolist())
+    ]
     return { "symbol": symbol, "history": history }
 
+@methods.add
+def get_cache_stats() -> dict:
+    """
+    JSON-RPC method: hit/miss/eviction counters of the price/history cache.
+    """
+    return CACHE.stats()
+
+@app.route("/subscribe", methods=["GET"])
+def subscribe():
+    """
+    Server-sent event stream of new bars, e.g.
+        GET /subscribe?symbols=AAPL,MSFT&interval=1d&since=<ns>&encodings=base64,json
+    Every event is { "interval": str, "bars": { symbol: <columns payload> } }
+    with only the bars that are new since the previous event (the forming
+    bar is sent again when it changes). With `since` (ns timestamp), stored
+    bars from it on are sent first, so a reconnecting client has no gap and
+    gets any revision of the bar it saw last.
+    """
+    symbols = [sym for sym in request.args.get("symbols", "").split(",") if sym]
+    interval = request.args.get("interval", FEED.interval)
+    if not symbols:
+        return jsonify({"error": "no symbols"}), 400
+    if interval != FEED.interval:
+        return jsonify({"error": f"only interval {FEED.interval} is streamed"}), 400
+    since = request.args.get("since", type=int)
+    encoding = negotiate(request.args.get("encodings", "json").split(","))
+    sub = HUB.subscribe(symbols, interval)
+
+    def stream():
+        try:
+            if since is not None:
+                backfill = {sym: FEED.history(sym, since) for sym in symbols}
+                yield _sse_event(interval, {sym: bars for sym, bars in backfill.items() if len(bars["ts"])}, encoding)
+            while True:
+                update = sub.get(timeout=_KEEPALIVE)
+                if update is not None:
+                    yield _sse_event(interval, update, encoding)
+                elif sub.overflowed:
+                    yield "event: overflow\ndata: {}\n\n"
+                    return
+                else:
+                    yield ": keepalive\n\n"
+        finally:
+            HUB.unsubscribe(sub)
+
+    return Response(stream(), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+def _sse_event(interval: str, update: dict, encoding: str) -> str:
+    payload = {
+        "interval": interval,
+        "bars": {sym: encode_bars(bars, encoding) for sym, bars in update.items()}
+    }
+    return "event: bars\ndata: " + json.dumps(payload, separators=(",", ":")) + "\n\n"
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    """
+    Cache counters, subscriber counts, feed progress and latency
+    histograms (upstream_fetch, rpc).
+    """
+    return jsonify({"cache": CACHE.stats(), "hub": HUB.stats(), "feed": FEED.stats(),
+                    "latency": tracing.snapshot(),
+                    "startup": startup.report()})
+
 @app.route("/rpc", methods=["POST"])
 def rpc_server():
     request_json = request.get_data().decode()
-    response = methods.dispatch(request_json)
+    with tracing.from_headers(request.headers), tracing.timed("rpc"):
+        response = methods.dispatch(request_json)
     return jsonify(response)
 
+# Source of pushed bars: incremental upstream polls for the subscribed
+# symbols, or a recorded bar store replayed offline
+if MARKET_DATA_FEED == "replay":
+    FEED = ReplayFeed(HUB, MARKET_DATA_REPLAY_DIR, MARKET_DATA_FEED_INTERVAL, rate=MARKET_DATA_REPLAY_RATE)
+else:
+    FEED = PollingFeed(HUB, _fetch_bars, STORE, MARKET_DATA_FEED_INTERVAL,
+                       period=MARKET_DATA_POLL_PERIOD, poll_seconds=MARKET_DATA_POLL_SECONDS)
+
+# JSON-RPC methods by name, for in-process calls (see cohost.py)
+RPC_METHODS = {fn.__name__: fn for fn in (get_price, get_historical, get_prices, get_historicals, get_cache_stats)}
+
+def start():
+    """
+    Starts the push feed (background work of the agent; see cohost.py).
+    """
+    FEED.start()
+
+startup.mark("imported")
+
 if __name__ == "__main__":
+    start()
+    startup.ready()
     # Run on port 5001
-    app.run(host="0.0.0.0", port=5001)
+    app.run(host="0.0.0.0", port=5001, threaded=True)
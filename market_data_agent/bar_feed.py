@@ -0,0 +1,244 @@
+# market_data_agent/bar_feed.py
+
+import os
+import time
+import queue
+import threading
+from urllib.parse import unquote
+import numpy as np
+
+from bar_codec import BAR_FIELDS
+from bar_store import BarStore
+import tracing
+
+_COLUMNS = ("ts",) + BAR_FIELDS
+
+
+class Subscription:
+    """
+    One consumer's view of the hub: the symbols it asked for and a bounded
+    queue of {symbol: bars} updates. A consumer that falls `max_queue`
+    updates behind is cut off (`overflowed`) rather than letting the queue
+    grow; it reconnects with `since` and is backfilled from the store.
+    """
+
+    def __init__(self, symbols: list, interval: str, max_queue: int):
+        self.symbols = frozenset(symbols)
+        self.interval = interval
+        self.overflowed = False
+        self._queue = queue.Queue(max_queue)
+
+    def get(self, timeout: float):
+        """
+        Next update, or None after `timeout` seconds without one.
+        """
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class BarHub:
+    """
+    Fan-out of new bars to subscribers.
+
+    Feeds call publish(interval, {symbol: bars}) with whatever window they
+    just read. The hub keeps the last row it published for each series and
+    forwards only rows past it, plus that row again if it changed (the
+    forming bar). Each subscriber gets one update per publish with just
+    its own symbols. publish() is called from the single feed thread.
+    """
+
+    def __init__(self, max_queue: int = 1000):
+        self.max_queue = max_queue
+        self._subs = {}       # (symbol, interval) -> set of Subscription
+        self._last = {}       # (symbol, interval) -> last published row
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self.published = 0
+        self.overflows = 0
+
+    def subscribe(self, symbols: list, interval: str) -> Subscription:
+        sub = Subscription(symbols, interval, self.max_queue)
+        with self._lock:
+            for symbol in sub.symbols:
+                self._subs.setdefault((symbol, interval), set()).add(sub)
+            self._changed.notify_all()
+        return sub
+
+    def unsubscribe(self, sub: Subscription):
+        with self._lock:
+            for symbol in sub.symbols:
+                subs = self._subs.get((symbol, sub.interval))
+                if subs is not None:
+                    subs.discard(sub)
+                    if not subs:
+                        del self._subs[(symbol, sub.interval)]
+
+    def wanted(self, interval: str, wait: float = None) -> list:
+        """
+        Symbols with at least one subscriber for `interval`. With `wait`,
+        blocks up to that long for a first subscriber.
+        """
+        with self._lock:
+            if wait is not None and not self._subs:
+                self._changed.wait(wait)
+            return sorted(symbol for symbol, iv in self._subs if iv == interval)
+
+    def publish(self, interval: str, bars_by_symbol: dict) -> int:
+        """
+        Forwards the new part of each series to its subscribers. Returns
+        the number of rows forwarded.
+        """
+        updates = {}
+        for symbol, bars in bars_by_symbol.items():
+            fresh = self._fresh((symbol, interval), bars)
+            if fresh is not None:
+                updates[symbol] = fresh
+        if not updates:
+            return 0
+
+        with self._lock:
+            targets = {}
+            for symbol in updates:
+                for sub in self._subs.get((symbol, interval), ()):
+                    targets.setdefault(sub, {})[symbol] = updates[symbol]
+        for sub, update in targets.items():
+            try:
+                sub._queue.put_nowait(update)
+            except queue.Full:
+                sub.overflowed = True
+                self.overflows += 1
+                self.unsubscribe(sub)
+        rows = sum(len(bars["ts"]) for bars in updates.values())
+        self.published += rows
+        return rows
+
+    def stats(self) -> dict:
+        with self._lock:
+            subscribers = {id(sub) for subs in self._subs.values() for sub in subs}
+            return {
+                "subscribers": len(subscribers),
+                "series": len(self._subs),
+                "published_rows": self.published,
+                "overflows": self.overflows,
+            }
+
+    def _fresh(self, key, bars: dict):
+        ts = bars["ts"]
+        if not len(ts):
+            return None
+        last = self._last.get(key)
+        start = 0
+        if last is not None:
+            start = int(np.searchsorted(ts, last[0], side="left"))
+            if start < len(ts) and ts[start] == last[0]:
+                row = tuple(float(bars[field][start]) for field in BAR_FIELDS)
+                if np.allclose(row, last[1:], equal_nan=True):
+                    start += 1
+        if start >= len(ts):
+            return None
+        self._last[key] = (int(ts[-1]),) + tuple(float(bars[field][-1]) for field in BAR_FIELDS)
+        return {name: np.asarray(bars[name][start:]) for name in _COLUMNS}
+
+
+class PollingFeed:
+    """
+    Live feed for one bar interval: every `poll_seconds` it fetches the
+    last `period` of bars for the union of subscribed symbols with a single
+    incremental upstream call (fetch_bars(symbols, period, interval) -> {symbol: bars})
+    and publishes what is new. Nothing is fetched while nobody subscribes.
+    """
+
+    def __init__(self, hub: BarHub, fetch_bars, store: BarStore, interval: str = "1d",
+                 period: str = "5d", poll_seconds: float = 60.0):
+        self.hub = hub
+        self.fetch_bars = fetch_bars
+        self.store = store
+        self.interval = interval
+        self.period = period
+        self.poll_seconds = poll_seconds
+        self.polls = 0
+
+    def start(self):
+        threading.Thread(target=tracing.bind(self._run), name="bar-feed", daemon=True).start()
+        return self
+
+    def history(self, symbol: str, since_ns: int) -> dict:
+        """
+        Stored bars from `since_ns` on, to backfill a (re)connecting
+        subscriber. The bar at `since_ns` is included: it is the one the
+        subscriber saw last, and it may have been revised since.
+        """
+        return self.store.read(symbol, self.interval, since_ns)
+
+    def stats(self) -> dict:
+        return {"feed": "poll", "interval": self.interval, "polls": self.polls}
+
+    def _run(self):
+        while True:
+            symbols = self.hub.wanted(self.interval, wait=self.poll_seconds)
+            if symbols:
+                started = time.monotonic()
+                try:
+                    self.hub.publish(self.interval, self.fetch_bars(symbols, self.period, self.interval))
+                    self.polls += 1
+                except Exception as e:
+                    print(f"[MarketDataAgent] Feed poll failed: {e}")
+                time.sleep(max(0.0, self.poll_seconds - (time.monotonic() - started)))
+
+
+class ReplayFeed:
+    """
+    Offline feed that replays a recorded BarStore directory (e.g. one the
+    agent filled earlier, or synthetic data) at `rate` timestamps per
+    second. Every series under `<directory>/<interval>` is merged into one
+    clock. Playback starts when the first subscriber connects.
+    """
+
+    def __init__(self, hub: BarHub, directory: str, interval: str = "1d", rate: float = 10.0):
+        self.hub = hub
+        self.store = BarStore(directory)
+        self.interval = interval
+        self.rate = rate
+        series_dir = os.path.join(directory, interval)
+        self.symbols = sorted(unquote(name) for name in os.listdir(series_dir)) \
+            if os.path.isdir(series_dir) else []
+        self.cursor = np.iinfo(np.int64).min
+        self.steps = 0
+
+    def start(self):
+        threading.Thread(target=tracing.bind(self._run), name="bar-replay", daemon=True).start()
+        return self
+
+    def history(self, symbol: str, since_ns: int) -> dict:
+        """
+        Replayed bars from `since_ns` on (inclusive, as in PollingFeed),
+        up to the replay clock.
+        """
+        return self.store.read(symbol, self.interval, since_ns, self.cursor + 1)
+
+    def stats(self) -> dict:
+        return {"feed": "replay", "interval": self.interval, "symbols": len(self.symbols),
+                "steps": self.steps, "cursor": int(self.cursor)}
+
+    def _run(self):
+        while not self.hub.wanted(self.interval, wait=1.0):
+            pass
+        series = {symbol: self.store.read(symbol, self.interval) for symbol in self.symbols}
+        clock = np.unique(np.concatenate([bars["ts"] for bars in series.values()])) \
+            if series else np.empty(0, dtype=np.int64)
+        rows = dict.fromkeys(series, 0)
+        for ts in clock.tolist():
+            started = time.monotonic()
+            step = {}
+            for symbol, bars in series.items():
+                row = rows[symbol]
+                if row < len(bars["ts"]) and bars["ts"][row] == ts:
+                    step[symbol] = {name: bars[name][row:row + 1] for name in _COLUMNS}
+                    rows[symbol] = row + 1
+            self.cursor = ts
+            self.hub.publish(self.interval, step)
+            self.steps += 1
+            time.sleep(max(0.0, 1.0 / self.rate - (time.monotonic() - started)))
+        print(f"[MarketDataAgent] Replay finished after {self.steps} steps.")
@@ -0,0 +1,203 @@
+# market_data_agent/bar_store.py
+
+import os
+import json
+import fcntl
+import threading
+from contextlib import contextmanager
+from urllib.parse import quote
+import numpy as np
+
+from bar_codec import BAR_FIELDS, empty_bars
+
+_COLUMNS = ("ts",) + BAR_FIELDS
+_DTYPES = {"ts": np.dtype("<i8"), **{field: np.dtype("<f8") for field in BAR_FIELDS}}
+
+_NS = {
+    "m": 60 * 10**9,
+    "h": 3600 * 10**9,
+    "d": 86400 * 10**9,
+    "wk": 7 * 86400 * 10**9,
+    "mo": 30 * 86400 * 10**9,
+    "y": 365 * 86400 * 10**9,
+}
+
+def span_ns(text: str) -> int:
+    """
+    Length of a yfinance period/interval string ("1m", "60m", "1d", "1wk",
+    "3mo", "10y", ...) in nanoseconds. Months and years are approximate.
+    """
+    digits = len(text) - len(text.lstrip("0123456789"))
+    count = int(text[:digits] or 1)
+    return count * _NS[text[digits:]]
+
+def period_start_ns(period: str, now_ns: int):
+    """
+    Earliest timestamp a yfinance `period` covers, or None for "max".
+    """
+    if period == "max":
+        return None
+    if period == "ytd":
+        year = np.datetime64(now_ns, "ns").astype("datetime64[Y]")
+        return int(year.astype("datetime64[ns]").view("<i8"))
+    return now_ns - span_ns(period)
+
+
+class BarStore:
+    """
+    Persistent OHLCV store. Each (symbol, interval) series lives in its own
+    directory with one append-only little-endian file per column
+    (ts.bin, open.bin, ...) plus a small meta.json.
+
+    Reads go through np.memmap, so a range query is a pair of searchsorted()
+    calls and zero-copy slices of the mapped columns. The store survives
+    restarts; the caller only has to fetch bars newer than last_ts().
+
+    Writes to a series are serialized across threads and, through a flock
+    on the series' .lock file, across processes sharing the directory.
+    A writer drops its cached maps and meta before looking at the series,
+    so it always extends what is on disk; another process's readers keep
+    their (still valid) snapshot until their own next write to the series.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self._maps = {}    # (symbol, interval) -> {column: np.memmap}
+        self._meta = {}    # (symbol, interval) -> dict
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def covered_from(self, symbol: str, interval: str):
+        """
+        Start of the window the series has been filled from (None = never
+        filled, a very small number = "max").
+        """
+        return self._read_meta(symbol, interval).get("covered_from")
+
+    def last_ts(self, symbol: str, interval: str):
+        ts = self._columns(symbol, interval)["ts"]
+        return int(ts[-1]) if len(ts) else None
+
+    def read(self, symbol: str, interval: str, start_ns: int = None, end_ns: int = None) -> dict:
+        """
+        Bars with start_ns <= ts < end_ns as read-only views of the mapped files.
+        """
+        columns = self._columns(symbol, interval)
+        ts = columns["ts"]
+        lo = 0 if start_ns is None else int(np.searchsorted(ts, start_ns, side="left"))
+        hi = len(ts) if end_ns is None else int(np.searchsorted(ts, end_ns, side="left"))
+        return {name: column[lo:hi] for name, column in columns.items()}
+
+    def append(self, symbol: str, interval: str, bars: dict) -> int:
+        """
+        Appends bars newer than the last stored one. A bar with the same
+        timestamp as the stored tail replaces it in place (the most recent
+        bar is often still forming). Returns the number of new rows.
+        """
+        with self._writing(symbol, interval):
+            path = self._path(symbol, interval)
+            last = self.last_ts(symbol, interval)
+            ts = bars["ts"]
+            if last is not None:
+                tail = np.flatnonzero(ts == last)
+                if len(tail):
+                    self._overwrite_tail(symbol, interval, bars, tail[-1])
+                keep = ts > last
+                bars = {name: bars[name][keep] for name in _COLUMNS}
+            count = len(bars["ts"])
+            if count:
+                # "ts" is written last: a crash mid-append leaves at most a
+                # few orphan values past the end, which _columns() ignores
+                # and the next append truncates away.
+                stored = len(self._columns(symbol, interval)["ts"])
+                for name in BAR_FIELDS + ("ts",):
+                    target = os.path.join(path, name + ".bin")
+                    if os.path.exists(target):
+                        os.truncate(target, stored * _DTYPES[name].itemsize)
+                    with open(target, "ab") as f:
+                        f.write(np.ascontiguousarray(bars[name], dtype=_DTYPES[name]).tobytes())
+            self._maps.pop((symbol, interval), None)
+            return count
+
+    def replace(self, symbol: str, interval: str, bars: dict, covered_from: int):
+        """
+        Rewrites a whole series, e.g. after fetching an older window than the
+        store covers. Old memmaps stay valid until their readers drop them.
+        """
+        with self._writing(symbol, interval):
+            path = self._path(symbol, interval)
+            for name in _COLUMNS:
+                target = os.path.join(path, name + ".bin")
+                with open(target + ".tmp", "wb") as f:
+                    f.write(np.ascontiguousarray(bars[name], dtype=_DTYPES[name]).tobytes())
+                os.replace(target + ".tmp", target)
+            self._write_meta(symbol, interval, {"covered_from": covered_from})
+            self._maps.pop((symbol, interval), None)
+
+    def _columns(self, symbol, interval) -> dict:
+        key = (symbol, interval)
+        columns = self._maps.get(key)
+        if columns is not None:
+            return columns
+        path = self._path(symbol, interval)
+        files = {name: os.path.join(path, name + ".bin") for name in _COLUMNS}
+        if not all(os.path.exists(f) for f in files.values()):
+            return empty_bars()
+        length = min(os.path.getsize(f) // _DTYPES[name].itemsize for name, f in files.items())
+        if length == 0:
+            return empty_bars()
+        columns = {
+            name: np.memmap(f, dtype=_DTYPES[name], mode="r", shape=(length,))
+            for name, f in files.items()
+        }
+        self._maps[key] = columns
+        return columns
+
+    def _overwrite_tail(self, symbol, interval, bars, row):
+        path = self._path(symbol, interval)
+        n = len(self._columns(symbol, interval)["ts"])
+        for name in BAR_FIELDS:
+            with open(os.path.join(path, name + ".bin"), "r+b") as f:
+                f.seek((n - 1) * _DTYPES[name].itemsize)
+                f.write(np.asarray(bars[name][row], dtype=_DTYPES[name]).tobytes())
+
+    def _read_meta(self, symbol, interval) -> dict:
+        key = (symbol, interval)
+        if key not in self._meta:
+            try:
+                with open(os.path.join(self._path(symbol, interval), "meta.json")) as f:
+                    self._meta[key] = json.load(f)
+            except FileNotFoundError:
+                self._meta[key] = {}
+        return self._meta[key]
+
+    def _write_meta(self, symbol, interval, meta):
+        target = os.path.join(self._path(symbol, interval), "meta.json")
+        with open(target + ".tmp", "w") as f:
+            json.dump(meta, f)
+        os.replace(target + ".tmp", target)
+        self._meta[(symbol, interval)] = meta
+
+    def _path(self, symbol, interval) -> str:
+        return os.path.join(self.root, interval, quote(symbol, safe=""))
+
+    @contextmanager
+    def _writing(self, symbol, interval):
+        """
+        Holds the series' thread lock and its cross-process flock, with
+        this instance's cached view of the series dropped.
+        """
+        key = (symbol, interval)
+        with self._lock:
+            lock = self._locks.setdefault(key, threading.Lock())
+        path = self._path(symbol, interval)
+        with lock:
+            os.makedirs(path, exist_ok=True)
+            fd = os.open(os.path.join(path, ".lock"), os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                self._maps.pop(key, None)
+                self._meta.pop(key, None)
+                yield
+            finally:
+                os.close(fd)
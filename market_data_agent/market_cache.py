@@ -0,0 +1,214 @@
+# market_data_agent/market_cache.py
+
+import sys
+import time
+import threading
+from collections import OrderedDict
+
+
+def estimate_size(value) -> int:
+    """
+    Rough estimate (in bytes) of the memory held by a cached value.
+    DataFrames and NumPy arrays report their own buffer sizes; containers
+    are walked recursively.
+    """
+    if hasattr(value, "memory_usage"):
+        return int(value.memory_usage(deep=True).sum())
+    if hasattr(value, "nbytes"):
+        return int(value.nbytes)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(
+            estimate_size(k) + estimate_size(v) for k, v in value.items()
+        )
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(estimate_size(v) for v in value)
+    return sys.getsizeof(value)
+
+
+class _Pending:
+    """
+    An upstream fetch in flight. Callers asking for the same key wait on
+    `event` and then read `value` (or re-raise `error`).
+    """
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class TTLCache:
+    """
+    Thread-safe LRU cache with a per-entry TTL and a memory cap.
+
+    get_or_fetch() coalesces requests: while one caller is fetching a key
+    from upstream, concurrent callers for the same key block until that
+    fetch finishes and share its result instead of fetching again.
+    Exceptions are propagated to every waiter and never cached.
+    """
+
+    def __init__(self, max_bytes: int, max_entries: int = None, sizeof=estimate_size):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._sizeof = sizeof
+        self._entries = OrderedDict()  # key -> (expires_at, size, value)
+        self._pending = {}             # key -> _Pending
+        self._lock = threading.Lock()
+        self._bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        """
+        Returns (True, value) for a live entry, (False, None) otherwise.
+        """
+        with self._lock:
+            return self._lookup(key, time.monotonic())
+
+    def set(self, key, value, ttl: float):
+        """
+        Stores value under key for ttl seconds, evicting least recently
+        used entries until the cache fits its caps again. Values larger
+        than the whole cache are not stored.
+        """
+        size = self._sizeof(value)
+        with self._lock:
+            self._discard(key)
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (time.monotonic() + ttl, size, value)
+            self._bytes += size
+            while self._entries and (
+                self._bytes > self.max_bytes
+                or (self.max_entries is not None and len(self._entries) > self.max_entries)
+            ):
+                _, (_, old_size, _) = self._entries.popitem(last=False)
+                self._bytes -= old_size
+                self.evictions += 1
+
+    def get_or_fetch(self, key, ttl: float, fetch):
+        """
+        Returns the cached value for key, or calls fetch() once to populate it.
+        """
+        with self._lock:
+            found, value = self._lookup(key, time.monotonic())
+            if found:
+                return value
+            pending = self._pending.get(key)
+            owner = pending is None
+            if owner:
+                pending = _Pending()
+                self._pending[key] = pending
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if not owner:
+            pending.event.wait()
+            if pending.error is not None:
+                raise pending.error
+            return pending.value
+
+        try:
+            value = fetch()
+            pending.value = value
+            self.set(key, value, ttl)
+            return value
+        except BaseException as e:
+            pending.error = e
+            raise
+        finally:
+            with self._lock:
+                self._pending.pop(key, None)
+            pending.event.set()
+
+    def get_or_fetch_many(self, keys, ttl: float, fetch_many) -> dict:
+        """
+        Batch form of get_or_fetch(). fetch_many(missing_keys) is called at
+        most once, with only the keys that are neither cached nor already
+        being fetched by another caller, and must return a {key: value}
+        dict. Keys it leaves out resolve to None and are not cached.
+        """
+        results = {}
+        owned, waiting = [], []
+        with self._lock:
+            now = time.monotonic()
+            for key in dict.fromkeys(keys):
+                found, value = self._lookup(key, now)
+                if found:
+                    results[key] = value
+                    continue
+                pending = self._pending.get(key)
+                if pending is None:
+                    pending = _Pending()
+                    self._pending[key] = pending
+                    self.misses += 1
+                    owned.append((key, pending))
+                else:
+                    self.coalesced += 1
+                    waiting.append((key, pending))
+
+        if owned:
+            try:
+                fetched = fetch_many([key for key, _ in owned])
+                for key, pending in owned:
+                    pending.value = results[key] = fetched.get(key)
+                    if key in fetched:
+                        self.set(key, pending.value, ttl)
+            except BaseException as e:
+                for _, pending in owned:
+                    pending.error = e
+                raise
+            finally:
+                with self._lock:
+                    for key, _ in owned:
+                        self._pending.pop(key, None)
+                for _, pending in owned:
+                    pending.event.set()
+
+        for key, pending in waiting:
+            pending.event.wait()
+            if pending.error is not None:
+                raise pending.error
+            results[key] = pending.value
+        return results
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "in_flight": len(self._pending),
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+    def _lookup(self, key, now):
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        if entry[0] <= now:
+            self._discard(key)
+            self.expirations += 1
+            return False, None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return True, entry[2]
+
+    def _discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[1]
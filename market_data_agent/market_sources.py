@@ -0,0 +1,182 @@
+# market_data_agent/market_sources.py
+
+import time
+import zlib
+import numpy as np
+
+from bar_codec import BAR_FIELDS
+from bar_store import span_ns, period_start_ns
+
+# How far back a synthetic period="max" reaches
+_SYNTHETIC_MAX = "10y"
+
+
+class MarketSource:
+    """
+    Upstream of the Market Data Agent. history(symbol, period, interval)
+    returns one OHLCV DataFrame (Open/High/Low/Close/Volume columns, UTC
+    DatetimeIndex) and download(symbols, **kwargs) returns
+    {symbol: DataFrame} for many symbols in one request, with the same
+    period/interval/start keywords as yfinance. Symbols without data may
+    be missing from the result.
+    """
+
+    name = "base"
+
+    def history(self, symbol: str, period: str, interval: str) -> "pandas.DataFrame":
+        raise NotImplementedError
+
+    def download(self, symbols: list, **kwargs) -> dict:
+        raise NotImplementedError
+
+
+class YFinanceSource(MarketSource):
+    """
+    Yahoo Finance via yfinance (network round trip per request).
+    """
+
+    name = "yfinance"
+
+    def __init__(self):
+        import yfinance
+        self._yf = yfinance
+
+    def history(self, symbol, period, interval):
+        return self._yf.Ticker(symbol).history(period=period, interval=interval)
+
+    def download(self, symbols, **kwargs):
+        df = self._yf.download(tickers=symbols, group_by="ticker", progress=False, **kwargs)
+        return _split_by_symbol(df, symbols)
+
+
+class SyntheticSource(MarketSource):
+    """
+    Deterministic offline stand-in. Every bar is a pure function of
+    (seed, symbol, bar timestamp), so repeated, overlapping and
+    incremental requests agree with each other and with bars generated
+    ahead of time (e.g. a replay store written by bench/load_test.py).
+
+    Log prices follow two sine cycles plus noise: the main cycle of about
+    `cycle` bars (varying per symbol) swings wide enough to push RSI
+    through 70 and 30 once each per cycle. An optional `latency` sleep
+    per request mimics a remote API.
+    """
+
+    name = "synthetic"
+
+    def __init__(self, seed: int = 0, latency: float = 0.0, cycle: float = 40.0,
+                 amplitude: float = 0.08, volatility: float = 0.006):
+        self.seed = seed
+        self.latency = latency
+        self.cycle = cycle
+        self.amplitude = amplitude
+        self.volatility = volatility
+
+    def bars(self, symbol: str, interval: str, start_ns: int, end_ns: int) -> dict:
+        """
+        Bars with start_ns <= ts <= end_ns on the interval grid, as a dict
+        of NumPy columns (see bar_codec).
+        """
+        step = span_ns(interval)
+        k = np.arange(-(-start_ns // step), end_ns // step + 1, dtype=np.int64)
+        key = zlib.crc32(f"{self.seed}:{symbol}".encode())
+        rng = np.random.default_rng(key)
+        base, period, phase, drift_phase = (
+            rng.uniform(20.0, 500.0), self.cycle * rng.uniform(0.8, 1.2),
+            rng.uniform(0.0, 2 * np.pi), rng.uniform(0.0, 2 * np.pi)
+        )
+
+        def log_close(idx):
+            x = 2 * np.pi * idx / period
+            return (np.log(base) + self.amplitude * np.sin(x + phase)
+                    + 0.5 * self.amplitude * np.sin(x / 3.7 + drift_phase)
+                    + self.volatility * _normal(key, idx, 0))
+
+        close = np.exp(log_close(k))
+        open_ = np.exp(log_close(k - 1))
+        wick = self.volatility * np.abs(_normal(key, k, 1))
+        return {
+            "ts": k * step,
+            "open": open_,
+            "high": np.maximum(open_, close) * (1.0 + wick),
+            "low": np.minimum(open_, close) * (1.0 - wick),
+            "close": close,
+            "volume": np.round(1e6 * (1.0 + _uniform(key, k, 2))),
+        }
+
+    def history(self, symbol, period, interval):
+        return self.download([symbol], period=period, interval=interval)[symbol]
+
+    def download(self, symbols, period: str = None, interval: str = "1d", start=None, **kwargs):
+        if self.latency:
+            time.sleep(self.latency)
+        end_ns = time.time_ns()
+        if start is not None:
+            import pandas as pd
+
+            start_ns = pd.Timestamp(start).value
+        else:
+            start_ns = period_start_ns(period or "1mo", end_ns)
+            if start_ns is None:
+                start_ns = period_start_ns(_SYNTHETIC_MAX, end_ns)
+        return {sym: _frame(self.bars(sym, interval, start_ns, end_ns)) for sym in symbols}
+
+
+# Real tickers first (the stub portfolios and the sector limits in
+# risk_agent/limits.json refer to them), then made-up ones
+TICKERS = ("AAPL", "MSFT", "GOOG", "AMZN", "NVDA", "META", "JPM", "V", "JNJ", "WMT",
+           "PG", "XOM", "UNH", "HD", "BAC", "KO", "PEP", "DIS", "CSCO", "INTC")
+
+def universe(size: int) -> list:
+    """
+    `size` symbols for offline runs (load test, microbenchmarks, backtests):
+    TICKERS, then SYN000, SYN001, ...
+    """
+    return list(TICKERS[:size]) + [f"SYN{i:03d}" for i in range(size - len(TICKERS))]
+
+def make_source(name: str, synthetic_latency: float = 0.0) -> MarketSource:
+    if name == "yfinance":
+        return YFinanceSource()
+    if name == "synthetic":
+        return SyntheticSource(latency=synthetic_latency)
+    raise ValueError(f"Unknown market data source: {name}")
+
+
+def _split_by_symbol(df: "pandas.DataFrame", symbols: list) -> dict:
+    """
+    Splits a (possibly multi-ticker) yfinance frame into one OHLCV frame per
+    symbol. Depending on the yfinance version and the number of tickers the
+    columns are either flat or a (ticker, field) / (field, ticker) MultiIndex.
+    """
+    if df.empty:
+        return {}
+    import pandas as pd
+
+    if not isinstance(df.columns, pd.MultiIndex):
+        return { symbols[0]: df } if len(symbols) == 1 else {}
+    level = 0 if set(symbols) & set(df.columns.get_level_values(0)) else 1
+    present = set(df.columns.get_level_values(level))
+    return {
+        sym: df.xs(sym, axis=1, level=level).dropna(how="all")
+        for sym in symbols if sym in present
+    }
+
+def _frame(bars: dict) -> "pandas.DataFrame":
+    import pandas as pd
+
+    index = pd.DatetimeIndex(bars["ts"].astype("datetime64[ns]"), tz="UTC")
+    return pd.DataFrame({field.capitalize(): bars[field] for field in BAR_FIELDS}, index=index)
+
+def _hash(key: int, k: np.ndarray, stream: int) -> np.ndarray:
+    # splitmix64 over (key, stream, bar index); uint64 arithmetic wraps
+    z = k.astype(np.uint64) + np.uint64((key << 8 | stream) * 0x9E3779B97F4A7C15 % 2**64)
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return z ^ (z >> np.uint64(31))
+
+def _uniform(key: int, k: np.ndarray, stream: int) -> np.ndarray:
+    return ((_hash(key, k, stream) >> np.uint64(11)).astype(np.float64) + 0.5) * 2.0**-53
+
+def _normal(key: int, k: np.ndarray, stream: int) -> np.ndarray:
+    u1, u2 = _uniform(key, k, 2 * stream + 10), _uniform(key, k, 2 * stream + 11)
+    return np.sqrt(-2.0 * np.log(u1)) * np.cos(2 * np.pi * u2)
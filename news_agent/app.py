@@ -2,76 +2,146 @@
 
 import os
 import time
-import random
-import requests
+from datetime import datetime, timedelta
 from flask import Flask, request, jsonify
-from apscheduler.schedulers.background import BackgroundScheduler
 
-from config import NEWS_API_KEY, STRATEGY_AGENT_EVENT_URL
+from config import (
+    NEWS_API_KEY,
+    NEWS_SOURCES,
+    NEWS_ALIASES_PATH,
+    NEWS_SEEN_CAPACITY,
+    NEWS_REPLAY_BATCH,
+    NEWS_POLL_SECONDS,
+    NEWS_LEXICON_PATH,
+    NEWS_SCORE_BATCH,
+    NEWS_HALF_LIFE,
+    NEWS_ALERT_THRESHOLD,
+    NEWS_MIN_WEIGHT,
+    STRATEGY_AGENT_EVENT_URL
+)
 from a2a_client import send_event
+from a2a_transport import serve as serve_events
+import tracing
+import startup
+from news_stream import NewsStream, TickerMatcher, make_source
+from sentiment import LexiconModel, TickerSentiment
 
 app = Flask(__name__)
+tracing.configure("NewsAgent")
 
-# For demonstration, list of sample “news” sources
-NEWS_ENDPOINT = "https://newsapi.org/v2/top-headlines"
+# sources -> dedupe on content hash -> route to tickers
+STREAM = NewsStream(
+    [make_source(spec, api_key=NEWS_API_KEY, replay_batch=NEWS_REPLAY_BATCH) for spec in NEWS_SOURCES],
+    TickerMatcher.from_file(NEWS_ALIASES_PATH),
+    seen_capacity=NEWS_SEEN_CAPACITY
+)
 
-def fetch_news():
+# Lexicon scorer, memoised by article hash
+MODEL = LexiconModel.from_file(NEWS_LEXICON_PATH, cache_size=NEWS_SEEN_CAPACITY)
+
+# Exponentially decaying sentiment per ticker
+SENTIMENT = TickerSentiment(STREAM.matcher.tickers, half_life=NEWS_HALF_LIFE)
+
+def published_at(article: dict, default: float) -> float:
+    try:
+        return datetime.fromisoformat(article["publishedAt"]).timestamp()
+    except (KeyError, TypeError, ValueError):
+        return default
+
+@tracing.timed("score_news")
+def score_batch(batch: list) -> set:
     """
-    Fetches latest headlines (stub: random dummy data or use real NewsAPI).
-    For real: 
-        resp = requests.get(NEWS_ENDPOINT, params={
-            "apiKey": NEWS_API_KEY,
-            "q": "AAPL OR MSFT OR GOOG",
-            "pageSize": 5
-        })
-        data = resp.json().get("articles", [])
-    Here, we stub with random “sentiment score.”
+    Scores a batch of routed articles and folds them into SENTIMENT.
+    Returns the rows of the tickers touched.
     """
-    # Real implementation (commented out):
-    # resp = requests.get(NEWS_ENDPOINT, params={
-    #     "apiKey": NEWS_API_KEY,
-    #     "q": "AAPL OR MSFT OR GOOG",
-    #     "pageSize": 5
-    # })
-    # articles = resp.json().get("articles", [])
-    # sentiments = []
-    # for art in articles:
-    #     # Perform sentiment analysis or use a service
-    #     sentiments.append(random.uniform(-1, 1))
-    # avg_sentiment = sum(sentiments) / len(sentiments) if sentiments else 0
-
-    # Stubbed random sentiment
-    avg_sentiment = random.uniform(-1, 1)
-    return avg_sentiment
+    scores = MODEL.score([a["hash"] for a in batch], [a["text"] for a in batch])
+    now = time.time()
+    tickers, values, times = [], [], []
+    for article, score in zip(batch, scores.tolist()):
+        ts = min(published_at(article, now), now)
+        for ticker in article["tickers"]:
+            tickers.append(ticker)
+            values.append(score)
+            times.append(ts)
+    return set(SENTIMENT.update(tickers, values, times).tolist())
 
 def check_news():
     """
-    Scheduled job (hourly):
-      - Fetch average sentiment.
-      - If |sentiment| >= 0.7, send news_alert to Strategy Agent.
+    Scheduled job (every NEWS_POLL_SECONDS):
+      - Stream new, deduplicated articles routed to the tickers they mention.
+      - Score them in batches of NEWS_SCORE_BATCH and update each ticker's
+        decaying sentiment.
+      - For each ticker that moved, if |sentiment| >= NEWS_ALERT_THRESHOLD,
+        send news_alert for that ticker to Strategy Agent.
     """
-    sentiment = fetch_news()
-    print(f"[NewsAgent] Avg sentiment: {sentiment:.2f}")
+    touched = set()
+    batch = []
+    for article in STREAM.poll():
+        batch.append(article)
+        if len(batch) >= NEWS_SCORE_BATCH:
+            touched |= score_batch(batch)
+            batch = []
+    if batch:
+        touched |= score_batch(batch)
+    print(f"[NewsAgent] {STREAM.routed} articles routed so far ({STREAM.duplicates} duplicates dropped), "
+          f"{len(touched)} tickers updated.")
 
-    if abs(sentiment) >= 0.7:
-        alert_type = "positive" if sentiment > 0 else "negative"
+    for ticker, sentiment, alert_type in SENTIMENT.alerts(sorted(touched), NEWS_ALERT_THRESHOLD, NEWS_MIN_WEIGHT):
         send_event(
             STRATEGY_AGENT_EVENT_URL,
             "news_alert",
-            {"sentiment": sentiment, "alert": alert_type}
+            {"ticker": ticker, "sentiment": sentiment, "alert": alert_type}
         )
-        print(f"[NewsAgent] Sent news_alert: {alert_type}")
+        print(f"[NewsAgent] Sent news_alert for {ticker}: {alert_type} ({sentiment:.2f})")
 
 @app.route("/events", methods=["POST"])
 def receive_event():
+    """
+    JSON-over-HTTP transport for handle_event().
+    """
+    payload = request.get_json()
+    with tracing.received(payload):
+        body, status = handle_event(payload.get("type"), payload.get("content", {}))
+    return jsonify(body), status
+
+def handle_event(evt_type: str, content: dict):
     """
     News Agent does not expect incoming events in this MVP.
     """
-    return jsonify({"status": "ok"}), 200
+    return {"status": "ok"}, 200
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    """
+    Articles read, duplicates dropped, articles routed, scorer cache and
+    latency histograms.
+    """
+    return jsonify({"stream": STREAM.stats(), "scorer": MODEL.stats(), "latency": tracing.snapshot(),
+                    "startup": startup.report()})
+
+@app.route("/sentiment", methods=["GET"])
+def sentiment():
+    """
+    Current decayed sentiment and evidence weight per ticker.
+    """
+    return jsonify(SENTIMENT.snapshot(time.time()))
+
+def start():
+    """
+    Starts the news poll scheduler (background work of the agent; see cohost.py).
+    """
+    from apscheduler.schedulers.background import BackgroundScheduler
 
-if __name__ == "__main__":
     scheduler = BackgroundScheduler()
-    scheduler.add_job(check_news, "interval", hours=1, next_run_time=time.time() + 1)
+    scheduler.add_job(tracing.bind(check_news), "interval", seconds=NEWS_POLL_SECONDS,
+                      next_run_time=datetime.now() + timedelta(seconds=1))
     scheduler.start()
     print("[NewsAgent] Scheduler started. Listening on port 5003.")
+
+startup.mark("imported")
+
+if __name__ == "__main__":
+    start()
+    serve_events(handle_event, 5003)
+    startup.ready()
     app.run(host="0.0.0.0", port=5003)
@@ -0,0 +1,248 @@
+# news_agent/news_stream.py
+
+import re
+import json
+import hashlib
+from collections import OrderedDict
+
+from http_pool import get_session
+from config import HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT
+
+NEWS_ENDPOINT = "https://newsapi.org/v2/top-headlines"
+
+
+class NewsSource:
+    """
+    A feed of raw articles. read() yields the articles that are new at the
+    source since the last call (NewsAPI-style dicts with at least a "title").
+    Sources are free to repeat articles; the stream dedupes them.
+    """
+
+    name = "base"
+
+    def read(self):
+        raise NotImplementedError
+
+
+class NewsAPISource(NewsSource):
+    """
+    NewsAPI top headlines, over the pooled keep-alive session.
+    """
+
+    name = "newsapi"
+
+    def __init__(self, api_key: str, category: str = "business", page_size: int = 100):
+        self.api_key = api_key
+        self.category = category
+        self.page_size = page_size
+
+    def read(self):
+        response = get_session(NEWS_ENDPOINT).get(
+            NEWS_ENDPOINT,
+            params={"apiKey": self.api_key, "category": self.category, "pageSize": self.page_size},
+            timeout=(HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT)
+        )
+        response.raise_for_status()
+        yield from response.json().get("articles", [])
+
+
+class ReplaySource(NewsSource):
+    """
+    Offline source: replays a recorded file, either JSON lines (one article
+    per line) or a saved NewsAPI response ({"articles": [...]}). Each read()
+    yields the next `batch` articles (all remaining ones if None), so a
+    recording can be played back as a stream of polls.
+    """
+
+    name = "replay"
+
+    def __init__(self, path: str, batch: int = None):
+        self.path = path
+        self.batch = batch
+        self._articles = None
+
+    def read(self):
+        if self._articles is None:
+            self._articles = self._load()
+        count = 0
+        for article in self._articles:
+            yield article
+            count += 1
+            if self.batch is not None and count >= self.batch:
+                return
+
+    def _load(self):
+        with open(self.path) as f:
+            text = f.read()
+        try:
+            data = json.loads(text)
+        except ValueError:
+            # JSON lines
+            data = [json.loads(line) for line in text.splitlines() if line.strip()]
+        if isinstance(data, dict):
+            data = [data]
+        for record in data:
+            if "articles" in record:
+                yield from record["articles"]
+            else:
+                yield record
+
+
+def make_source(spec: str, api_key: str = None, replay_batch: int = None) -> NewsSource:
+    """
+    "newsapi" or "replay:<path>".
+    """
+    name, _, arg = spec.partition(":")
+    if name == "newsapi":
+        return NewsAPISource(api_key)
+    if name == "replay":
+        return ReplaySource(arg, batch=replay_batch)
+    raise ValueError(f"Unknown news source: {spec}")
+
+
+class TickerMatcher:
+    """
+    Finds the tickers an article mentions. Every symbol and alias from
+    {ticker: [alias, ...]} is compiled into a single alternation, longest
+    first, so one regex scan of the text finds every mention. Symbols
+    match case-sensitively, with an optional "$" cashtag, so "A" or "ALL"
+    do not fire on ordinary words. Aliases (company names) match
+    case-insensitively, on word boundaries.
+    """
+
+    def __init__(self, aliases: dict):
+        self.lookup = {}
+        patterns = []
+        for ticker, names in aliases.items():
+            self.lookup[ticker] = ticker
+            patterns.append((ticker, r"\$?" + re.escape(ticker)))
+            for alias in names:
+                self.lookup[alias.lower()] = ticker
+                patterns.append((alias, "(?i:" + re.escape(alias) + ")"))
+        patterns.sort(key=lambda p: len(p[0]), reverse=True)
+        self.tickers = sorted(aliases)
+        self._regex = re.compile(r"(?<![\w$])(?:" + "|".join(p for _, p in patterns) + r")(?!\w)") \
+            if patterns else None
+
+    @classmethod
+    def from_file(cls, path: str):
+        with open(path) as f:
+            return cls(json.load(f))
+
+    def match(self, text: str) -> list:
+        """
+        Sorted tickers mentioned in text.
+        """
+        if self._regex is None or not text:
+            return []
+        found = set()
+        for mention in self._regex.findall(text):
+            mention = mention.lstrip("$")
+            found.add(self.lookup.get(mention) or self.lookup[mention.lower()])
+        return sorted(found)
+
+
+class SeenSet:
+    """
+    The last `capacity` content hashes, evicted oldest first. A hash seen
+    again is moved to the back, so an article kept alive by overlapping
+    feeds is not forgotten and replayed.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._hashes = OrderedDict()
+
+    def add(self, key: str) -> bool:
+        """
+        Records key; returns False if it was already present.
+        """
+        if key in self._hashes:
+            self._hashes.move_to_end(key)
+            return False
+        self._hashes[key] = None
+        if len(self._hashes) > self.capacity:
+            self._hashes.popitem(last=False)
+        return True
+
+    def __len__(self):
+        return len(self._hashes)
+
+
+_NON_WORD = re.compile(r"\W+")
+
+def content_hash(text: str) -> str:
+    """
+    Hash of an article's title and description with case, punctuation and
+    whitespace folded, so the same story syndicated by several feeds or
+    sources hashes the same.
+    """
+    normalised = _NON_WORD.sub(" ", text.lower()).strip()
+    return hashlib.blake2b(normalised.encode(), digest_size=16).hexdigest()
+
+
+# Pipeline stages. Each is a generator over the previous one, so a poll
+# streams article by article and nothing is materialised in between.
+
+def read_sources(sources: list):
+    for source in sources:
+        try:
+            yield from source.read()
+        except Exception as e:
+            print(f"[NewsAgent] Error reading {source.name}: {e}")
+
+def normalise(articles):
+    for article in articles:
+        if not article.get("title"):
+            continue
+        article = dict(article)
+        article["text"] = f"{article['title']}\n{article.get('description') or ''}"
+        article["hash"] = content_hash(article["text"])
+        yield article
+
+def route(articles, matcher: TickerMatcher):
+    for article in articles:
+        article["tickers"] = matcher.match(article["text"])
+        if article["tickers"]:
+            yield article
+
+
+class NewsStream:
+    """
+    sources -> normalise -> dedupe -> route.
+
+    poll() yields every article not seen before that mentions at least one
+    tracked ticker, with "hash" (content hash), "text" and "tickers" added.
+    The seen-set is updated as articles pass, so each story comes out once
+    however many sources or polls repeat it. Poll from one thread (the
+    scheduler job).
+    """
+
+    def __init__(self, sources: list, matcher: TickerMatcher, seen_capacity: int = 100000):
+        self.sources = sources
+        self.matcher = matcher
+        self.seen = SeenSet(seen_capacity)
+        self.read = 0
+        self.duplicates = 0
+        self.routed = 0
+
+    def poll(self):
+        for article in route(self._deduped(), self.matcher):
+            self.routed += 1
+            yield article
+
+    def stats(self) -> dict:
+        return {
+            "read": self.read,
+            "duplicates": self.duplicates,
+            "routed": self.routed,
+            "seen": len(self.seen),
+        }
+
+    def _deduped(self):
+        for article in normalise(read_sources(self.sources)):
+            self.read += 1
+            if self.seen.add(article["hash"]):
+                yield article
+            else:
+                self.duplicates += 1
@@ -0,0 +1,199 @@
+# news_agent/sentiment.py
+
+import re
+import json
+import math
+from collections import OrderedDict
+import numpy as np
+
+_TOKEN = re.compile(r"[a-z']+")
+
+# A lexicon word within this many tokens after a negator has its sign flipped
+NEGATORS = ("not", "no", "never", "without", "fails", "failed")
+NEGATION_WINDOW = 3
+
+# Normalisation of the summed word weights into (-1, 1): s / sqrt(s^2 + ALPHA)
+ALPHA = 15.0
+
+
+class LexiconModel:
+    """
+    Offline lexicon sentiment scorer.
+
+    score() takes a batch of articles. Each text is tokenised once, and
+    the batch's lexicon hits are laid out as flat (article, word, position)
+    arrays. Negation, weighting and the per-article sums are then a few
+    array operations and one np.bincount for the whole batch. Scores are
+    memoised by article content hash in a bounded LRU, so an article is
+    never scored twice.
+    """
+
+    def __init__(self, lexicon: dict, cache_size: int = 100000):
+        words = sorted(set(lexicon) | set(NEGATORS))
+        self.vocab = {word: i for i, word in enumerate(words)}
+        self.weights = np.array([float(lexicon.get(word, 0.0)) for word in words])
+        self.negator = np.array([word in NEGATORS for word in words])
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self.scored = 0
+        self.cache_hits = 0
+
+    @classmethod
+    def from_file(cls, path: str, cache_size: int = 100000):
+        with open(path) as f:
+            return cls(json.load(f), cache_size=cache_size)
+
+    def score(self, hashes: list, texts: list) -> np.ndarray:
+        """
+        Sentiment in (-1, 1) for each text; hashes[i] identifies texts[i].
+        """
+        scores = np.empty(len(texts))
+        todo = []
+        for i, key in enumerate(hashes):
+            cached = self._cache.get(key)
+            if cached is None:
+                todo.append(i)
+            else:
+                self._cache.move_to_end(key)
+                scores[i] = cached
+        self.cache_hits += len(texts) - len(todo)
+        if todo:
+            fresh = self._score([texts[i] for i in todo])
+            scores[todo] = fresh
+            for i, value in zip(todo, fresh.tolist()):
+                self._cache[hashes[i]] = value
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+            self.scored += len(todo)
+        return scores
+
+    def stats(self) -> dict:
+        return {"scored": self.scored, "cache_hits": self.cache_hits, "cached": len(self._cache)}
+
+    def _score(self, texts: list) -> np.ndarray:
+        vocab = self.vocab
+        docs, ids, positions = [], [], []
+        for doc, text in enumerate(texts):
+            for position, token in enumerate(_TOKEN.findall(text.lower())):
+                word = vocab.get(token)
+                if word is not None:
+                    docs.append(doc)
+                    ids.append(word)
+                    positions.append(position)
+        if not ids:
+            return np.zeros(len(texts))
+        docs = np.array(docs)
+        ids = np.array(ids)
+        positions = np.array(positions)
+
+        # A hit is negated when the nearest earlier negator in its article
+        # is at most NEGATION_WINDOW tokens back
+        is_negator = self.negator[ids]
+        last_negator = np.where(is_negator, np.arange(len(ids)), -1)
+        last_negator = np.maximum.accumulate(np.r_[-1, last_negator[:-1]])
+        negated = ((last_negator >= 0)
+                   & (docs[np.maximum(last_negator, 0)] == docs)
+                   & (positions - positions[np.maximum(last_negator, 0)] <= NEGATION_WINDOW))
+        weights = np.where(negated, -self.weights[ids], self.weights[ids])
+
+        total = np.bincount(docs, weights=weights, minlength=len(texts))
+        return total / np.sqrt(total * total + ALPHA)
+
+
+class TickerSentiment:
+    """
+    Exponentially decaying sentiment per ticker, in flat arrays indexed by
+    ticker: decayed sum of scores, decayed article count (the evidence
+    weight) and the time both were last brought up to date.
+
+    The current sentiment of a ticker is sum / weight, so checking a
+    news_alert threshold is O(1) per symbol however much news came before.
+    update() folds a batch of (ticker, score, time) observations in with
+    a handful of vectorised operations. Each contribution is decayed with
+    `half_life` seconds, from its article's own timestamp.
+    """
+
+    def __init__(self, tickers: list, half_life: float = 6 * 3600.0):
+        self.decay = math.log(2.0) / half_life
+        self.tickers = list(tickers)
+        self.index = {ticker: i for i, ticker in enumerate(self.tickers)}
+        n = len(self.tickers)
+        self._sum = np.zeros(n)
+        self._weight = np.zeros(n)
+        self._time = np.zeros(n)
+        # Sign (+1 / -1) of the last alert per ticker, 0 if none is standing
+        self._alerted = np.zeros(n, dtype=np.int8)
+
+    def update(self, tickers: list, scores: np.ndarray, times: np.ndarray) -> np.ndarray:
+        """
+        Adds observations; returns the indices of the tickers touched.
+        """
+        rows = np.array([self._row(ticker) for ticker in tickers], dtype=np.int64)
+        scores = np.asarray(scores, dtype=float)
+        times = np.asarray(times, dtype=float)
+
+        # Bring every touched ticker up to its newest observation
+        now = self._time.copy()
+        np.maximum.at(now, rows, times)
+        touched = np.unique(rows)
+        factor = np.exp(-self.decay * np.maximum(now[touched] - self._time[touched], 0.0))
+        self._sum[touched] *= factor
+        self._weight[touched] *= factor
+        self._time[touched] = now[touched]
+
+        # Older observations enter already decayed
+        age = np.exp(-self.decay * np.maximum(now[rows] - times, 0.0))
+        np.add.at(self._sum, rows, scores * age)
+        np.add.at(self._weight, rows, age)
+        return touched
+
+    def sentiment(self, row: int, now: float = None) -> tuple:
+        """
+        (sentiment, evidence weight) of one ticker; the weight decays to `now`.
+        """
+        weight = self._weight[row]
+        if weight <= 0.0:
+            return 0.0, 0.0
+        if now is not None and now > self._time[row]:
+            weight *= math.exp(-self.decay * (now - self._time[row]))
+        return float(self._sum[row] / self._weight[row]), float(weight)
+
+    def alerts(self, rows, threshold: float, min_weight: float) -> list:
+        """
+        [(ticker, sentiment, "positive"|"negative")] for tickers in `rows`
+        whose sentiment crossed +-threshold with at least `min_weight` of
+        evidence. A ticker alerts again only after its sentiment has gone
+        back inside the threshold or flipped sign.
+        """
+        fired = []
+        for row in rows:
+            sentiment, weight = self.sentiment(row)
+            sign = 0
+            if weight >= min_weight and abs(sentiment) >= threshold:
+                sign = 1 if sentiment > 0 else -1
+            if sign and sign != self._alerted[row]:
+                fired.append((self.tickers[row], sentiment, "positive" if sign > 0 else "negative"))
+            self._alerted[row] = sign
+        return fired
+
+    def snapshot(self, now: float = None) -> dict:
+        """
+        {ticker: {"sentiment", "weight"}} for every ticker with news.
+        """
+        out = {}
+        for ticker, row in self.index.items():
+            sentiment, weight = self.sentiment(row, now)
+            if weight > 0.0:
+                out[ticker] = {"sentiment": round(sentiment, 4), "weight": round(weight, 4)}
+        return out
+
+    def _row(self, ticker: str) -> int:
+        row = self.index.get(ticker)
+        if row is None:
+            row = self.index[ticker] = len(self.tickers)
+            self.tickers.append(ticker)
+            self._sum = np.append(self._sum, 0.0)
+            self._weight = np.append(self._weight, 0.0)
+            self._time = np.append(self._time, 0.0)
+            self._alerted = np.append(self._alerted, np.int8(0))
+        return row
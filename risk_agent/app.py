@@ -1,14 +1,30 @@
 # risk_agent/app.py
 
 import os
+from datetime import datetime, timedelta
 import json
 import threading
 from flask import Flask, request, jsonify
 
-from config import EXECUTION_AGENT_EVENT_URL
+from config import (
+    MARKET_DATA_AGENT_URL,
+    EXECUTION_AGENT_EVENT_URL,
+    RISK_UNIVERSE,
+    RISK_WINDOW,
+    RISK_CONFIDENCE,
+    RISK_LIMITS_PATH
+)
+from mcp_client import MCPClient
+from bar_codec import ENCODINGS, decode_bars
 from a2a_client import send_event
+from a2a_transport import serve as serve_events
+import tracing
+import startup
+from risk_engine import RiskEngine
+from limits import LimitBook
 
 app = Flask(__name__)
+tracing.configure("RiskAgent")
 
 # Stub: current portfolio exposures (e.g., from 0.0 to 1.0)
 CURRENT_PORTFOLIO = {
@@ -17,30 +33,127 @@ CURRENT_PORTFOLIO = {
     "GOOG": 0.05
 }
 
-def check_risk_and_respond(strategy_plan: list):
+# Rolling return/covariance model over the universe plus everything held;
+# other names are added when a strategy first trades them
+RISK_ENGINE = RiskEngine(
+    sorted(set(RISK_UNIVERSE) | set(CURRENT_PORTFOLIO)),
+    window=RISK_WINDOW,
+    confidence=RISK_CONFIDENCE
+)
+RISK_LOCK = threading.Lock()
+
+# Declarative limit rules, compiled to NumPy arrays and hot-reloaded when
+# the file changes
+LIMITS = LimitBook(RISK_LIMITS_PATH)
+
+# First refresh pulls a full window of daily bars, later ones only the tail
+WARMUP_PERIOD = "2y"
+HISTORY_PERIOD = "5d"
+
+# MCP client to Market Data Agent
+mcp = MCPClient(MARKET_DATA_AGENT_URL)
+
+def fetch_daily_bars(symbols: list, period: str) -> dict:
+    """
+    Daily bars for `symbols` in one MCP call, decoded ({ticker: {"ts", "close", ...}}).
+    """
+    histories = mcp.call(
+        "get_historicals",
+        {"symbols": symbols, "period": period, "interval": "1d",
+         "format": "columns", "encodings": list(ENCODINGS)}
+    ).get("histories", {})
+    return {ticker: decode_bars(payload) for ticker, payload in histories.items()}
+
+def refresh_returns():
+    """
+    Scheduled job: pulls recent daily bars for the universe in one MCP
+    call and rolls them into RISK_ENGINE.
+    """
+    period = HISTORY_PERIOD if RISK_ENGINE.count else WARMUP_PERIOD
+    try:
+        bars = fetch_daily_bars(list(RISK_ENGINE.symbols), period)
+    except Exception as e:
+        print(f"[RiskAgent] Error fetching returns: {e}")
+        return
+    with RISK_LOCK:
+        added = RISK_ENGINE.update_from_bars(bars)
+        RISK_ENGINE.factor()
+    print(f"[RiskAgent] Risk model updated: {added} new days, {RISK_ENGINE.count} in window.")
+
+def extend_universe(strategy_plans: list):
+    """
+    Adds the names traded by strategy_plans that RISK_ENGINE does not cover
+    yet, with a full window of history fetched in one MCP call, so they are
+    assessed instead of vetoed as no_history. Names the Market Data Agent
+    has no bars for stay unknown.
     """
-    Risk check: 
-      - Ensure no single proposed target_weight > 0.20
-      - Ensure sum of all positions ≤ 1.0
-      - (More rules can be added.)
+    with RISK_LOCK:
+        missing = sorted({leg["ticker"] for plan in strategy_plans for leg in plan
+                          if leg.get("target_weight") and leg["ticker"] not in RISK_ENGINE.index})
+    if not missing:
+        return
+    try:
+        bars = fetch_daily_bars(missing, WARMUP_PERIOD)
+    except Exception as e:
+        print(f"[RiskAgent] Error fetching history for {missing}: {e}")
+        return
+    with RISK_LOCK:
+        added = RISK_ENGINE.add_symbols({ticker: bars[ticker] for ticker in missing
+                                         if ticker in bars and len(bars[ticker]["ts"])})
+        RISK_ENGINE.factor()
+    if added:
+        print(f"[RiskAgent] Added {added} to the risk model.")
+
+def post_trade_weights(strategy_plan: list) -> dict:
     """
-    veto_list = []
-    total_weight = 0.0
+    CURRENT_PORTFOLIO with each leg's target_weight replacing the current weight.
+    """
+    weights = dict(CURRENT_PORTFOLIO)
     for leg in strategy_plan:
-        tw = leg.get("target_weight", 0.0)
-        if tw > 0.20:
-            veto_list.append(leg["ticker"])
-        total_weight += tw
+        weights[leg["ticker"]] = leg.get("target_weight", 0.0)
+    return weights
 
-    if total_weight > 1.0:
-        # Over‐allocated
-        veto_list.append("OVERALLOCATED")
+def assess_strategies(strategy_plans: list) -> list:
+    """
+    Evaluates a batch of candidate strategies against the limit rules in
+    one pass. Each strategy is checked as its post-trade portfolio, together
+    with that portfolio's risk report (None until the risk model has
+    enough history, in which case metric rules do not fire).
+    Names outside the risk model are added first (extend_universe()).
+    Returns [(risk, breaches), ...] in the order of strategy_plans.
+    """
+    extend_universe(strategy_plans)
+    portfolios = [post_trade_weights(plan) for plan in strategy_plans]
+    with RISK_LOCK:
+        ready = RISK_ENGINE.ready()
+        risks = [RISK_ENGINE.assess(p) if ready else None for p in portfolios]
+    if not ready:
+        print("[RiskAgent] Risk model not warmed up; metric limits skipped.")
+    breaches = LIMITS.evaluate(portfolios, risks)
+    for risk, found in zip(risks, breaches):
+        for sym in (risk or {}).get("unknown", []):
+            found.append({"rule": "no_history", "ticker": sym})
+    return list(zip(risks, breaches))
+
+def check_risk_and_respond(strategy_plan: list, origin: str = None):
+    """
+    Risk check: the post-trade portfolio must pass every rule in the limit
+    file (per-ticker, per-sector, gross/net exposure and VaR/CVaR limits;
+    see limits.py), and every name must have observed returns in the
+    risk window.
+    """
+    with tracing.timed("risk_check"):
+        [(risk, breaches)] = assess_strategies([strategy_plan])
+    veto_list = [f"{b['rule']}:{b['ticker']}" if "ticker" in b else b["rule"] for b in breaches]
 
     if veto_list:
         # Veto
         event_content = {
             "reason": f"Positions {veto_list} breach risk limits",
-            "strategy": strategy_plan
+            "strategy": strategy_plan,
+            "origin": origin,
+            "risk": risk,
+            "breaches": breaches
         }
         send_event(
             EXECUTION_AGENT_EVENT_URL,
@@ -50,7 +163,7 @@ def check_risk_and_respond(strategy_plan: list):
         print(f"[RiskAgent] Vetoed strategy: {veto_list}")
     else:
         # Approve
-        event_content = { "strategy": strategy_plan }
+        event_content = { "strategy": strategy_plan, "origin": origin, "risk": risk }
         send_event(
             EXECUTION_AGENT_EVENT_URL,
             "approve_trade",
@@ -58,23 +171,61 @@ def check_risk_and_respond(strategy_plan: list):
         )
         print("[RiskAgent] Approved strategy.")
 
+@app.route("/limits", methods=["GET"])
+def limits():
+    """
+    Loaded limit rule set and how often each rule has fired.
+    """
+    return jsonify(LIMITS.stats())
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    """
+    Rule firing counts, risk check and per-hop latency histograms.
+    """
+    return jsonify({"limits": LIMITS.stats(), "latency": tracing.snapshot(),
+                    "startup": startup.report()})
+
 @app.route("/events", methods=["POST"])
 def receive_event():
     """
-    Expects: { "type": "new_strategy", "content": { "strategy": [ {..}, ... ] } }
+    JSON-over-HTTP transport for handle_event().
     """
     payload = request.get_json()
-    evt_type = payload.get("type")
-    content = payload.get("content", {})
+    with tracing.received(payload):
+        body, status = handle_event(payload.get("type"), payload.get("content", {}))
+    return jsonify(body), status
 
+def handle_event(evt_type: str, content: dict):
+    """
+    Expects: { "type": "new_strategy", "content": { "strategy": [ {..}, ... ] } }
+    """
     if evt_type == "new_strategy":
         strategy = content.get("strategy", [])
-        # Spawn background thread to avoid blocking
-        threading.Thread(target=check_risk_and_respond, args=(strategy,)).start()
-        return jsonify({"status": "processing"}), 200
+        # Spawn background thread to avoid blocking (it continues the event's trace)
+        threading.Thread(target=tracing.bind(check_risk_and_respond), args=(strategy, content.get("origin"))).start()
+        return {"status": "processing"}, 200
     else:
-        return jsonify({"error": "unsupported event type"}), 400
+        return {"error": "unsupported event type"}, 400
 
-if __name__ == "__main__":
+def start():
+    """
+    Starts the return-window refresh (background work of the agent; see
+    cohost.py).
+    """
+    from apscheduler.schedulers.background import BackgroundScheduler
+
+    # Refresh the return window every 5 minutes (picks up the forming daily bar)
+    scheduler = BackgroundScheduler()
+    scheduler.add_job(tracing.bind(refresh_returns), "interval", minutes=5,
+                      next_run_time=datetime.now() + timedelta(seconds=1))
+    scheduler.start()
     print("[RiskAgent] Listening on port 5006 for new_strategy events.")
+
+startup.mark("imported")
+
+if __name__ == "__main__":
+    start()
+    serve_events(handle_event, 5006)
+    startup.ready()
     app.run(host="0.0.0.0", port=5006)
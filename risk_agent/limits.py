@@ -0,0 +1,270 @@
+# risk_agent/limits.py
+
+import os
+import json
+import time
+import threading
+import numpy as np
+
+SCOPES = ("ticker", "group", "metric")
+MEASURES = ("gross", "net")
+
+
+class LimitSet:
+    """
+    A rule file compiled into flat NumPy arrays. Treat it as immutable.
+
+    Rule file (JSON):
+        {
+          "sectors": { "tech": ["AAPL", "MSFT", ...], ... },
+          "rules": [
+            { "id": "max_name_weight", "scope": "ticker", "tickers": "*", "max": 0.20 },
+            { "id": "tech_sector", "scope": "group", "sector": "tech", "measure": "gross", "max": 0.75 },
+            { "id": "gross_exposure", "scope": "group", "tickers": "*", "measure": "gross", "max": 1.0 },
+            { "id": "var_1d", "scope": "metric", "metric": "var_parametric", "max": 0.03 }
+          ]
+        }
+
+    Every rule has an id plus a "max" and/or "min" bound. Rule scopes:
+      - ticker: each listed ticker's weight, or every name's weight for "*"
+      - group: the gross (sum |w|) or net (sum w) weight of a ticker list,
+        a sector, or the whole book ("*", the default)
+      - metric: a number from the risk report, e.g. "var_historical"
+
+    Explicit ticker rules compile to (rule, column, bound) pairs and
+    wildcard ticker rules to bound vectors. Group rules compile to
+    membership matrices, one column per group. Evaluating a batch of b
+    strategies is then a gather, two matrix products and a few comparisons
+    over a (b, names held in the batch) weight matrix. Only the rules that
+    actually fire cost any Python work.
+    """
+
+    def __init__(self, spec: dict, version=None):
+        self.version = version
+        if not isinstance(spec, dict):
+            raise ValueError("Limit file must hold a JSON object")
+        sectors = spec.get("sectors", {})
+        rules = spec.get("rules", [])
+        if not isinstance(sectors, dict) or not all(isinstance(m, list) for m in sectors.values()):
+            raise ValueError('"sectors" must map sector names to ticker lists')
+        if not isinstance(rules, list) or not all(isinstance(rule, dict) for rule in rules):
+            raise ValueError('"rules" must be a list of rule objects')
+        self.rule_ids = []
+        self.bounds = []
+
+        names = set()
+        for members in sectors.values():
+            names.update(members)
+        for rule in rules:
+            if isinstance(rule.get("tickers"), list):
+                names.update(rule["tickers"])
+        self.names = sorted(names)
+        self.index = {sym: i for i, sym in enumerate(self.names)}
+
+        pairs, wildcards, groups, metrics = [], [], [], []
+        for rule in rules:
+            r = self._add_rule(rule)
+            lo, hi = self.bounds[r]
+            scope = rule["scope"]
+            if scope == "ticker":
+                tickers = rule.get("tickers", "*")
+                if tickers == "*":
+                    wildcards.append((r, lo, hi))
+                else:
+                    pairs.extend((r, self.index[sym], lo, hi) for sym in tickers)
+            elif scope == "group":
+                measure = rule.get("measure", "gross")
+                if measure not in MEASURES:
+                    raise ValueError(f"Rule {rule['id']}: unknown measure {measure!r}")
+                if "sector" in rule:
+                    if rule["sector"] not in sectors:
+                        raise ValueError(f"Rule {rule['id']}: unknown sector {rule['sector']!r}")
+                    members = sectors[rule["sector"]]
+                else:
+                    members = rule.get("tickers", "*")
+                groups.append((r, measure, members, lo, hi))
+            else:
+                if "metric" not in rule:
+                    raise ValueError(f"Rule {rule['id']}: metric rules need a 'metric'")
+                metrics.append((r, rule["metric"], lo, hi))
+
+        n = len(self.names)
+        self.pair_rule, self.pair_col, self.pair_min, self.pair_max = _columns(pairs, 4)
+        self.wild_rule, self.wild_min, self.wild_max = _columns(wildcards, 3)
+
+        self.group_rule, self.group_min, self.group_max = _columns([(g[0], g[3], g[4]) for g in groups], 3)
+        self.group_net = np.array([g[1] == "net" for g in groups], dtype=bool)
+        # Whole-book groups also cover names the rule file has never seen
+        self.group_all = np.array([g[2] == "*" for g in groups], dtype=bool)
+        self.membership = np.zeros((n, len(groups)))
+        for k, (_, _, members, _, _) in enumerate(groups):
+            if members == "*":
+                self.membership[:, k] = 1.0
+            else:
+                self.membership[[self.index[sym] for sym in members], k] = 1.0
+
+        self.metric_rule, self.metric_min, self.metric_max = _columns([(m[0], m[2], m[3]) for m in metrics], 3)
+        self.metric_names = [m[1] for m in metrics]
+
+        self.pair_rule = self.pair_rule.astype(np.int64)
+        self.pair_col = self.pair_col.astype(np.int64)
+        self.wild_rule = self.wild_rule.astype(np.int64)
+        self.group_rule = self.group_rule.astype(np.int64)
+        self.metric_rule = self.metric_rule.astype(np.int64)
+
+    def _add_rule(self, rule: dict) -> int:
+        if "id" not in rule:
+            raise ValueError(f"Rule without an id: {rule}")
+        if rule.get("scope") not in SCOPES:
+            raise ValueError(f"Rule {rule['id']}: unknown scope {rule.get('scope')!r}")
+        if "max" not in rule and "min" not in rule:
+            raise ValueError(f"Rule {rule['id']}: needs a 'max' or 'min'")
+        if rule["id"] in self.rule_ids:
+            raise ValueError(f"Duplicate rule id {rule['id']!r}")
+        self.rule_ids.append(rule["id"])
+        self.bounds.append((float(rule.get("min", -np.inf)), float(rule.get("max", np.inf))))
+        return len(self.rule_ids) - 1
+
+    def evaluate(self, portfolios: list, metrics: list = None) -> list:
+        """
+        Checks a batch of portfolios ({ticker: weight} each) and optional
+        per-portfolio metric dicts. For each portfolio, returns the list of
+        breaches as {"rule", "value", "limit"} dicts, plus "ticker" for
+        ticker-scope rules. An empty list means every rule passed.
+        """
+        b = len(portfolios)
+        # Only the names held somewhere in the batch take part, so the cost
+        # does not grow with the size of the rule file's universe
+        names = list(dict.fromkeys(sym for p in portfolios for sym in p))
+        columns = {sym: j for j, sym in enumerate(names)}
+        known = [j for j, sym in enumerate(names) if sym in self.index]
+        rows = np.array([self.index[names[j]] for j in known], dtype=np.int64)
+
+        weights = np.zeros((b, len(names)))
+        for row, portfolio in enumerate(portfolios):
+            if portfolio:
+                weights[row, [columns[sym] for sym in portfolio]] = list(portfolio.values())
+
+        breaches = [[] for _ in range(b)]
+
+        local = np.full(len(self.names), -1, dtype=np.int64)
+        local[rows] = known
+        pos = local[self.pair_col]
+        held = pos >= 0
+        pos = pos[held]
+        self._collect(breaches, weights[:, pos], self.pair_min[held], self.pair_max[held],
+                      self.pair_rule[held], lambda k: names[pos[k]])
+
+        if len(self.wild_rule):
+            r = len(self.wild_rule)
+            values = np.repeat(weights, r, axis=1)
+            lo, hi = np.tile(self.wild_min, len(names)), np.tile(self.wild_max, len(names))
+            self._collect(breaches, values, lo, hi, np.tile(self.wild_rule, len(names)),
+                          lambda k: names[k // r])
+
+        if len(self.group_rule):
+            membership = np.tile(self.group_all.astype(float), (len(names), 1))
+            membership[known] = self.membership[rows]
+            net = weights @ membership
+            gross = np.abs(weights) @ membership
+            values = np.where(self.group_net, net, gross)
+            self._collect(breaches, values, self.group_min, self.group_max, self.group_rule)
+
+        if len(self.metric_rule) and metrics is not None:
+            values = np.array([[(m or {}).get(name, np.nan) for name in self.metric_names] for m in metrics],
+                              dtype=float).reshape(b, len(self.metric_names))
+            self._collect(breaches, values, self.metric_min, self.metric_max, self.metric_rule)
+
+        return breaches
+
+    def _collect(self, breaches, values, lo, hi, rule, ticker_of=None):
+        # NaN compares False on both sides, so missing values never fire
+        fired = (values < lo) | (values > hi)
+        for row, k in zip(*np.nonzero(fired)):
+            value = float(values[row, k])
+            breach = {
+                "rule": self.rule_ids[rule[k]],
+                "value": value,
+                "limit": float(hi[k] if value > hi[k] else lo[k])
+            }
+            if ticker_of is not None:
+                breach["ticker"] = ticker_of(k)
+            breaches[row].append(breach)
+
+
+class LimitBook:
+    """
+    Holds the compiled LimitSet for a rule file and recompiles it when the
+    file's mtime changes (checked at most every `check_interval` seconds).
+    A new rule set replaces the old one with a single reference swap, so a
+    check always runs against one complete rule set. A file that fails to
+    parse or compile is reported once and the previous rules stay in force
+    until the file changes again; a file that cannot be read is retried.
+    """
+
+    def __init__(self, path: str, check_interval: float = 1.0):
+        self.path = path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._next_check = 0.0
+        self._mtime = os.stat(path).st_mtime_ns
+        self._rejected = None
+        self.limits = _load(path, self._mtime)
+        self.fired = {}
+        self.reloads = 0
+
+    def current(self) -> LimitSet:
+        now = time.monotonic()
+        if now < self._next_check:
+            return self.limits
+        with self._lock:
+            if now < self._next_check:
+                return self.limits
+            self._next_check = now + self.check_interval
+            mtime = None
+            try:
+                mtime = os.stat(self.path).st_mtime_ns
+                if mtime not in (self._mtime, self._rejected):
+                    self.limits = _load(self.path, mtime)
+                    self._mtime = mtime
+                    self.reloads += 1
+                    print(f"[RiskAgent] Reloaded {len(self.limits.rule_ids)} limit rules from {self.path}.")
+            except OSError as e:
+                print(f"[RiskAgent] Keeping previous limit rules; reload failed: {e}")
+            except (ValueError, KeyError, TypeError, AttributeError) as e:
+                # Not retried until the file changes again
+                self._rejected = mtime
+                print(f"[RiskAgent] Keeping previous limit rules; invalid rule file: {e}")
+        return self.limits
+
+    def evaluate(self, portfolios: list, metrics: list = None) -> list:
+        breaches = self.current().evaluate(portfolios, metrics)
+        with self._lock:
+            for found in breaches:
+                for breach in found:
+                    self.fired[breach["rule"]] = self.fired.get(breach["rule"], 0) + 1
+        return breaches
+
+    def stats(self) -> dict:
+        limits = self.limits
+        with self._lock:
+            return {
+                "path": self.path,
+                "version": limits.version,
+                "rules": len(limits.rule_ids),
+                "reloads": self.reloads,
+                "fired": dict(self.fired),
+            }
+
+
+def _load(path: str, version) -> LimitSet:
+    with open(path) as f:
+        return LimitSet(json.load(f), version=version)
+
+def _columns(rows: list, width: int) -> tuple:
+    """
+    Transposes a list of tuples into `width` float arrays.
+    """
+    if not rows:
+        return tuple(np.zeros(0) for _ in range(width))
+    return tuple(np.array(col, dtype=float) for col in zip(*rows))
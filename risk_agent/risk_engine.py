@@ -0,0 +1,305 @@
+# risk_agent/risk_engine.py
+
+from statistics import NormalDist
+import numpy as np
+
+# Rebuild the running sums from the window every this many updates to
+# flush floating-point drift from repeated add/subtract
+_RESYNC_EVERY = 256
+
+
+class RiskEngine:
+    """
+    Rolling covariance risk model for a universe of symbols.
+
+    Daily returns live in a (window, n_symbols) ring buffer. Running sums of
+    returns and of their outer products are updated when a bar enters or
+    leaves the window, so the covariance matrix costs O(n^2) per bar instead
+    of O(window * n^2). The most recent bar is often still forming; a
+    revised version of it replaces the last row instead of adding a new one.
+
+    Strategy checks reuse a factorization that is built once per bar: the
+    centered, scaled return matrix F = (R - mean) / sqrt(m - 1), an exact
+    square root of the sample covariance (Sigma = F'F) with rank <= window.
+    Checking a portfolio of k names only touches k columns of F:
+    sigma = ||F[:, idx] w||, which is O(window * k) regardless of the size
+    of the universe, instead of an O(n^2) product or an O(n^3) Cholesky
+    per strategy.
+
+    Symbols can join later (add_symbols()); their returns are backfilled
+    for the dates already in the window.
+    """
+
+    def __init__(self, symbols: list, window: int = 252, confidence: float = 0.99,
+                 min_observations: int = 20):
+        self.symbols = list(symbols)
+        self.index = {sym: i for i, sym in enumerate(self.symbols)}
+        self.window = window
+        self.confidence = confidence
+        self.min_observations = min_observations
+        # Standard-normal quantile and tail mean for the parametric measures
+        self._z = NormalDist().inv_cdf(confidence)
+        self._tail = NormalDist().pdf(self._z) / (1.0 - confidence)
+
+        n = len(self.symbols)
+        self.returns = np.zeros((window, n))
+        # Whether each return was measured from two real closes (False for
+        # the zeros of a symbol that has no bars yet)
+        self.observed = np.zeros((window, n), dtype=bool)
+        # Timestamp of the bar each row's return ends on
+        self.row_ts = np.zeros(window, dtype=np.int64)
+        self.count = 0
+        self._pos = 0
+        self._sum = np.zeros(n)
+        self._cross = np.zeros((n, n))
+        self._updates = 0
+
+        self.last_ts = None
+        self._last_close = np.full(n, np.nan)
+        self._prev_close = np.full(n, np.nan)
+
+        self._cov = None
+        self._factor = None
+
+    def update_from_bars(self, bars_by_symbol: dict) -> int:
+        """
+        Feeds decoded daily bar sets ({symbol: {"ts": ..., "close": ...}},
+        see bar_codec). Symbols are aligned on the union of their
+        timestamps; a symbol without a bar on some date keeps its previous
+        close (zero return). Bars before the last seen date are ignored and
+        a bar on that date replaces it. Returns the number of new rows.
+        """
+        stamps = [np.asarray(bars["ts"]) for sym, bars in bars_by_symbol.items() if sym in self.index]
+        if not stamps:
+            return 0
+        grid = np.unique(np.concatenate(stamps))
+        if self.last_ts is not None:
+            grid = grid[grid >= self.last_ts]
+        if not len(grid):
+            return 0
+
+        closes = np.full((len(grid), len(self.symbols)), np.nan)
+        for sym, bars in bars_by_symbol.items():
+            j = self.index.get(sym)
+            if j is None:
+                continue
+            ts = np.asarray(bars["ts"])
+            keep = np.isin(ts, grid)
+            closes[np.searchsorted(grid, ts[keep]), j] = np.asarray(bars["close"], dtype=float)[keep]
+        return self.update_from_closes(grid, closes)
+
+    def update_from_closes(self, grid: np.ndarray, closes: np.ndarray) -> int:
+        """
+        Feeds a (len(grid), n_symbols) close matrix, columns in self.symbols
+        order and NaN where a symbol has no bar, for ascending timestamps
+        starting at or after the last seen date. Returns the number of new
+        rows, like update_from_bars().
+        """
+        if not len(grid):
+            return 0
+        revise = self.last_ts is not None and grid[0] == self.last_ts
+        base = self._prev_close if revise else self._last_close
+        filled = _ffill(np.vstack([base, closes]))
+        ratios = filled[1:] / filled[:-1]
+        observed = np.isfinite(ratios)
+        returns = np.nan_to_num(ratios - 1.0, nan=0.0, posinf=0.0, neginf=0.0)
+
+        stamps = np.asarray(grid, dtype=np.int64)
+        if self.last_ts is None:
+            # The first date has no previous close to return against
+            returns, observed, stamps = returns[1:], observed[1:], stamps[1:]
+        elif revise:
+            if self.count:
+                self._replace_last(returns[0], observed[0])
+            returns, observed, stamps = returns[1:], observed[1:], stamps[1:]
+        for row, seen, ts in zip(returns, observed, stamps):
+            self._push(row, seen, ts)
+
+        self._prev_close = filled[-2]
+        self._last_close = filled[-1]
+        self.last_ts = int(grid[-1])
+        self._cov = self._factor = None
+        return len(returns)
+
+    def add_symbols(self, bars_by_symbol: dict) -> list:
+        """
+        Adds the symbols of a set of decoded daily bars ({symbol: {"ts": ...,
+        "close": ...}}) that are not in the universe yet, and returns them.
+        Each new symbol's returns are computed for the dates already in the
+        window, from its last close at or before each date (a missing bar is
+        a zero return, as in update_from_bars()); dates before its first bar
+        stay unobserved. Later updates include it like any other symbol.
+        """
+        new = [sym for sym in bars_by_symbol if sym not in self.index]
+        if not new:
+            return []
+        k = len(new)
+        for sym in new:
+            self.index[sym] = len(self.symbols)
+            self.symbols.append(sym)
+        self.returns = np.hstack([self.returns, np.zeros((self.window, k))])
+        self.observed = np.hstack([self.observed, np.zeros((self.window, k), dtype=bool)])
+        self._last_close = np.append(self._last_close, np.full(k, np.nan))
+        self._prev_close = np.append(self._prev_close, np.full(k, np.nan))
+
+        if self.last_ts is not None:
+            # Rows in date order, each with the date it returns from (the
+            # last one ends on the last seen date)
+            order = (np.arange(self.count) + (self._pos if self.count == self.window else 0)) % self.window
+            ends = self.row_ts[order] if self.count else np.array([self.last_ts])
+            starts = np.concatenate([[ends[0] - 1], ends[:-1]])
+            for j, sym in enumerate(new, start=len(self.symbols) - k):
+                ts = np.asarray(bars_by_symbol[sym]["ts"], dtype=np.int64)
+                close = np.asarray(bars_by_symbol[sym]["close"], dtype=float)
+                if not len(ts):
+                    continue
+                end_close, start_close = _close_asof(ts, close, ends), _close_asof(ts, close, starts)
+                ratios = end_close[:self.count] / start_close[:self.count]
+                self.observed[order, j] = np.isfinite(ratios)
+                self.returns[order, j] = np.nan_to_num(ratios - 1.0, nan=0.0, posinf=0.0, neginf=0.0)
+                self._last_close[j] = end_close[-1]
+                self._prev_close[j] = start_close[-1]
+
+        # Rebuild the running sums with the new columns
+        live = self.returns[:self.count]
+        self._sum = live.sum(axis=0)
+        self._cross = live.T @ live
+        self._cov = self._factor = None
+        return new
+
+    def covariance(self) -> np.ndarray:
+        if self._cov is None:
+            m = self.count
+            if m < 2:
+                return np.zeros((len(self.symbols), len(self.symbols)))
+            self._cov = (self._cross - np.outer(self._sum, self._sum) / m) / (m - 1)
+        return self._cov
+
+    def factor(self) -> np.ndarray:
+        """
+        (m, n) square-root factor F of the covariance (Sigma = F'F), cached
+        until the next bar. It is derived from the running mean, so it is
+        consistent with covariance() without forming the n x n matrix.
+        """
+        if self._factor is None:
+            m = self.count
+            live = self.returns[:m]
+            if m < 2:
+                self._factor = np.zeros((1, len(self.symbols)))
+            else:
+                self._factor = (live - self._sum / m) / np.sqrt(m - 1)
+        return self._factor
+
+    def ready(self) -> bool:
+        return self.count >= self.min_observations
+
+    def assess(self, weights: dict) -> dict:
+        """
+        Risk of a portfolio given as {symbol: weight}, as fractions of
+        equity over one day at self.confidence:
+          - parametric (normal) VaR and CVaR from the covariance factor
+          - historical VaR and CVaR from the returns in the window
+          - per-name marginal VaR (dVaR/dw) and component VaR (w * marginal,
+            summing to the parametric VaR before the mean adjustment)
+        Symbols outside the universe, or without a single observed return
+        in the window, are listed under "unknown" and left out of the
+        measures.
+        """
+        held = [(sym, w) for sym, w in weights.items() if w]
+        in_universe = [(self.index[sym], sym, w) for sym, w in held if sym in self.index]
+        if in_universe:
+            has_history = self.observed[:self.count, [i for i, _, _ in in_universe]].any(axis=0)
+        else:
+            has_history = []
+        known = [entry for entry, seen in zip(in_universe, has_history) if seen]
+        unknown = [sym for sym, w in held if sym not in self.index]
+        unknown += [sym for (_, sym, _), seen in zip(in_universe, has_history) if not seen]
+        report = {"observations": self.count, "confidence": self.confidence, "unknown": unknown}
+        if not known:
+            report.update(volatility=0.0, var_parametric=0.0, cvar_parametric=0.0,
+                          var_historical=0.0, cvar_historical=0.0, marginal_var={}, component_var={})
+            return report
+
+        idx = np.array([i for i, _, _ in known])
+        w = np.array([w for _, _, w in known], dtype=float)
+
+        cols = self.factor()[:, idx]
+        loading = cols @ w
+        sigma = float(np.sqrt(loading @ loading))
+        mu = float(self._sum[idx] @ w / self.count) if self.count else 0.0
+        sigma_w = loading @ cols
+        marginal = self._z * sigma_w / sigma if sigma > 0 else np.zeros_like(w)
+
+        pnl = self.returns[:self.count, idx] @ w
+        var_h, cvar_h = _historical(pnl, self.confidence)
+
+        names = [sym for _, sym, _ in known]
+        report.update(
+            volatility=sigma,
+            var_parametric=self._z * sigma - mu,
+            cvar_parametric=self._tail * sigma - mu,
+            var_historical=var_h,
+            cvar_historical=cvar_h,
+            marginal_var=dict(zip(names, marginal.tolist())),
+            component_var=dict(zip(names, (w * marginal).tolist()))
+        )
+        return report
+
+    def _push(self, row: np.ndarray, seen: np.ndarray, ts: int):
+        if self.count == self.window:
+            old = self.returns[self._pos]
+            self._sum -= old
+            self._cross -= np.outer(old, old)
+        else:
+            self.count += 1
+        self.returns[self._pos] = row
+        self.observed[self._pos] = seen
+        self.row_ts[self._pos] = ts
+        self._sum += row
+        self._cross += np.outer(row, row)
+        self._pos = (self._pos + 1) % self.window
+        self._tick()
+
+    def _replace_last(self, row: np.ndarray, seen: np.ndarray):
+        last = (self._pos - 1) % self.window
+        old = self.returns[last]
+        self._sum += row - old
+        self._cross += np.outer(row, row) - np.outer(old, old)
+        self.returns[last] = row
+        self.observed[last] = seen
+        self._tick()
+
+    def _tick(self):
+        self._updates += 1
+        if self._updates % _RESYNC_EVERY == 0:
+            live = self.returns[:self.count]
+            self._sum = live.sum(axis=0)
+            self._cross = live.T @ live
+
+
+def _ffill(values: np.ndarray) -> np.ndarray:
+    """
+    Forward-fills NaNs down each column.
+    """
+    rows = np.where(np.isnan(values), 0, np.arange(len(values))[:, None])
+    np.maximum.accumulate(rows, axis=0, out=rows)
+    return values[rows, np.arange(values.shape[1])]
+
+def _close_asof(ts: np.ndarray, close: np.ndarray, at: np.ndarray) -> np.ndarray:
+    """
+    Last close at or before each time in `at` (NaN before the first bar).
+    """
+    order = np.argsort(ts, kind="stable")
+    ts, close = ts[order], close[order]
+    i = np.searchsorted(ts, at, side="right") - 1
+    return np.where(i >= 0, close[np.maximum(i, 0)], np.nan)
+
+def _historical(pnl: np.ndarray, confidence: float):
+    """
+    VaR/CVaR as positive losses from a sample of portfolio returns.
+    """
+    if not len(pnl):
+        return 0.0, 0.0
+    cutoff = np.quantile(pnl, 1.0 - confidence)
+    tail = pnl[pnl <= cutoff]
+    return float(-cutoff), float(-tail.mean())
@@ -0,0 +1,150 @@
+# serve.py
+#
+# Production serving for one agent: gunicorn with preforked worker
+# processes and a thread pool in each, instead of Flask's development
+# server (app.run).
+#
+#   python serve.py market_data_agent --threads 16
+#   python serve.py fundamentals_agent --workers 2
+#
+# What happens to an agent's background work (its start(): schedulers,
+# feeds, the bar subscription) depends on its role:
+#   - "leader": one worker at a time runs it, elected by an exclusive lock
+#     on <SERVE_LOCK_DIR>/<agent>.lock, so scheduled jobs run exactly once.
+#     If that worker exits, another one takes the lock over within
+#     LEADER_RETRY seconds. Only for agents whose jobs keep their results
+#     outside the process (fundamentals: its snapshot store), as the other
+#     workers cannot see the leader's memory; /metrics reports the
+#     histograms of whichever worker answers it.
+#   - "single": the agent keeps its state in process memory (risk model,
+#     positions, audit writer, alert coalescer; the technical agent's
+#     indicator buffers and the news agent's sentiment, which its
+#     /sentiment reports; the Market Data Agent's feed, its subscribers and
+#     its cache in front of the bar store), so it runs in one worker
+#     process and scales with threads only. Its jobs then run exactly once
+#     as there is one process. For market data that also keeps upstream
+#     polling to one feed.
+
+import os
+import time
+import fcntl
+import argparse
+import threading
+from urllib.parse import urlsplit
+
+from gunicorn.app.base import BaseApplication
+
+from config import SERVE_WORKERS, SERVE_THREADS, SERVE_LOCK_DIR
+from a2a_transport import serve as serve_events
+from cohost import AGENTS, load
+import startup
+
+ROLES = {
+    "market_data_agent": "single",
+    "technical_analysis_agent": "single",
+    "news_agent": "single",
+    "fundamentals_agent": "leader",
+    "risk_agent": "single",
+    "strategy_agent": "single",
+    "execution_agent": "single",
+    "compliance_agent": "single",
+}
+
+# Seconds between attempts of a follower worker to take the leader lock
+LEADER_RETRY = 5.0
+
+
+class LeaderLock:
+    """
+    Exclusive flock on `path`, tried without blocking on a daemon thread
+    every `retry` seconds until this process holds it; on_elected() then
+    runs once. The kernel releases the lock when the process exits.
+    """
+
+    def __init__(self, path: str, on_elected, retry: float = LEADER_RETRY):
+        self.path = path
+        self.on_elected = on_elected
+        self.retry = retry
+
+    def start(self):
+        threading.Thread(target=self._run, name="leader-lock", daemon=True).start()
+        return self
+
+    def _run(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        while True:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                break
+            except BlockingIOError:
+                time.sleep(self.retry)
+        os.ftruncate(fd, 0)
+        os.write(fd, f"{os.getpid()}\n".encode())
+        print(f"[Serve] Worker {os.getpid()} is the leader for {os.path.basename(self.path)}.")
+        self.on_elected()
+
+
+class AgentServer(BaseApplication):
+    """
+    gunicorn application serving one agent's Flask app.
+    """
+
+    def __init__(self, agent: str, port: int, options: dict):
+        self.agent = agent
+        self.port = port
+        self.options = options
+        self.module = None
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+        self.cfg.set("post_worker_init", self.post_worker_init)
+
+    def load(self):
+        # With preload_app this runs once in the master, before forking
+        if self.module is None:
+            self.module, _ = load(self.agent)
+        return self.module.app
+
+    def post_worker_init(self, worker):
+        if ROLES[self.agent] == "leader":
+            LeaderLock(os.path.join(SERVE_LOCK_DIR, f"{self.agent}.lock"), self.start_background).start()
+        else:
+            self.start_background()
+        startup.ready()
+
+    def start_background(self):
+        if hasattr(self.module, "start"):
+            self.module.start()
+        if hasattr(self.module, "handle_event"):
+            serve_events(self.module.handle_event, self.port)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve one agent with gunicorn.")
+    parser.add_argument("agent", choices=sorted(ROLES))
+    parser.add_argument("--workers", type=int, default=SERVE_WORKERS, help="worker processes")
+    parser.add_argument("--threads", type=int, default=SERVE_THREADS, help="request threads per worker")
+    args = parser.parse_args()
+
+    role = ROLES[args.agent]
+    workers = args.workers
+    if role == "single" and workers > 1:
+        print(f"[Serve] {args.agent} keeps its state in memory; serving with 1 worker and {args.threads} threads.")
+        workers = 1
+    port = urlsplit(dict(AGENTS)[args.agent]).port
+    print(f"[Serve] {args.agent} on port {port}: {workers} worker(s) x {args.threads} threads, role {role}.")
+    AgentServer(args.agent, port, {
+        "bind": f"0.0.0.0:{port}",
+        "workers": workers,
+        "threads": args.threads,
+        "worker_class": "gthread",
+        "preload_app": workers > 1,
+        "proc_name": args.agent,
+    }).run()
+
+
+if __name__ == "__main__":
+    main()
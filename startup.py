@@ -0,0 +1,60 @@
+# startup.py
+
+import os
+import sys
+import time
+
+import tracing
+
+# Libraries kept off the import path of the agents (imported on first use);
+# report() lists which of them an agent has loaded so far
+HEAVY_MODULES = ("pandas", "scipy", "yfinance", "openai", "apscheduler", "aiohttp", "websockets")
+
+def _process_start() -> float:
+    """
+    Epoch time this process started: from /proc on Linux (10 ms
+    resolution), otherwise the time this module was first imported.
+    """
+    try:
+        with open("/proc/self/stat") as f:
+            # The command name (field 2) may contain spaces; count from after it
+            started_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return time.time() - (uptime - started_ticks / os.sysconf("SC_CLK_TCK"))
+    except (OSError, ValueError, IndexError):
+        return time.time()
+
+PROCESS_START = _process_start()
+
+# (agent, phase) -> seconds after PROCESS_START
+_MARKS = {}
+
+
+def mark(phase: str):
+    """
+    Records that the current agent (see tracing.agent) reached `phase`,
+    e.g. "imported" at the end of its module.
+    """
+    _MARKS[(tracing.agent(), phase)] = time.time() - PROCESS_START
+
+def ready():
+    """
+    Marks the agent ready to serve and prints its startup times.
+    """
+    mark("ready")
+    phases = report()["phases"]
+    print(f"[{tracing.agent()}] Ready {phases['ready']:.2f}s after process start "
+          f"(module imported at {phases.get('imported', float('nan')):.2f}s).")
+
+def report() -> dict:
+    """
+    Startup report for an agent's /metrics: seconds from process start to
+    each phase, and which heavy libraries are loaded.
+    """
+    owner = tracing.agent()
+    return {
+        "phases": {phase: round(t, 3) for (name, phase), t in _MARKS.items() if name == owner},
+        "modules": len(sys.modules),
+        "heavy_loaded": [name for name in HEAVY_MODULES if name in sys.modules],
+    }
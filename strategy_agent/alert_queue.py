@@ -0,0 +1,131 @@
+# strategy_agent/alert_queue.py
+
+import time
+import queue
+import threading
+
+import tracing
+
+
+class AlertCoalescer:
+    """
+    Bounded alert queue drained by a fixed pool of worker threads.
+
+    A worker takes the oldest alert and keeps collecting whatever arrives
+    for the next `window` seconds (up to `max_batch` alerts). The batch is
+    merged, with a newer alert replacing an older one of the same type,
+    ticker and signal, and handed to `handler(alerts)` as one unit. A burst of alerts
+    therefore costs one price fetch and one strategy generation instead of
+    one per alert. Only one worker collects at a time, so concurrent
+    workers never split a burst between them.
+
+    When the queue is full, new alerts are dropped and counted.
+
+    Each alert keeps the trace it arrived under. The handler runs under the
+    trace of the oldest alert in its batch, so alert-to-fill latency is
+    measured from the earliest alert behind a strategy.
+    """
+
+    def __init__(self, handler, workers: int = 2, max_queue: int = 1000,
+                 window: float = 2.0, max_batch: int = 100):
+        self.handler = handler
+        self.workers = workers
+        self.window = window
+        self.max_batch = max_batch
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._collect_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._started = False
+
+        self.received = 0
+        self.dropped = 0
+        self.merged = 0
+        self.batches = 0
+        self.in_progress = 0
+        self.errors = 0
+
+    def submit(self, alert_type: str, data: dict) -> bool:
+        """
+        Queues an alert. Returns False if it was dropped because the queue is full.
+        """
+        self._ensure_started()
+        with self._stats_lock:
+            self.received += 1
+        try:
+            self._queue.put_nowait((alert_type, data, tracing.current()))
+            return True
+        except queue.Full:
+            with self._stats_lock:
+                self.dropped += 1
+            return False
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return {
+                "queue_depth": self._queue.qsize(),
+                "max_queue": self._queue.maxsize,
+                "workers": self.workers,
+                "in_progress": self.in_progress,
+                "received": self.received,
+                "dropped": self.dropped,
+                "merged": self.merged,
+                "batches": self.batches,
+                "errors": self.errors,
+            }
+
+    def _ensure_started(self):
+        if self._started:
+            return
+        with self._stats_lock:
+            if self._started:
+                return
+            for i in range(self.workers):
+                threading.Thread(target=tracing.bind(self._work), name=f"alert-worker-{i}", daemon=True).start()
+            self._started = True
+
+    def _work(self):
+        while True:
+            with self._collect_lock:
+                batch = self._collect()
+            alerts = _merge(batch)
+            trace = next((trace for _, _, trace in batch if trace is not None), None)
+            with self._stats_lock:
+                self.merged += len(batch) - len(alerts)
+                self.batches += 1
+                self.in_progress += 1
+            try:
+                with tracing.attached(trace):
+                    self.handler(alerts)
+            except Exception as e:
+                with self._stats_lock:
+                    self.errors += 1
+                print(f"[StrategyAgent] Error handling alerts: {e}")
+            finally:
+                with self._stats_lock:
+                    self.in_progress -= 1
+
+    def _collect(self) -> list:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+
+def _merge(batch: list) -> list:
+    """
+    Keeps the latest alert per (type, ticker, signal), in arrival order of
+    the kept ones, so different signals for a ticker all reach the strategy.
+    """
+    latest = {}
+    for alert_type, data, _ in batch:
+        key = (alert_type, data.get("ticker") or data.get("symbol"), data.get("signal"))
+        latest.pop(key, None)
+        latest[key] = (alert_type, data)
+    return list(latest.values())
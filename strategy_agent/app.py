@@ -3,32 +3,62 @@
 import os
 import json
 import time
-import threading
 import requests
 from flask import Flask, request, jsonify
 from config import (
     OPENAI_API_KEY,
     OPENAI_MODEL,
     MARKET_DATA_AGENT_URL,
-    RISK_AGENT_EVENT_URL
+    RISK_AGENT_EVENT_URL,
+    STRATEGY_WORKERS,
+    STRATEGY_QUEUE_SIZE,
+    STRATEGY_COALESCE_WINDOW,
+    STRATEGY_LLM_BACKEND,
+    STRATEGY_LLM_LOCAL_LATENCY,
+    STRATEGY_CACHE_PATH,
+    STRATEGY_CACHE_TTL,
+    STRATEGY_CACHE_MAX_ENTRIES,
+    STRATEGY_CACHE_DIGITS
 )
 from mcp_client import MCPClient
 from a2a_client import send_event
-import openai
+from a2a_transport import serve as serve_events
+import tracing
+import startup
+from alert_queue import AlertCoalescer
+from llm_backend import make_backend
+from strategy_cache import StrategyCache, canonical_key
 
 app = Flask(__name__)
+tracing.configure("StrategyAgent")
+
+# LLM backend ("openai", or "local" for the deterministic offline stand-in)
+LLM = make_backend(
+    STRATEGY_LLM_BACKEND,
+    api_key=OPENAI_API_KEY,
+    model=OPENAI_MODEL,
+    local_latency=STRATEGY_LLM_LOCAL_LATENCY
+)
 
-# Initialize OpenAI key
-openai.api_key = OPENAI_API_KEY
+# Generation runs at temperature 0, so equivalent signals can reuse a
+# previous strategy; persisted across restarts
+STRATEGY_CACHE = StrategyCache(STRATEGY_CACHE_PATH, STRATEGY_CACHE_TTL, STRATEGY_CACHE_MAX_ENTRIES)
 
 # MCP client to Market Data Agent
 mcp = MCPClient(MARKET_DATA_AGENT_URL)
 
+@tracing.timed("generate_strategy")
 def generate_strategy(signals: dict) -> list:
     """
     Calls GPT-4o-mini to produce a JSON strategy based on incoming signals.
     Expected output: [ { "ticker": str, "target_weight": float, "confidence": float }, ... ]
+    Results are memoized on a canonicalized, quantized form of the signals.
     """
+    key = canonical_key(signals, digits=STRATEGY_CACHE_DIGITS)
+    cached = STRATEGY_CACHE.get(key)
+    if cached is not None:
+        return cached
+
     prompt = (
         "You are an automated portfolio strategist.\n"
         "Given the following signals (technical, news, fundamentals), produce a JSON array of objects:\n"
@@ -37,18 +67,17 @@ def generate_strategy(signals: dict) -> list:
         f"Signals:\n{json.dumps(signals, indent=2)}"
     )
 
-    response = openai.ChatCompletion.create(
-        model=OPENAI_MODEL,
-        messages=[
+    content = LLM.complete(
+        [
             {"role": "system", "content": "You are a portfolio strategy assistant."},
             {"role": "user", "content": prompt}
         ],
         temperature=0.0,
         max_tokens=500
-    )
-    content = response.choices[0].message.content.strip()
+    ).strip()
     try:
         strategy = json.loads(content)
+        STRATEGY_CACHE.put(key, strategy)
     except json.JSONDecodeError:
         # Fallback: return an equal-weight random strategy
         symbols = ["AAPL", "MSFT", "GOOG"]
@@ -56,59 +85,97 @@ def generate_strategy(signals: dict) -> list:
         strategy = [{"ticker": sym, "target_weight": w, "confidence": 0.5} for sym in symbols]
     return strategy
 
-def handle_alert(alert_type: str, data: dict):
+def handle_alerts(alerts: list):
     """
-    Called whenever a technical/news/fundamentals alert arrives.
+    Called by the alert workers with a merged batch of technical/news/
+    fundamentals alerts [(alert_type, data), ...] that arrived together.
     1. Fetch additional data from Market Data (e.g., latest price).  
-    2. Compile 'signals' object.  
-    3. Call generate_strategy(signals).  
+    2. Compile one 'signals' object for the whole batch.  
+    3. Call generate_strategy(signals) once.  
     4. Broadcast 'new_strategy' to Risk Agent.
     """
-    # 1. Get latest prices for relevant tickers
+    # 1. Get latest prices for relevant tickers, including any alerted ones
     tickers = ["AAPL", "MSFT", "GOOG"]
-    prices = {}
-    for sym in tickers:
-        try:
-            res = mcp.call("get_price", {"symbol": sym})
-            prices[sym] = res.get("price")
-        except Exception as e:
-            prices[sym] = None
+    for _, data in alerts:
+        sym = data.get("ticker") or data.get("symbol")
+        if sym and sym not in tickers:
+            tickers.append(sym)
+    try:
+        quotes = mcp.call("get_prices", {"symbols": tickers}).get("prices", {})
+    except Exception as e:
+        quotes = {}
+    prices = {sym: quotes.get(sym, {}).get("price") for sym in tickers}
 
     # 2. Build signals dict
     signals = {
-        "alert_type": alert_type,
-        "alert_data": data,
+        "alerts": [{"alert_type": alert_type, "alert_data": data} for alert_type, data in alerts],
         "prices": prices
     }
 
     # 3. Call GPT-4o-Mini to generate strategy
     strategy = generate_strategy(signals)
-    print(f"[StrategyAgent] Generated strategy: {strategy}")
+    print(f"[StrategyAgent] Generated strategy from {len(alerts)} alert(s): {strategy}")
 
     # 4. Send A2A event to Risk Agent
+    origin = "+".join(sorted({alert_type for alert_type, _ in alerts}))
     send_event(
         RISK_AGENT_EVENT_URL,
         "new_strategy",
-        {"strategy": strategy, "origin": alert_type}
+        {"strategy": strategy, "origin": origin}
     )
     print("[StrategyAgent] Sent new_strategy to RiskAgent.")
 
+# Bounded worker pool; alerts arriving within the coalescing window are
+# merged into a single strategy generation
+ALERTS = AlertCoalescer(
+    handle_alerts,
+    workers=STRATEGY_WORKERS,
+    max_queue=STRATEGY_QUEUE_SIZE,
+    window=STRATEGY_COALESCE_WINDOW
+)
+
 @app.route("/events", methods=["POST"])
 def receive_event():
+    """
+    JSON-over-HTTP transport for handle_event().
+    """
+    payload = request.get_json()
+    with tracing.received(payload):
+        body, status = handle_event(payload.get("type"), payload.get("content", {}))
+    return jsonify(body), status
+
+def handle_event(alert_type: str, data: dict):
     """
     Receives A2A events from TechnicalAgent, NewsAgent, or FundamentalsAgent.
     Body format: { "type": <string>, "content": <dict> }
     """
-    payload = request.get_json()
-    alert_type = payload.get("type")
-    data = payload.get("content", {})
+    # Queue for the alert workers to avoid blocking the HTTP response
+    if not ALERTS.submit(alert_type, data):
+        print(f"[StrategyAgent] Alert queue full; dropped {alert_type}.")
+        return {"status": "dropped"}, 200
+    return {"status": "received"}, 200
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    """
+    Backpressure metrics (queue depth plus received/dropped/merged alert
+    counts), strategy cache hit rate, LLM call latency and latency
+    histograms (generate_strategy, per-hop delivery and queueing).
+    """
+    return jsonify({
+        "alerts": ALERTS.stats(),
+        "strategy_cache": STRATEGY_CACHE.stats(),
+        "llm": LLM.stats(),
+        "latency": tracing.snapshot(),
+        "startup": startup.report()
+    }), 200
 
-    # Handle in background thread to avoid blocking HTTP response
-    threading.Thread(target=handle_alert, args=(alert_type, data)).start()
-    return jsonify({"status": "received"}), 200
+startup.mark("imported")
 
 if __name__ == "__main__":
     print("[StrategyAgent] Listening on port 5005 for A2A events.")
+    serve_events(handle_event, 5005)
+    startup.ready()
     app.run(host="0.0.0.0", port=5005)
 
 
@@ -125,7 +192,8 @@ if __name__ == "__main__":
 
     {
     "type": "news_alert",
-      "content": { "sentiment": 0.8, 
+      "content": { "ticker": "AAPL",
+                   "sentiment": 0.8, 
                    "alert": "positive" 
                  } 
     }
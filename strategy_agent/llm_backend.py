@@ -0,0 +1,145 @@
+# strategy_agent/llm_backend.py
+
+import json
+import time
+import threading
+
+
+class LLMBackend:
+    """
+    Chat-completion backend used by generate_strategy(). Subclasses
+    implement _complete(); complete() adds call/latency accounting so the
+    cost of the LLM hop can be measured for any backend.
+    """
+
+    name = "base"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.errors = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+    def complete(self, messages: list, temperature: float = 0.0, max_tokens: int = 500) -> str:
+        start = time.perf_counter()
+        try:
+            return self._complete(messages, temperature, max_tokens)
+        except Exception:
+            with self._lock:
+                self.errors += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.calls += 1
+                self.total_seconds += elapsed
+                self.max_seconds = max(self.max_seconds, elapsed)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "backend": self.name,
+                "calls": self.calls,
+                "errors": self.errors,
+                "avg_ms": 1000.0 * self.total_seconds / self.calls if self.calls else None,
+                "max_ms": 1000.0 * self.max_seconds,
+            }
+
+    def _complete(self, messages, temperature, max_tokens) -> str:
+        raise NotImplementedError
+
+
+class OpenAIBackend(LLMBackend):
+    """
+    OpenAI ChatCompletion API (network round trip per call).
+    """
+
+    name = "openai"
+
+    def __init__(self, api_key: str, model: str):
+        super().__init__()
+        import openai
+        openai.api_key = api_key
+        self._openai = openai
+        self.model = model
+
+    def _complete(self, messages, temperature, max_tokens) -> str:
+        response = self._openai.ChatCompletion.create(
+            model=self.model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens
+        )
+        return response.choices[0].message.content
+
+
+class LocalBackend(LLMBackend):
+    """
+    Deterministic offline stand-in for the LLM. It reads the signals JSON
+    from the prompt and answers with a rule-based strategy:
+      - equal base weights (at most 0.15) across the priced tickers
+      - tilted up on oversold/bullish signals, down on overbought/bearish
+        signals and fundamentals alerts, and by news sentiment
+      - every weight capped at 0.20
+    Identical prompts always give identical answers. `latency` seconds of
+    sleep can be added to mimic a remote model in benchmarks.
+    """
+
+    name = "local"
+
+    BULLISH = {"oversold", "below_lower_band", "macd_bullish"}
+    BEARISH = {"overbought", "above_upper_band", "macd_bearish"}
+
+    def __init__(self, latency: float = 0.0):
+        super().__init__()
+        self.latency = latency
+
+    def _complete(self, messages, temperature, max_tokens) -> str:
+        if self.latency:
+            time.sleep(self.latency)
+        prompt = messages[-1]["content"]
+        signals = json.loads(prompt[prompt.index("Signals:") + len("Signals:"):])
+        return json.dumps(self.strategy(signals))
+
+    def strategy(self, signals: dict) -> list:
+        """
+        The rule-based answer for a signals dict, without the prompt round
+        trip (the backtest calls this directly).
+        """
+        tickers = sorted(signals.get("prices") or {}) or ["AAPL", "MSFT", "GOOG"]
+        tilt = {sym: 0.0 for sym in tickers}
+        for alert in signals.get("alerts", []):
+            alert_type = alert.get("alert_type")
+            data = alert.get("alert_data", {})
+            sym = data.get("ticker") or data.get("symbol")
+            if alert_type == "news_alert":
+                # Ticker-routed news tilts its ticker; untagged news tilts the book
+                for t in ([sym] if sym else tilt):
+                    if t in tilt:
+                        tilt[t] += float(data.get("sentiment", 0.0))
+            elif sym in tilt:
+                if data.get("signal") in self.BULLISH:
+                    tilt[sym] += 1.0
+                elif data.get("signal") in self.BEARISH or alert_type == "fundamentals_alert":
+                    tilt[sym] -= 1.0
+
+        base = min(0.9 / len(tickers), 0.15)
+        strategy = []
+        for sym in tickers:
+            weight = min(max(base * (1.0 + 0.25 * tilt[sym]), 0.0), 0.20)
+            confidence = min(0.5 + 0.1 * abs(tilt[sym]), 0.9)
+            strategy.append({
+                "ticker": sym,
+                "target_weight": round(weight, 4),
+                "confidence": round(confidence, 2)
+            })
+        return strategy
+
+
+def make_backend(name: str, api_key: str = None, model: str = None, local_latency: float = 0.0) -> LLMBackend:
+    if name == "openai":
+        return OpenAIBackend(api_key, model)
+    if name == "local":
+        return LocalBackend(latency=local_latency)
+    raise ValueError(f"Unknown LLM backend: {name}")
@@ -0,0 +1,107 @@
+# strategy_agent/strategy_cache.py
+
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+
+# Keys that change on every alert without changing its meaning
+VOLATILE_KEYS = {"timestamp", "trace"}
+
+def canonical_key(signals: dict, digits: int = 3) -> str:
+    """
+    Stable hash of a signals dict. Keys are sorted, floats are rounded to
+    `digits` significant digits, volatile keys are dropped, and lists of
+    objects (e.g. merged alerts) are sorted. Signals that differ only by
+    noise map to the same key.
+    """
+    canonical = json.dumps(_quantize(signals, digits), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+def _quantize(value, digits):
+    if isinstance(value, float):
+        return float(f"{value:.{digits}g}")
+    if isinstance(value, dict):
+        return {k: _quantize(v, digits) for k, v in value.items() if k not in VOLATILE_KEYS}
+    if isinstance(value, (list, tuple)):
+        items = [_quantize(v, digits) for v in value]
+        if items and all(isinstance(v, dict) for v in items):
+            items.sort(key=lambda v: json.dumps(v, sort_keys=True))
+        return items
+    return value
+
+
+class StrategyCache:
+    """
+    Persistent memo of generate_strategy() results, stored in SQLite so it
+    survives restarts. Entries expire `ttl` seconds after being written.
+    Once the table grows past `max_entries`, the least recently used rows
+    are evicted.
+    """
+
+    def __init__(self, path: str, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS strategies ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL,"
+            " created REAL NOT NULL, used REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS strategies_used ON strategies (used)")
+        self._db.commit()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str):
+        """
+        Returns the cached strategy or None.
+        """
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT value, created FROM strategies WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or row[1] + self.ttl < now:
+                if row is not None:
+                    self._db.execute("DELETE FROM strategies WHERE key = ?", (key,))
+                    self._db.commit()
+                self.misses += 1
+                return None
+            self._db.execute("UPDATE strategies SET used = ? WHERE key = ?", (now, key))
+            self._db.commit()
+            self.hits += 1
+            return json.loads(row[0])
+
+    def put(self, key: str, strategy):
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO strategies (key, value, created, used) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(strategy), now, now)
+            )
+            (count,) = self._db.execute("SELECT COUNT(*) FROM strategies").fetchone()
+            excess = count - self.max_entries
+            if excess > 0:
+                self._db.execute(
+                    "DELETE FROM strategies WHERE key IN"
+                    " (SELECT key FROM strategies ORDER BY used LIMIT ?)", (excess,)
+                )
+                self.evictions += excess
+            self._db.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            (entries,) = self._db.execute("SELECT COUNT(*) FROM strategies").fetchone()
+            lookups = self.hits + self.misses
+            return {
+                "entries": entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else None,
+                "evictions": self.evictions,
+            }
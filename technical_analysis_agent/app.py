@@ -1,33 +1,65 @@
 # technical_analysis_agent/app.py
 
 import os
-import time
+from datetime import datetime, timedelta
 import json
+import threading
 import requests
 from flask import Flask, request, jsonify
-from apscheduler.schedulers.background import BackgroundScheduler
-import pandas as pd
 import numpy as np
 
 from mcp_client import MCPClient
+from bar_codec import ENCODINGS, decode_bars
 from a2a_client import send_event
-from config import MARKET_DATA_AGENT_URL, STRATEGY_AGENT_EVENT_URL
+from a2a_transport import serve as serve_events
+import tracing
+import startup
+from rsi_engine import RSIEngine, crossovers
+from indicators import BarBuffer, IndicatorPipeline, SignalRules, DEFAULT_RULES
+from bar_subscriber import BarSubscriber
+from config import (
+    MARKET_DATA_AGENT_URL,
+    MARKET_DATA_STREAM_URL,
+    STRATEGY_AGENT_EVENT_URL,
+    TECHNICAL_UNIVERSE,
+    TECHNICAL_INDICATORS,
+    TECHNICAL_MODE
+)
 
 app = Flask(__name__)
+tracing.configure("TechnicalAgent")
 
 # List of tickers to monitor
-TICKERS = ["AAPL", "MSFT", "GOOG"]
+TICKERS = TECHNICAL_UNIVERSE
 
-# Store last RSI to detect crossovers
-LAST_RSI = {ticker: None for ticker in TICKERS}
+# Streaming RSI state for the whole universe; keeps the previous value
+# of every symbol to detect crossovers
+RSI_ENGINE = RSIEngine(TICKERS, window=14)
+
+# Rolling close/high/low matrices plus the indicators computed over them
+# in one fused pass per tick
+BUFFER = BarBuffer(TICKERS, capacity=128)
+PIPELINE = IndicatorPipeline([(name, {}) for name in TECHNICAL_INDICATORS])
+
+# Bulk thresholds over the indicator matrix; each fires once per transition
+SIGNAL_RULES = SignalRules(DEFAULT_RULES)
+
+# The scheduled job and the bar stream both update the state above
+STATE_LOCK = threading.Lock()
+
+# First sweep pulls enough history to warm up the slowest indicator
+WARMUP_PERIOD = "6mo"
+HISTORY_PERIOD = "30d"
 
 # MCP client to Market Data Agent
 mcp = MCPClient(MARKET_DATA_AGENT_URL)
 
-def compute_rsi(prices: pd.Series, window: int = 14) -> float:
+@tracing.timed("compute_rsi")
+def compute_rsi(prices: "pandas.Series", window: int = 14) -> float:
     """
     Compute RSI (Relative Strength Index) on a series of closing prices.
     RSI = 100 - (100 / (1 + RS)), where RS = avg gain / avg loss over window.
+    One-shot helper; the scheduled job uses the streaming RSI_ENGINE instead.
     """
     deltas = prices.diff().dropna()
     gain = deltas.where(deltas > 0, 0.0)
@@ -43,61 +75,143 @@ def compute_rsi(prices: pd.Series, window: int = 14) -> float:
 
 def check_technical():
     """
-    Scheduled job (every 5 min):
-      1. Fetch last 30 days of daily close for each ticker.
-      2. Compute RSI.
-      3. If RSI crosses above 70 (overbought) or below 30 (oversold),
-         send an A2A event to Strategy Agent.
-    """
-    global LAST_RSI
-    for ticker in TICKERS:
-        # 1. Get 30-day daily historical data via MCP
-        try:
-            resp = mcp.call("get_historical", {"symbol": ticker, "period": "30d", "interval": "1d"})
-            history = resp.get("history", [])
-            if not history:
-                continue
-            closes = pd.Series([h["close"] for h in history])
-            # 2. Compute RSI
-            rsi = compute_rsi(closes, window=14)
-        except Exception as e:
-            print(f"[TechnicalAgent] Error fetching data for {ticker}: {e}")
-            continue
-
-        prev = LAST_RSI.get(ticker)
-        LAST_RSI[ticker] = rsi
-
-        # 3. Detect crossover
-        #    If prev exists, and for example, prev < 70 and now >= 70 → overbought
-        #    Or prev > 30 and now <= 30 → oversold
-        if prev is not None:
-            if prev < 70 and rsi >= 70:
-                print(f"[TechnicalAgent] {ticker} RSI crossed above 70: {rsi:.2f}")
-                send_event(
-                    STRATEGY_AGENT_EVENT_URL,
-                    "technical_alert",
-                    {"ticker": ticker, "rsi": rsi, "signal": "overbought"}
-                )
-            elif prev > 30 and rsi <= 30:
-                print(f"[TechnicalAgent] {ticker} RSI crossed below 30: {rsi:.2f}")
-                send_event(
-                    STRATEGY_AGENT_EVENT_URL,
-                    "technical_alert",
-                    {"ticker": ticker, "rsi": rsi, "signal": "oversold"}
-                )
+    Scheduled job (every 5 min, or once at startup in stream mode):
+      1. Fetch recent daily bars for the whole universe in one call.
+      2. Shift the new bars into the bar buffer and the streaming RSI engine,
+         then compute every configured indicator in one pass.
+      3. If RSI crosses above 70 (overbought) or below 30 (oversold), or an
+         indicator rule newly triggers, send an A2A event to Strategy Agent.
+    """
+    # 1. Get daily historical data for all tickers in one MCP call
+    period = HISTORY_PERIOD if BUFFER.count.any() else WARMUP_PERIOD
+    try:
+        histories = mcp.call(
+            "get_historicals",
+            {"symbols": TICKERS, "period": period, "interval": "1d",
+             "format": "columns", "encodings": list(ENCODINGS)}
+        ).get("histories", {})
+        bars = {ticker: decode_bars(payload) for ticker, payload in histories.items()}
+    except Exception as e:
+        print(f"[TechnicalAgent] Error fetching data: {e}")
+        return
+    on_bars(bars)
+
+def on_bars(bars: dict):
+    """
+    Steps 2 and 3 of check_technical for a {ticker: bars} update. In stream
+    mode this runs for every event pushed by the Market Data Agent, with
+    just the bars that are new.
+    """
+    with STATE_LOCK:
+        _process_bars(bars)
+
+def _process_bars(bars: dict):
+    # 2. O(1) Wilder update per symbol for each new bar, then the
+    #    indicator pipeline over the updated buffer
+    new, revise = BUFFER.append(bars)
+    if not new["close"].shape[1]:
+        return
+    with tracing.timed("compute_rsi"):
+        prev, rsi = RSI_ENGINE.update(new["close"], revise)
+    with tracing.timed("compute_indicators"):
+        names, values = PIPELINE.run(BUFFER, extra={"rsi": rsi})
+
+    # 3. Detect crossovers and rule transitions across the whole universe at once
+    overbought, oversold = crossovers(prev, rsi, upper=70.0, lower=30.0)
+    for i in np.flatnonzero(overbought):
+        ticker = TICKERS[i]
+        print(f"[TechnicalAgent] {ticker} RSI crossed above 70: {rsi[i]:.2f}")
+        send_event(
+            STRATEGY_AGENT_EVENT_URL,
+            "technical_alert",
+            {"ticker": ticker, "rsi": float(rsi[i]), "signal": "overbought",
+             "indicators": _indicator_snapshot(names, values, i)}
+        )
+    for i in np.flatnonzero(oversold):
+        ticker = TICKERS[i]
+        print(f"[TechnicalAgent] {ticker} RSI crossed below 30: {rsi[i]:.2f}")
+        send_event(
+            STRATEGY_AGENT_EVENT_URL,
+            "technical_alert",
+            {"ticker": ticker, "rsi": float(rsi[i]), "signal": "oversold",
+             "indicators": _indicator_snapshot(names, values, i)}
+        )
+
+    rules, fired = SIGNAL_RULES.evaluate(names, values)
+    for i, r in zip(*np.nonzero(fired)):
+        ticker, signal = TICKERS[i], rules[r][3]
+        print(f"[TechnicalAgent] {ticker} {signal}")
+        send_event(
+            STRATEGY_AGENT_EVENT_URL,
+            "technical_alert",
+            {"ticker": ticker, "rsi": _float_or_none(rsi[i]), "signal": signal,
+             "indicators": _indicator_snapshot(names, values, i)}
+        )
+
+def _indicator_snapshot(names: list, values: np.ndarray, i: int) -> dict:
+    return {name: _float_or_none(values[i, j]) for j, name in enumerate(names)}
+
+def _float_or_none(x) -> float:
+    return None if np.isnan(x) else float(x)
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    """
+    Latency histograms (compute_rsi, indicators, MCP calls, outgoing events).
+    """
+    return jsonify({"latency": tracing.snapshot(),
+                    "startup": startup.report()})
 
 @app.route("/events", methods=["POST"])
 def receive_event():
+    """
+    JSON-over-HTTP transport for handle_event().
+    """
+    payload = request.get_json()
+    with tracing.received(payload):
+        body, status = handle_event(payload.get("type"), payload.get("content", {}))
+    return jsonify(body), status
+
+def handle_event(evt_type: str, content: dict):
     """
     Technical Agent doesn’t expect incoming events in this MVP.
     We include the endpoint so POSTs don’t 404.
     """
-    return jsonify({"status": "ok"}), 200
+    return {"status": "ok"}, 200
+
+def _stream_since():
+    """
+    Resume point for the bar stream: the oldest last bar among tickers
+    with history (older bars are skipped by BarBuffer, equal ones revise).
+    """
+    with STATE_LOCK:
+        seen = BUFFER.last_ts[BUFFER.count > 0]
+        return int(seen.min()) if len(seen) else None
+
+def start():
+    """
+    Starts the bar subscription or the scheduler (background work of the
+    agent; see cohost.py).
+    """
+    if TECHNICAL_MODE == "stream":
+        # Warm up from history once, then react to every pushed bar
+        check_technical()
+        BarSubscriber(MARKET_DATA_STREAM_URL, TICKERS, on_bars, since=_stream_since).start()
+        print("[TechnicalAgent] Subscribed to bar stream. Listening on port 5002.")
+    else:
+        from apscheduler.schedulers.background import BackgroundScheduler
+
+        # Schedule check_technical every 5 minutes
+        scheduler = BackgroundScheduler()
+        scheduler.add_job(tracing.bind(check_technical), "interval", minutes=5,
+                          next_run_time=datetime.now() + timedelta(seconds=1))
+        scheduler.start()
+        print("[TechnicalAgent] Scheduler started. Listening on port 5002.")
+
+startup.mark("imported")
 
 if __name__ == "__main__":
-    # Schedule check_technical every 5 minutes
-    scheduler = BackgroundScheduler()
-    scheduler.add_job(check_technical, "interval", minutes=5, next_run_time=time.time() + 1)
-    scheduler.start()
-    print("[TechnicalAgent] Scheduler started. Listening on port 5002.")
+    start()
+    serve_events(handle_event, 5002)
+    startup.ready()
     app.run(host="0.0.0.0", port=5002)
@@ -0,0 +1,86 @@
+# technical_analysis_agent/bar_subscriber.py
+
+import json
+import time
+import threading
+
+from http_pool import get_session
+from bar_codec import ENCODINGS, decode_bars
+from config import HTTP_CONNECT_TIMEOUT
+import tracing
+
+
+class BarSubscriber:
+    """
+    Client of the Market Data Agent's GET /subscribe server-sent event
+    stream, run on a daemon thread.
+
+    Each "bars" event is decoded into {symbol: bars} and handed to
+    on_bars(). When the stream drops (or the server cuts off a lagging
+    client), the subscriber reconnects with backoff. It passes since=since()
+    so the server backfills whatever was published in between.
+    """
+
+    def __init__(self, url: str, symbols: list, on_bars, since=None, interval: str = "1d",
+                 idle_timeout: float = 60.0, max_backoff: float = 30.0):
+        self.url = url
+        self.symbols = list(symbols)
+        self.on_bars = on_bars
+        self.since = since
+        self.interval = interval
+        self.idle_timeout = idle_timeout
+        self.max_backoff = max_backoff
+        self.events = 0
+        self.reconnects = 0
+
+    def start(self):
+        threading.Thread(target=tracing.bind(self._run), name="bar-subscriber", daemon=True).start()
+        return self
+
+    def _run(self):
+        backoff = 1.0
+        while True:
+            try:
+                for event, data in self._stream():
+                    backoff = 1.0
+                    if event == "bars":
+                        self.events += 1
+                        payload = json.loads(data)
+                        bars = {sym: decode_bars(p) for sym, p in payload["bars"].items()}
+                        if bars:
+                            self.on_bars(bars)
+                    elif event == "overflow":
+                        print("[TechnicalAgent] Bar stream overflowed; resubscribing.")
+                        break
+            except Exception as e:
+                print(f"[TechnicalAgent] Bar stream error: {e}")
+            self.reconnects += 1
+            time.sleep(backoff)
+            backoff = min(backoff * 2.0, self.max_backoff)
+
+    def _stream(self):
+        """
+        Yields (event, data) pairs from one connection.
+        """
+        params = {"symbols": ",".join(self.symbols), "interval": self.interval,
+                  "encodings": ",".join(ENCODINGS)}
+        since = self.since() if self.since is not None else None
+        if since is not None:
+            params["since"] = since
+        with get_session(self.url).get(self.url, params=params, stream=True,
+                                       timeout=(HTTP_CONNECT_TIMEOUT, self.idle_timeout)) as response:
+            response.raise_for_status()
+            event, data = "message", []
+            for line in response.iter_lines(decode_unicode=True):
+                if line:
+                    if line.startswith(":"):
+                        continue
+                    field, _, value = line.partition(":")
+                    value = value[1:] if value.startswith(" ") else value
+                    if field == "event":
+                        event = value
+                    elif field == "data":
+                        data.append(value)
+                elif data:
+                    yield event, "\n".join(data)
+                    event, data = "message", []
@@ -0,0 +1,167 @@
+# technical_analysis_agent/indicator_history.py
+
+import numpy as np
+from scipy.signal import lfilter
+
+from rsi_engine import crossovers
+from indicators import DEFAULT_RULES
+
+# Whole-history indicator registry:
+# name -> function(close, high, low, **params) -> {column: (n_symbols, T) array}
+HISTORY_INDICATORS = {}
+
+def history_indicator(name: str):
+    """
+    Decorator registering the whole-history form of indicator `name`.
+    """
+    def register(fn):
+        HISTORY_INDICATORS[name] = fn
+        return fn
+    return register
+
+
+# The functions below compute, for every bar of a (n_symbols, T) matrix at
+# once, the value the streaming RSIEngine / IndicatorPipeline would report
+# after that bar. Rows are NaN before a symbol's first bar and assumed
+# gap-free (forward-filled) after it. The recursive ones (EMA, Wilder
+# smoothing) are single lfilter() calls along the time axis. The live
+# pipeline seeds its EMAs at the start of its 128-bar buffer, so early EMA
+# values differ from the live ones by a factor of (1 - alpha)**128.
+
+def first_valid(values: np.ndarray) -> np.ndarray:
+    """
+    Column of each row's first non-NaN value (T for all-NaN rows).
+    """
+    valid = ~np.isnan(values)
+    return np.where(valid.any(axis=1), valid.argmax(axis=1), values.shape[1])
+
+def bars_seen(values: np.ndarray) -> np.ndarray:
+    """
+    (n, T) count of bars up to and including each column.
+    """
+    return np.maximum(np.arange(values.shape[1]) - first_valid(values)[:, None] + 1, 0)
+
+def ema_history(values: np.ndarray, span: float = None, alpha: float = None) -> np.ndarray:
+    """
+    EMA (adjust=False) of every row, seeded at its first valid value.
+    """
+    alpha = alpha if alpha is not None else 2.0 / (span + 1.0)
+    start = first_valid(values)
+    rows = np.arange(len(values))
+    seed = np.where(start < values.shape[1], values[rows, np.minimum(start, values.shape[1] - 1)], 0.0)
+    # Before its first bar a row holds its seed, so the filter state at the
+    # first bar is exactly "EMA = first value"
+    x = np.where(np.isnan(values), seed[:, None], values)
+    out, _ = lfilter([alpha], [1.0, alpha - 1.0], x, axis=1, zi=(1.0 - alpha) * x[:, :1])
+    out[np.arange(values.shape[1]) < start[:, None]] = np.nan
+    return out
+
+def rsi_history(close: np.ndarray, window: int = 14) -> np.ndarray:
+    """
+    Wilder RSI after every bar, as RSIEngine computes it: averages seeded
+    with the simple mean of the first `window` deltas, then smoothed with
+    alpha = 1 / window. NaN until a row has `window` deltas.
+    """
+    n, T = close.shape
+    delta = np.diff(close, axis=1, prepend=np.nan)
+    delta = np.nan_to_num(delta, nan=0.0)
+    seeded = first_valid(close) + window
+    cols = np.arange(T)
+
+    def wilder(x):
+        # Zero input until the seed bar, the seed sum on it (lfilter scales
+        # it by 1/window), plain values after it
+        totals = np.cumsum(x, axis=1)
+        u = np.where(cols > seeded[:, None], x, np.where(cols == seeded[:, None], totals, 0.0))
+        return lfilter([1.0 / window], [1.0, 1.0 / window - 1.0], u, axis=1)
+
+    avg_gain = wilder(np.maximum(delta, 0.0))
+    avg_loss = wilder(np.maximum(-delta, 0.0))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rsi = np.where(avg_loss == 0, 100.0, 100.0 - 100.0 / (1.0 + avg_gain / avg_loss))
+    return np.where(cols >= seeded[:, None], rsi, np.nan)
+
+def rolling_mean_history(values: np.ndarray, window: int) -> np.ndarray:
+    totals = np.cumsum(np.nan_to_num(values), axis=1)
+    out = totals.copy()
+    out[:, window:] -= totals[:, :-window]
+    return np.where(bars_seen(values) >= window, out / window, np.nan)
+
+
+@history_indicator("sma")
+def sma(close, high, low, window: int = 20) -> dict:
+    return {f"sma_{window}": rolling_mean_history(close, window)}
+
+@history_indicator("ema")
+def ema(close, high, low, span: int = 12) -> dict:
+    return {f"ema_{span}": ema_history(close, span)}
+
+@history_indicator("macd")
+def macd(close, high, low, fast: int = 12, slow: int = 26, signal: int = 9) -> dict:
+    line = ema_history(close, fast) - ema_history(close, slow)
+    signal_line = ema_history(line, signal)
+    ready = bars_seen(close) >= slow + signal
+    return {
+        "macd": np.where(ready, line, np.nan),
+        "macd_signal": np.where(ready, signal_line, np.nan),
+        "macd_hist": np.where(ready, line - signal_line, np.nan),
+    }
+
+@history_indicator("bollinger")
+def bollinger(close, high, low, window: int = 20, k: float = 2.0) -> dict:
+    mid = rolling_mean_history(close, window)
+    var = rolling_mean_history(close ** 2, window) - mid ** 2
+    width = k * np.sqrt(np.maximum(var, 0.0))
+    upper, lower = mid + width, mid - width
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pct_b = (close - lower) / (upper - lower)
+    return {"bb_mid": mid, "bb_upper": upper, "bb_lower": lower, "bb_pct_b": pct_b}
+
+@history_indicator("atr")
+def atr(close, high, low, window: int = 14) -> dict:
+    prev_close = np.concatenate([np.full((len(close), 1), np.nan), close[:, :-1]], axis=1)
+    tr = np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+    tr[:, 0] = np.nan
+    value = ema_history(tr, 2 * window - 1)
+    return {"atr": np.where(bars_seen(close) > window, value, np.nan)}
+
+
+def signal_history(close: np.ndarray, high: np.ndarray = None, low: np.ndarray = None,
+                   specs: list = None, rules: list = None, rsi_window: int = 14,
+                   upper: float = 70.0, lower: float = 30.0) -> dict:
+    """
+    Every alert the Technical Agent would send while the history streams in
+    bar by bar, computed in one vectorized pass:
+      - "rsi": the (n, T) RSI matrix
+      - "signals": [(signal_name, (n, T) bool matrix), ...] in the order the
+        agent sends them (RSI overbought/oversold, then each rule)
+    `specs` ([(indicator_name, {param: value}), ...]) defaults to what the
+    rules need; high/low default to close.
+    """
+    rules = DEFAULT_RULES if rules is None else rules
+    high = close if high is None else high
+    low = close if low is None else low
+    specs = specs if specs is not None else [("bollinger", {}), ("macd", {})]
+    unknown = [name for name, _ in specs if name not in HISTORY_INDICATORS]
+    if unknown:
+        raise ValueError(f"Unknown indicators: {unknown}")
+
+    rsi = rsi_history(close, rsi_window)
+    columns = {"rsi": rsi}
+    for name, params in specs:
+        columns.update(HISTORY_INDICATORS[name](close, high, low, **params))
+
+    prev = np.concatenate([np.full((len(rsi), 1), np.nan), rsi[:, :-1]], axis=1)
+    overbought, oversold = crossovers(prev, rsi, upper=upper, lower=lower)
+    signals = [("overbought", overbought), ("oversold", oversold)]
+    for column, op, threshold, name in rules:
+        if column not in columns:
+            continue
+        with np.errstate(invalid="ignore"):
+            now = columns[column] > threshold if op == ">" else columns[column] < threshold
+        # Fires on the transition only; nothing fires on the first bar
+        fired = now.copy()
+        fired[:, 0] = False
+        fired[:, 1:] &= ~now[:, :-1]
+        signals.append((name, fired))
+    return {"rsi": rsi, "columns": columns, "signals": signals}
@@ -0,0 +1,232 @@
+# technical_analysis_agent/indicators.py
+
+import numpy as np
+
+from rsi_engine import stage_new_bars
+
+# Indicator registry: name -> function(ctx, **params) -> {column: (n_symbols,) array}
+INDICATORS = {}
+
+# Bulk thresholds the Technical Agent alerts on (see SignalRules)
+DEFAULT_RULES = [
+    ("bb_pct_b", ">", 1.0, "above_upper_band"),
+    ("bb_pct_b", "<", 0.0, "below_lower_band"),
+    ("macd_hist", ">", 0.0, "macd_bullish"),
+    ("macd_hist", "<", 0.0, "macd_bearish"),
+]
+
+def indicator(name: str):
+    """
+    Decorator registering an indicator under `name` for IndicatorPipeline.
+    """
+    def register(fn):
+        INDICATORS[name] = fn
+        return fn
+    return register
+
+
+class BarBuffer:
+    """
+    Rolling (n_symbols, capacity) close/high/low matrices for the universe,
+    newest bar in the last column. Symbols with less history are NaN-padded
+    on the left, so each row is always one contiguous run of bars.
+    """
+
+    FIELDS = ("close", "high", "low")
+
+    def __init__(self, symbols: list, capacity: int = 128):
+        self.symbols = list(symbols)
+        self.index = {sym: i for i, sym in enumerate(self.symbols)}
+        self.capacity = capacity
+        n = len(self.symbols)
+        self.last_ts = np.full(n, np.iinfo(np.int64).min, dtype=np.int64)
+        self.count = np.zeros(n, dtype=np.int64)
+        self.data = {field: np.full((n, capacity), np.nan) for field in self.FIELDS}
+
+    def append(self, bars_by_symbol: dict):
+        """
+        Shifts in the bars each symbol has not seen yet (see
+        rsi_engine.stage_new_bars). Returns the staged ({field: matrix},
+        revise) pair so other consumers can apply the same update.
+        """
+        new, revise = stage_new_bars(bars_by_symbol, self.index, self.last_ts, self.FIELDS)
+        for j in range(new["close"].shape[1]):
+            valid = ~np.isnan(new["close"][:, j])
+            # A revised last bar overwrites the newest column instead of shifting
+            shift = valid & ~revise if j == 0 else valid
+            for field in self.FIELDS:
+                data = self.data[field]
+                data[shift, :-1] = data[shift, 1:]
+                data[valid, -1] = new[field][valid, j]
+            self.count = np.minimum(self.count + shift, self.capacity)
+        return new, revise
+
+
+class _Context:
+    """
+    Intermediates shared by every indicator in one pipeline pass. Each is
+    computed on first use and reused, e.g. the close cumsums behind every
+    rolling mean/std, or the EMA series behind both `ema` and `macd`.
+    """
+
+    def __init__(self, buffer: BarBuffer):
+        self.close = buffer.data["close"]
+        self.high = buffer.data["high"]
+        self.low = buffer.data["low"]
+        self.count = buffer.count
+        self.last_close = self.close[:, -1]
+        self._cache = {}
+
+    def _memo(self, key, compute):
+        if key not in self._cache:
+            self._cache[key] = compute()
+        return self._cache[key]
+
+    def cumsum(self, power: int = 1) -> np.ndarray:
+        """
+        Running sums of close**power with a leading zero column; NaN padding
+        counts as zero, so windows that reach into it are masked by count.
+        """
+        def compute():
+            values = np.nan_to_num(self.close) ** power
+            return np.concatenate([np.zeros((len(values), 1)), np.cumsum(values, axis=1)], axis=1)
+        return self._memo(("cumsum", power), compute)
+
+    def rolling_mean(self, window: int) -> np.ndarray:
+        def compute():
+            cs = self.cumsum(1)
+            mean = (cs[:, -1] - cs[:, -1 - window]) / window
+            return np.where(self.count >= window, mean, np.nan)
+        return self._memo(("mean", window), compute)
+
+    def rolling_std(self, window: int) -> np.ndarray:
+        def compute():
+            cs2 = self.cumsum(2)
+            mean = self.rolling_mean(window)
+            var = (cs2[:, -1] - cs2[:, -1 - window]) / window - mean ** 2
+            return np.sqrt(np.maximum(var, 0.0))
+        return self._memo(("std", window), compute)
+
+    def ema_series(self, span: int, values: np.ndarray = None, key=None) -> np.ndarray:
+        """
+        Full EMA series (adjust=False), seeded at each row's first valid value.
+        """
+        def compute():
+            series = self.close if values is None else values
+            alpha = 2.0 / (span + 1.0)
+            out = np.full(series.shape, np.nan)
+            ema = np.full(len(series), np.nan)
+            for j in range(series.shape[1]):
+                x = series[:, j]
+                ema = np.where(np.isnan(ema), x, np.where(np.isnan(x), ema, alpha * x + (1 - alpha) * ema))
+                out[:, j] = ema
+            return out
+        return self._memo(("ema", span, key), compute)
+
+    def true_range(self) -> np.ndarray:
+        def compute():
+            prev_close = self.close[:, :-1]
+            high, low = self.high[:, 1:], self.low[:, 1:]
+            return np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+        return self._memo("true_range", compute)
+
+
+@indicator("sma")
+def sma(ctx: _Context, window: int = 20) -> dict:
+    return {f"sma_{window}": ctx.rolling_mean(window)}
+
+@indicator("ema")
+def ema(ctx: _Context, span: int = 12) -> dict:
+    return {f"ema_{span}": ctx.ema_series(span)[:, -1]}
+
+@indicator("macd")
+def macd(ctx: _Context, fast: int = 12, slow: int = 26, signal: int = 9) -> dict:
+    line = ctx.ema_series(fast) - ctx.ema_series(slow)
+    signal_line = ctx.ema_series(signal, values=line, key=("macd", fast, slow))
+    ready = ctx.count >= slow + signal
+    return {
+        "macd": np.where(ready, line[:, -1], np.nan),
+        "macd_signal": np.where(ready, signal_line[:, -1], np.nan),
+        "macd_hist": np.where(ready, line[:, -1] - signal_line[:, -1], np.nan),
+    }
+
+@indicator("bollinger")
+def bollinger(ctx: _Context, window: int = 20, k: float = 2.0) -> dict:
+    mid = ctx.rolling_mean(window)
+    width = k * ctx.rolling_std(window)
+    upper, lower = mid + width, mid - width
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pct_b = (ctx.last_close - lower) / (upper - lower)
+    return {"bb_mid": mid, "bb_upper": upper, "bb_lower": lower, "bb_pct_b": pct_b}
+
+@indicator("atr")
+def atr(ctx: _Context, window: int = 14) -> dict:
+    # Wilder smoothing of the true range == EMA with alpha = 1 / window
+    span = 2 * window - 1
+    tr = ctx.true_range()
+    value = ctx.ema_series(span, values=tr, key="true_range")[:, -1]
+    return {"atr": np.where(ctx.count > window, value, np.nan)}
+
+
+class IndicatorPipeline:
+    """
+    Computes a configurable set of registered indicators over a BarBuffer in
+    one pass, sharing intermediates between them. Returns the results as a
+    single (n_symbols, n_columns) signal matrix plus its column names.
+    """
+
+    def __init__(self, specs: list):
+        """
+        specs: [(indicator_name, {param: value}), ...]
+        """
+        unknown = [name for name, _ in specs if name not in INDICATORS]
+        if unknown:
+            raise ValueError(f"Unknown indicators: {unknown}")
+        self.specs = specs
+
+    def run(self, buffer: BarBuffer, extra: dict = None):
+        """
+        extra: precomputed {column: (n_symbols,) array} to include as-is,
+        e.g. the streaming RSI.
+        """
+        ctx = _Context(buffer)
+        columns = dict(extra or {})
+        for name, params in self.specs:
+            columns.update(INDICATORS[name](ctx, **params))
+        names = list(columns)
+        values = np.column_stack([columns[c] for c in names]) if names else np.empty((len(buffer.symbols), 0))
+        return names, values
+
+
+class SignalRules:
+    """
+    Bulk thresholds over the pipeline's signal matrix. A rule fires for a
+    symbol when its condition becomes true, not on every tick it stays
+    true. Nothing fires on the first evaluation.
+
+    rules: [(column, ">" | "<", threshold, signal_name), ...]
+    """
+
+    def __init__(self, rules: list):
+        self.rules = rules
+        self._was = None
+
+    def evaluate(self, names: list, values: np.ndarray):
+        """
+        Returns (active_rules, fired) where fired is a (n_symbols, n_active)
+        boolean matrix. Rules whose column was not computed are skipped.
+        """
+        active = [rule for rule in self.rules if rule[0] in names]
+        if not active:
+            return [], np.zeros((len(values), 0), dtype=bool)
+        cols = values[:, [names.index(rule[0]) for rule in active]]
+        thresholds = np.array([rule[2] for rule in active])
+        above = np.array([rule[1] == ">" for rule in active])
+        with np.errstate(invalid="ignore"):
+            now = np.where(above, cols > thresholds, cols < thresholds)
+        if self._was is None or self._was.shape != now.shape:
+            fired = np.zeros_like(now)
+        else:
+            fired = now & ~self._was
+        self._was = now
+        return active, fired
@@ -0,0 +1,138 @@
+# technical_analysis_agent/rsi_engine.py
+
+import numpy as np
+
+
+class RSIEngine:
+    """
+    Streaming Wilder RSI for a whole universe of symbols.
+
+    State lives in flat NumPy arrays with one slot per symbol, so a new bar
+    costs O(1) per symbol and a tick over the universe is a handful of
+    vectorized operations on a (n_symbols, n_new_bars) close matrix:
+
+      - the first `window` price deltas seed avg gain/loss with a simple mean
+      - every later delta applies Wilder smoothing:
+            avg = (avg * (window - 1) + x) / window
+      - RSI = 100 - 100 / (1 + avg_gain / avg_loss)
+
+    The most recent bar is often still forming (e.g. today's daily bar).
+    The state from just before each symbol's last bar is kept, so a revised
+    version of that bar replaces it instead of being counted twice.
+    """
+
+    def __init__(self, symbols: list, window: int = 14):
+        self.symbols = list(symbols)
+        self.index = {sym: i for i, sym in enumerate(self.symbols)}
+        self.window = window
+
+        n = len(self.symbols)
+        self.last_ts = np.full(n, np.iinfo(np.int64).min, dtype=np.int64)
+        self.rsi = np.full(n, np.nan)
+        self._state = {
+            "close": np.full(n, np.nan),
+            "count": np.zeros(n, dtype=np.int64),
+            "avg_gain": np.zeros(n),
+            "avg_loss": np.zeros(n),
+        }
+        # State as it was before each symbol's most recent bar
+        self._before_last = {name: arr.copy() for name, arr in self._state.items()}
+
+    def update_from_bars(self, bars_by_symbol: dict):
+        """
+        Feeds decoded bar sets ({symbol: {"ts": ..., "close": ...}}, see
+        bar_codec) into the engine. Bars at or before a symbol's last seen
+        timestamp are ignored, except a revision of that last bar.
+        Returns (previous_rsi, current_rsi) arrays aligned with self.symbols.
+        """
+        new, revise = stage_new_bars(bars_by_symbol, self.index, self.last_ts, ("close",))
+        return self.update(new["close"], revise)
+
+    def update(self, closes: np.ndarray, revise: np.ndarray = None):
+        """
+        Applies a (n_symbols, k) matrix of new closes, NaN-padded on the
+        right. Rows flagged in `revise` first roll back their last bar.
+        Returns (previous_rsi, current_rsi).
+        """
+        prev_rsi = self.rsi.copy()
+        state, before = self._state, self._before_last
+        if revise is not None and revise.any():
+            for name in state:
+                state[name] = np.where(revise, before[name], state[name])
+
+        w = self.window
+        for j in range(closes.shape[1]):
+            c = closes[:, j]
+            valid = ~np.isnan(c)
+            for name in state:
+                before[name] = np.where(valid, state[name], before[name])
+
+            has_delta = valid & ~np.isnan(state["close"])
+            delta = np.where(has_delta, c - state["close"], 0.0)
+            gain = np.maximum(delta, 0.0)
+            loss = np.maximum(-delta, 0.0)
+            count = state["count"] + has_delta
+
+            seeding = has_delta & (count <= w)
+            smoothing = has_delta & (count > w)
+            avg_gain = np.where(seeding, state["avg_gain"] + gain, state["avg_gain"])
+            avg_loss = np.where(seeding, state["avg_loss"] + loss, state["avg_loss"])
+            seeded = seeding & (count == w)
+            avg_gain = np.where(seeded, avg_gain / w, avg_gain)
+            avg_loss = np.where(seeded, avg_loss / w, avg_loss)
+            avg_gain = np.where(smoothing, (avg_gain * (w - 1) + gain) / w, avg_gain)
+            avg_loss = np.where(smoothing, (avg_loss * (w - 1) + loss) / w, avg_loss)
+
+            state["avg_gain"], state["avg_loss"], state["count"] = avg_gain, avg_loss, count
+            state["close"] = np.where(valid, c, state["close"])
+
+        ready = state["count"] >= w
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rs = state["avg_gain"] / state["avg_loss"]
+            rsi = np.where(state["avg_loss"] == 0, 100.0, 100.0 - 100.0 / (1.0 + rs))
+        self.rsi = np.where(ready, rsi, np.nan)
+        return prev_rsi, self.rsi
+
+
+def stage_new_bars(bars_by_symbol: dict, index: dict, last_ts: np.ndarray, fields: tuple):
+    """
+    Lines up the bars each symbol has not been fed yet into one
+    (n_symbols, k) matrix per field, NaN-padded on the right. `last_ts` is
+    advanced in place. A bar repeating a symbol's last timestamp is kept
+    and flagged in the returned `revise` mask so it can replace the old one.
+    Returns ({field: matrix}, revise).
+    """
+    n = len(last_ts)
+    starts = {}
+    revise = np.zeros(n, dtype=bool)
+    for sym, bars in bars_by_symbol.items():
+        i = index.get(sym)
+        if i is None or not len(bars["ts"]):
+            continue
+        ts = bars["ts"]
+        start = int(np.searchsorted(ts, last_ts[i], side="left"))
+        if start == len(ts):
+            # Only bars older than what this symbol has already been fed
+            continue
+        if ts[start] == last_ts[i]:
+            revise[i] = True
+        starts[sym] = (i, start)
+        last_ts[i] = ts[-1]
+
+    width = max((len(bars_by_symbol[sym]["ts"]) - start for sym, (_, start) in starts.items()), default=0)
+    new = {field: np.full((n, width), np.nan) for field in fields}
+    for sym, (i, start) in starts.items():
+        for field in fields:
+            column = bars_by_symbol[sym][field][start:]
+            new[field][i, :len(column)] = column
+    return new, revise
+
+
+def crossovers(prev: np.ndarray, curr: np.ndarray, upper: float = 70.0, lower: float = 30.0):
+    """
+    Vectorized crossover masks: (crossed above `upper`, crossed below `lower`).
+    Symbols without a previous or current value never fire.
+    """
+    overbought = (prev < upper) & (curr >= upper)
+    oversold = (prev > lower) & (curr <= lower) & ~overbought
+    return overbought, oversold
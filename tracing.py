@@ -0,0 +1,298 @@
+# tracing.py
+
+import time
+import uuid
+import bisect
+import threading
+import functools
+import contextvars
+
+# Name this process records on its hops (set by each agent with configure()).
+# When several agents share a process (cohost.py), each one's name also
+# lives in a context variable, which takes precedence.
+AGENT = "unknown"
+
+# Most hops kept in a trace envelope; older middle hops are dropped
+MAX_HOPS = 32
+
+# HTTP header carrying the trace of an MCP (JSON-RPC) call
+TRACE_HEADER = "X-Trace-Id"
+
+_CURRENT = contextvars.ContextVar("trace", default=None)
+_AGENT = contextvars.ContextVar("agent", default=None)
+
+
+def configure(agent: str):
+    """
+    Sets the agent name recorded on hops and whose histograms /metrics
+    reports: for the process, and for the current context (see agent()).
+    """
+    global AGENT
+    AGENT = agent
+    _AGENT.set(agent)
+
+def agent() -> str:
+    """
+    The agent the current code runs for: the context's agent name when
+    set (threads started through bind() inherit it), else the process's.
+    """
+    return _AGENT.get() or AGENT
+
+
+# ---------------------------------------------------------------------------
+# Latency histograms
+
+class Histogram:
+    """
+    Fixed log-scale latency histogram: buckets grow by 2**(1/4) (~19%)
+    from 10 µs to ~3 min, so percentiles are exact to within one bucket
+    and record() is a bisect plus an increment under a lock. Timings of
+    calls that raised are also counted under "errors".
+    """
+
+    BOUNDS = tuple(1e-5 * 2 ** (i / 4) for i in range(97))
+
+    def __init__(self):
+        self._counts = [0] * (len(self.BOUNDS) + 1)
+        self._lock = threading.Lock()
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds: float, error: bool = False):
+        bucket = bisect.bisect_left(self.BOUNDS, seconds)
+        with self._lock:
+            self._counts[bucket] += 1
+            self.count += 1
+            self.errors += error
+            self.total += seconds
+            if seconds > self.max:
+                self.max = seconds
+
+    def record_error(self):
+        """
+        Counts a failure that has no timing of its own (e.g. a handler
+        that raised on an event whose delivery was already recorded).
+        """
+        with self._lock:
+            self.errors += 1
+
+    def snapshot(self) -> dict:
+        """
+        count, mean, p50/p90/p99 (bucket upper bounds) and max, in
+        milliseconds, and the number of errors when there were any.
+        """
+        with self._lock:
+            counts = list(self._counts)
+            count, errors, total, peak = self.count, self.errors, self.total, self.max
+        out = {"count": count}
+        if errors:
+            out["errors"] = errors
+        if not count:
+            return out
+        out["mean_ms"] = round(1000.0 * total / count, 3)
+        for name, q in (("p50_ms", 0.50), ("p90_ms", 0.90), ("p99_ms", 0.99)):
+            rank, seen = q * count, 0
+            for bucket, n in enumerate(counts):
+                seen += n
+                if seen >= rank:
+                    bound = self.BOUNDS[bucket] if bucket < len(self.BOUNDS) else peak
+                    out[name] = round(1000.0 * min(bound, peak), 3)
+                    break
+        out["max_ms"] = round(1000.0 * peak, 3)
+        return out
+
+
+# (agent, histogram key) -> Histogram
+_HISTOGRAMS = {}
+_HISTOGRAMS_LOCK = threading.Lock()
+
+def histogram(name: str, **labels) -> Histogram:
+    """
+    The current agent's histogram for `name` and labels, e.g.
+    histogram("alert_to_fill", origin="technical_alert").
+    """
+    key = name
+    if labels:
+        key += "{" + ",".join(f"{k}={labels[k]}" for k in sorted(labels)) + "}"
+    key = (agent(), key)
+    hist = _HISTOGRAMS.get(key)
+    if hist is None:
+        with _HISTOGRAMS_LOCK:
+            hist = _HISTOGRAMS.setdefault(key, Histogram())
+    return hist
+
+def snapshot() -> dict:
+    """
+    {histogram key: percentiles} of the current agent, for its /metrics
+    endpoint.
+    """
+    owner = agent()
+    with _HISTOGRAMS_LOCK:
+        items = sorted((key, hist) for (name, key), hist in _HISTOGRAMS.items() if name == owner)
+    return {key: hist.snapshot() for key, hist in items}
+
+
+class timed:
+    """
+    Records wall time into histogram `name`, as a context manager
+
+        with tracing.timed("audit_write"):
+            ...
+
+    or as a decorator (@tracing.timed("generate_strategy")). A block or
+    call that raises counts as an error of the histogram.
+    """
+
+    def __init__(self, name: str, **labels):
+        self.hist = histogram(name, **labels)
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        self.hist.record(time.perf_counter() - self._start, error=exc_type is not None)
+        return False
+
+    def __call__(self, fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            error = True
+            try:
+                result = fn(*args, **kwargs)
+                error = False
+                return result
+            finally:
+                self.hist.record(time.perf_counter() - start, error=error)
+        return wrapper
+
+
+# ---------------------------------------------------------------------------
+# Trace propagation
+#
+# A trace is {"id": hex, "start": epoch seconds, "hops": [[agent, step, epoch], ...]}.
+# It rides next to "type"/"content" in the event envelope, in the
+# X-Trace-Id header of MCP calls (id only) and in a context variable
+# inside each agent. Every send and receive appends a hop. The gap between
+# consecutive hops is recorded as a histogram, so /metrics shows where
+# the time goes between an alert and its fills.
+
+def current():
+    return _CURRENT.get()
+
+def new_trace() -> dict:
+    now = time.time()
+    return {"id": uuid.uuid4().hex[:16], "start": now, "hops": []}
+
+def elapsed(trace: dict = None) -> float:
+    """
+    Seconds since the trace (by default the current one) started, or None.
+    """
+    trace = trace or current()
+    return time.time() - trace["start"] if trace else None
+
+class attached:
+    """
+    Makes `trace` the current trace inside the block (e.g. on the thread
+    that handles work queued under it). If the block raises, the error is
+    counted on histogram `errors` when one is given.
+    """
+
+    def __init__(self, trace: dict, errors: Histogram = None):
+        self.trace = trace
+        self.errors = errors
+
+    def __enter__(self):
+        self._token = _CURRENT.set(self.trace)
+        return self.trace
+
+    def __exit__(self, exc_type, *exc):
+        _CURRENT.reset(self._token)
+        if exc_type is not None and self.errors is not None:
+            self.errors.record_error()
+        return False
+
+def bind(fn):
+    """
+    fn wrapped to run under the caller's current trace and agent, for
+    threads, executors and scheduler jobs (contextvars do not follow
+    threading.Thread on their own). The wrapper may be called any number
+    of times, also concurrently.
+    """
+    context = contextvars.copy_context()
+
+    @functools.wraps(fn)
+    def bound(*args, **kwargs):
+        return context.copy().run(fn, *args, **kwargs)
+    return bound
+
+def inject(payload: dict, step: str) -> dict:
+    """
+    Adds the current trace (or a new one, when this event starts the chain)
+    with a hop for `step` to an outgoing event envelope.
+    """
+    trace = current() or new_trace()
+    hops = _hop(trace, step)
+    payload["trace"] = {"id": trace["id"], "start": trace["start"], "hops": hops}
+    return payload
+
+def received(payload: dict):
+    """
+    Context manager for an event handler: continues the envelope's trace
+    (or starts one) with a receive hop, and records the delivery latency
+    as histogram "a2a" by event type. A handler that raises counts as an
+    error of that histogram.
+    """
+    trace = payload.get("trace") if isinstance(payload, dict) else None
+    evt_type = payload.get("type") if isinstance(payload, dict) else None
+    if not isinstance(trace, dict) or "id" not in trace:
+        trace = new_trace()
+    trace = {"id": trace["id"], "start": trace.get("start", time.time()), "hops": list(trace.get("hops", []))}
+    trace["hops"] = _hop(trace, f"recv:{evt_type}", stage_name="a2a", labels={"type": evt_type})
+    return attached(trace, errors=histogram("a2a", type=evt_type))
+
+def headers() -> dict:
+    """
+    Outgoing HTTP headers for an MCP call under the current trace.
+    """
+    trace = current()
+    return {TRACE_HEADER: f"{trace['id']};{trace['start']}"} if trace else {}
+
+def from_headers(request_headers) -> attached:
+    """
+    Context manager for an MCP server: continues the caller's trace id.
+    """
+    value = request_headers.get(TRACE_HEADER)
+    trace = new_trace()
+    if value:
+        trace_id, _, start = value.partition(";")
+        trace["id"] = trace_id
+        try:
+            trace["start"] = float(start)
+        except ValueError:
+            pass
+    return attached(trace)
+
+def _hop(trace: dict, step: str, stage_name: str = "stage", labels: dict = None) -> list:
+    """
+    trace's hops plus one for `step` now. The gap since the previous hop is
+    recorded: as `stage_name` (with labels) when it crossed agents, as
+    "stage" from the previous step to this one within an agent.
+    """
+    now = time.time()
+    me = agent()
+    hops = list(trace.get("hops", []))
+    if hops:
+        sender, last_step, last_t = hops[-1]
+        if sender == me:
+            histogram("stage", step=f"{last_step}->{step}").record(max(0.0, now - last_t))
+        else:
+            histogram(stage_name, **(labels or {"from": sender})).record(max(0.0, now - last_t))
+    hops.append([me, step, now])
+    if len(hops) > MAX_HOPS:
+        hops = hops[:1] + hops[-(MAX_HOPS - 1):]
+    trace["hops"] = hops
+    return hops